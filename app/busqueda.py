@@ -0,0 +1,126 @@
+# Funciones para la búsqueda de texto completo de libros
+
+from sqlalchemy import DDL, event, select, func, literal, literal_column, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Base
+from models.libro import Libro, vector_busqueda_libro
+from models.autor import Autor, vector_busqueda_autor
+from models.libros_autores import libros_autores
+
+# ----------------------------- SQLITE (FTS5) -----------------------------
+# En SQLite (tests y desarrollo local) se usa una tabla virtual FTS5 con el título,
+# la descripción, la editorial y los nombres de los autores de cada libro. Se mantiene
+# con triggers y su rowid es el ID del libro
+
+# Sentencia que recalcula la fila de búsqueda de los libros que cumplen la condición
+REFRESCAR_FTS = """
+    INSERT OR REPLACE INTO libros_fts(rowid, titulo, descripcion, editorial, autores)
+    SELECT l.id, l.titulo, coalesce(l.descripcion, ''), coalesce(l.editorial, ''),
+           coalesce((SELECT group_concat(a.nombre || ' ' || a.apellido, ' ')
+                     FROM libros_autores la JOIN autores a ON a.id = la.autor_id
+                     WHERE la.libro_id = l.id), '')
+    FROM libros l WHERE {condicion};
+"""
+
+DDL_FTS_SQLITE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS libros_fts USING fts5(
+        titulo, descripcion, editorial, autores, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS libros_fts_insert AFTER INSERT ON libros BEGIN
+        {REFRESCAR_FTS.format(condicion='l.id = NEW.id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS libros_fts_update AFTER UPDATE ON libros BEGIN
+        {REFRESCAR_FTS.format(condicion='l.id = NEW.id')}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS libros_fts_delete AFTER DELETE ON libros BEGIN
+        DELETE FROM libros_fts WHERE rowid = OLD.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS libros_autores_fts_insert AFTER INSERT ON libros_autores BEGIN
+        {REFRESCAR_FTS.format(condicion='l.id = NEW.libro_id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS libros_autores_fts_delete AFTER DELETE ON libros_autores BEGIN
+        {REFRESCAR_FTS.format(condicion='l.id = OLD.libro_id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS autores_fts_update AFTER UPDATE ON autores BEGIN
+        {REFRESCAR_FTS.format(condicion='l.id IN (SELECT libro_id FROM libros_autores WHERE autor_id = NEW.id)')}
+    END""",
+    # Indexa los libros que existían antes de crear la tabla de búsqueda
+    REFRESCAR_FTS.format(condicion='l.id NOT IN (SELECT rowid FROM libros_fts)'),
+]
+
+# Se crean al crear las tablas, solo en SQLite
+for sentencia in DDL_FTS_SQLITE:
+    event.listen(Base.metadata, 'after_create', DDL(sentencia).execute_if(dialect='sqlite'))
+
+# Función para convertir el texto del usuario en una consulta FTS5 sin operadores
+def consulta_fts5(q: str) -> str:
+    return ' '.join('"' + termino.replace('"', '""') + '"' for termino in q.split())
+
+async def buscar_ids_sqlite(db: AsyncSession, q: str, limite: int, offset: int):
+    resultado = await db.execute(
+        text(
+            'SELECT rowid, -bm25(libros_fts) AS rank FROM libros_fts '
+            'WHERE libros_fts MATCH :q ORDER BY bm25(libros_fts), rowid LIMIT :limite OFFSET :offset'
+        ),
+        {'q': consulta_fts5(q), 'limite': limite, 'offset': offset},
+    )
+    return resultado.all()
+
+# ----------------------------- POSTGRESQL (tsvector + GIN) -----------------------------
+async def buscar_ids_postgresql(db: AsyncSession, q: str, limite: int, offset: int):
+    """
+    Función para buscar libros con los índices GIN de libros y autores
+
+    Cada rama de la unión usa su propio índice; los libros que coinciden por
+    texto y por autor suman ambas puntuaciones.
+
+    Returns:
+    list: Tuplas (ID del libro, puntuación) ordenadas por puntuación
+
+    """
+    consulta_libro = func.websearch_to_tsquery(literal_column("'spanish'"), q)
+    consulta_autor = func.websearch_to_tsquery(literal_column("'simple'"), q)
+
+    coincidencias = union_all(
+        select(Libro.id.label('libro_id'), func.ts_rank(vector_busqueda_libro, consulta_libro).label('rank'))
+        .where(vector_busqueda_libro.op('@@')(consulta_libro)),
+        select(libros_autores.c.libro_id, literal(1.0).label('rank'))
+        .join(Autor, Autor.id == libros_autores.c.autor_id)
+        .where(vector_busqueda_autor.op('@@')(consulta_autor)),
+    ).subquery()
+
+    rank = func.sum(coincidencias.c.rank).label('rank')
+    resultado = await db.execute(
+        select(coincidencias.c.libro_id, rank)
+        .group_by(coincidencias.c.libro_id)
+        .order_by(rank.desc(), coincidencias.c.libro_id)
+        .limit(limite)
+        .offset(offset)
+    )
+    return resultado.all()
+
+async def buscar_libros(db: AsyncSession, q: str, limite: int, offset: int, opciones=()):
+    """
+    Función para buscar libros por texto completo ordenados por relevancia
+
+    Returns:
+    list: Libros de la página en orden de relevancia
+
+    """
+    if not q.split():
+        return []
+
+    if db.bind.dialect.name == 'sqlite':
+        ids = await buscar_ids_sqlite(db, q, limite, offset)
+    else:
+        ids = await buscar_ids_postgresql(db, q, limite, offset)
+
+    if not ids:
+        return []
+
+    # Cargamos los libros de la página y los devolvemos en el orden de la búsqueda
+    libros = (await db.scalars(select(Libro).options(*opciones).where(Libro.id.in_([id for id, _ in ids])))).all()
+    por_id = {libro.id: libro for libro in libros}
+
+    return [por_id[id] for id, _ in ids if id in por_id]
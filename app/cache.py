@@ -0,0 +1,109 @@
+# Caché en memoria (LRU con caducidad) para las consultas de libros
+
+import os
+import time
+from collections import OrderedDict
+
+from isbn import normalizar_isbn
+
+# Configuración de la caché
+CACHE_ACTIVA = os.getenv('CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CACHE_TAMANO = int(os.getenv('CACHE_MAX_SIZE', '10000'))
+CACHE_TTL = float(os.getenv('CACHE_TTL', '60'))
+
+class CacheLRU:
+    """
+    Caché LRU acotada con caducidad por entrada
+
+    Cada worker tiene su propia caché; el TTL limita el tiempo que un worker
+    puede servir datos modificados por otro.
+
+    """
+    def __init__(self, nombre: str, tamano: int = CACHE_TAMANO, ttl: float = CACHE_TTL, activa: bool = CACHE_ACTIVA):
+        self.nombre = nombre
+        self.tamano = tamano
+        self.ttl = ttl
+        self.activa = activa
+        self.datos = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def get(self, clave):
+        if not self.activa:
+            return None
+
+        entrada = self.datos.get(clave)
+        if entrada is None:
+            self.fallos += 1
+            return None
+
+        valor, caduca = entrada
+        if caduca < time.monotonic():
+            del self.datos[clave]
+            self.fallos += 1
+            return None
+
+        self.datos.move_to_end(clave)
+        self.aciertos += 1
+        return valor
+
+    def set(self, clave, valor):
+        if not self.activa:
+            return
+
+        self.datos[clave] = (valor, time.monotonic() + self.ttl)
+        self.datos.move_to_end(clave)
+
+        # Si se supera el tamaño, se desaloja la entrada usada hace más tiempo
+        while len(self.datos) > self.tamano:
+            self.datos.popitem(last=False)
+            self.desalojos += 1
+
+    def invalidar(self, *claves):
+        for clave in claves:
+            self.datos.pop(clave, None)
+
+    def invalidar_si(self, condicion):
+        for clave in [clave for clave, (valor, _) in self.datos.items() if condicion(valor)]:
+            del self.datos[clave]
+
+    def limpiar(self):
+        self.datos.clear()
+
+    def stats(self):
+        return {
+            'activa': self.activa,
+            'entradas': len(self.datos),
+            'tamano_maximo': self.tamano,
+            'ttl': self.ttl,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'desalojos': self.desalojos,
+        }
+
+# Caché de libros de la API. Los libros se guardan por ID y por ISBN. Los géneros no
+# necesitan caché: están todos en el registro en memoria (registro_generos.py)
+cache_libros = CacheLRU('libros')
+
+# Funciones para construir las claves de los libros
+def clave_libro_id(id: int):
+    return ('id', id)
+
+def clave_libro_isbn(isbn: str):
+    # Se usa la forma canónica para que el ISBN-10 y el ISBN-13 compartan entrada
+    return ('isbn', normalizar_isbn(isbn) or isbn)
+
+# Función para invalidar un libro por su ID y sus ISBN (actual y anterior)
+def invalidar_libro(id: int, *isbns):
+    cache_libros.invalidar(clave_libro_id(id), *[clave_libro_isbn(isbn) for isbn in isbns if isbn])
+
+# Función para obtener las estadísticas de todas las cachés
+def get_cache_stats():
+    stats = {cache_libros.nombre: cache_libros.stats()}
+
+    # Memoización de la normalización de ISBN
+    info_isbn = normalizar_isbn.cache_info()
+    stats['isbn'] = {'entradas': info_isbn.currsize, 'tamano_maximo': info_isbn.maxsize, 'aciertos': info_isbn.hits, 'fallos': info_isbn.misses}
+
+    return stats
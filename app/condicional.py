@@ -0,0 +1,86 @@
+# Funciones para las peticiones condicionales HTTP (ETag / Last-Modified)
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Función para calcular el ETag a partir de las partes que identifican la versión de un recurso
+def calcular_etag(*partes) -> str:
+    resumen = hashlib.blake2b('|'.join(str(parte) for parte in partes).encode(), digest_size=16)
+    return f'"{resumen.hexdigest()}"'
+
+# Función para convertir las fechas de created_at/updated_at a la fecha de Last-Modified
+def fecha_version(fecha) -> Optional[datetime]:
+    if not fecha:
+        return None
+
+    # Las fechas sin zona horaria (SQLite) son UTC. Las cabeceras HTTP tienen precisión de segundos
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+
+    return fecha.astimezone(timezone.utc).replace(microsecond=0)
+
+# Función para obtener el ETag y la fecha de última modificación de un objeto
+def version_recurso(objeto):
+    fecha = objeto.updated_at or objeto.created_at
+    return calcular_etag(objeto.id, fecha), fecha_version(fecha)
+
+# Función para obtener el ETag de una página de objetos. Las partes extra (cursor, límite...)
+# distinguen páginas con el mismo contenido.
+#
+# Las páginas no tienen fecha de última modificación: la fecha más reciente de sus objetos
+# no cambia al borrar uno, así que If-Modified-Since daría un 304 con la página antigua.
+# El ETag sí cambia, porque incluye los IDs de los objetos de la página
+def version_coleccion(objetos, *partes):
+    etag = calcular_etag(*partes, *[f'{objeto.id}:{objeto.updated_at or objeto.created_at}' for objeto in objetos])
+    return etag, None
+
+# Función para comprobar si el cliente ya tiene la versión actual del recurso
+def no_modificado(request: Request, etag: str, ultima_modificacion: Optional[datetime]) -> bool:
+    """
+    Función para evaluar las cabeceras If-None-Match e If-Modified-Since
+
+    Si la petición trae If-None-Match, If-Modified-Since se ignora (RFC 9110).
+
+    Returns:
+    bool: True si se puede responder con un 304
+
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        etags = [valor.strip().removeprefix('W/') for valor in if_none_match.split(',')]
+        return '*' in etags or etag in etags
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and ultima_modificacion:
+        try:
+            fecha = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+        if fecha.tzinfo is None:
+            fecha = fecha.replace(tzinfo=timezone.utc)
+
+        return ultima_modificacion <= fecha
+
+    return False
+
+# Función para añadir las cabeceras de validación a una respuesta
+def poner_cabeceras(response: Response, etag: str, ultima_modificacion: Optional[datetime]):
+    response.headers['ETag'] = etag
+    if ultima_modificacion:
+        response.headers['Last-Modified'] = format_datetime(ultima_modificacion, usegmt=True)
+
+# Función para responder a una petición condicional. Devuelve un 304 si el cliente
+# tiene la versión actual o None si hay que enviar el cuerpo (con las cabeceras ya puestas)
+def respuesta_condicional(request: Request, response: Response, etag: str, ultima_modificacion: Optional[datetime]):
+    if no_modificado(request, etag, ultima_modificacion):
+        respuesta = Response(status_code=304)
+        poner_cabeceras(respuesta, etag, ultima_modificacion)
+        return respuesta
+
+    poner_cabeceras(response, etag, ultima_modificacion)
+    return None
@@ -1,57 +1,224 @@
 # Configuración de la base de datos
 
-from sqlalchemy import create_engine, inspect
+import os
+import time
+
+from sqlalchemy import create_engine, inspect, text, event, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import now
+
+from metricas import registrar_eventos_bd
 
-# URL de conexión a la base de datos
-# TODO: Sacar datos de archivo .env
+# URL de conexión a la base de datos. Se puede dar completa con DATABASE_URL (por ejemplo
+# sqlite:///biblioteca.db para desarrollo local y tests) o formarla con los datos de
+# PostgreSQL de las variables de entorno, con los valores de desarrollo por defecto
 
 # Datos de user
-user = 'postgres'
+user = os.getenv('DB_USER', 'postgres')
 # Datos de password
-password = 'abc123.'
+password = os.getenv('DB_PASSWORD', 'abc123.')
 # Datos de host
-host = 'localhost'
+host = os.getenv('DB_HOST', 'localhost')
 # Datos de puerto
-port = '5432' # Puerto por defecto de PostgreSQL / No es necesario ponerlo, falla
+port = os.getenv('DB_PORT', '5432')
 # Nombre de la base de datos
-dbname = 'biblioteca_db'
+dbname = os.getenv('DB_NAME', 'biblioteca_db')
+
+DATABASE_URL = os.getenv('DATABASE_URL') or f'postgresql://{user}:{password}@{host}:{port}/{dbname}'
+
+# Driver asíncrono de cada base de datos
+DRIVERS_ASINCRONOS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+# Función para obtener la URL del driver asíncrono a partir de la URL síncrona
+def url_asincrona(url: str) -> str:
+    url = make_url(url)
+    driver = DRIVERS_ASINCRONOS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+# URL para el driver asíncrono (asyncpg o aiosqlite) que usan las rutas. Por defecto, la
+# misma base de datos que DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL') or url_asincrona(DATABASE_URL)
+
+# Configuración del pool de conexiones. Se dimensiona según el número de workers:
+# cada worker tiene su propio pool de DB_POOL_SIZE + DB_MAX_OVERFLOW conexiones
+OPCIONES_POOL = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+    'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+    'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+}
+
+# Métricas del pool de conexiones de las rutas
+class MetricasPool:
+    def __init__(self):
+        self.checkouts = 0
+        self.fallos_checkout = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.conexiones_creadas = 0
+        self.creacion_total = 0.0
+
+    def registrar_espera(self, segundos: float):
+        self.espera_total += segundos
+        if segundos > self.espera_maxima:
+            self.espera_maxima = segundos
+
+    def registrar_creacion(self, segundos: float):
+        self.conexiones_creadas += 1
+        self.creacion_total += segundos
+
+metricas_pool = MetricasPool()
+
+# Cola del pool que mide cuánto se espera a que se libere una conexión
+class ColaConMetricas(AsyncAdaptedQueue):
+    def get(self, block: bool = True, timeout=None):
+        inicio = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            metricas_pool.registrar_espera(time.perf_counter() - inicio)
+
+# Pool que mide por separado la espera en la cola y la creación de conexiones nuevas,
+# y cuenta los checkouts que fallan por cualquier motivo (tiempo de espera agotado,
+# error al conectar o al comprobar la conexión con pre_ping)
+class PoolConMetricas(AsyncAdaptedQueuePool):
+    _queue_class = ColaConMetricas
+
+    def connect(self):
+        try:
+            conexion = super().connect()
+        except Exception:
+            metricas_pool.fallos_checkout += 1
+            raise
+
+        metricas_pool.checkouts += 1
+        return conexion
+
+    def _create_connection(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            metricas_pool.registrar_creacion(time.perf_counter() - inicio)
+
+# Configuración de las conexiones de SQLite (desarrollo local y tests)
+def configurar_sqlite(engine):
+    """
+    Función para que SQLite se comporte como PostgreSQL en las transacciones
+
+    El driver de SQLite no abre la transacción hasta la primera escritura, así que
+    las lecturas previas no forman parte de ella. Se desactiva ese comportamiento y
+    SQLAlchemy emite su propio BEGIN. El modo WAL permite leer mientras otra
+    conexión escribe. Solo sirve para bases de datos en fichero.
+
+    Las transacciones que leen y después escriben en función de lo leído (el SELECT
+    ... FOR UPDATE de PostgreSQL) deben pedir la opción de ejecución bloqueo_escritura:
+    empiezan con BEGIN IMMEDIATE y esperan a tener el bloqueo de escritura antes de
+    leer. Si no, al pasar a escribir SQLite falla con 'database is locked' en lugar
+    de esperar a que termine la otra transacción.
+
+    """
+    @event.listens_for(engine, 'connect')
+    def conectar(conexion_dbapi, registro):
+        conexion_dbapi.isolation_level = None
+        cursor = conexion_dbapi.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def empezar(conexion):
+        if conexion.get_execution_options().get('bloqueo_escritura'):
+            conexion.exec_driver_sql('BEGIN IMMEDIATE')
+        else:
+            conexion.exec_driver_sql('BEGIN')
+
+# now() en SQLite (CURRENT_TIMESTAMP) no tiene microsegundos, mientras que SQLAlchemy guarda
+# y compara las fechas de Python con ellos. Como SQLite compara las fechas como texto,
+# '2024-01-01 10:00:00' < '2024-01-01 10:00:00.000000' y los cursores por (updated_at, id)
+# se saltarían los libros con la misma fecha. Se genera la fecha con el mismo formato
+@compiles(now, 'sqlite')
+def now_sqlite(elemento, compilador, **kwargs):
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
 
-DATABASE_URL = f'postgresql://{user}:{password}@{host}/{dbname}'
+# Crear motor de base de datos (síncrono: inicialización y scripts)
+engine = create_engine(DATABASE_URL, **OPCIONES_POOL)
 
-# Crear motor de base de datos
-engine = create_engine(DATABASE_URL)
+# Crear motor de base de datos asíncrono para las rutas
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=PoolConMetricas, **OPCIONES_POOL)
+
+if engine.dialect.name == 'sqlite':
+    configurar_sqlite(engine)
+if async_engine.dialect.name == 'sqlite':
+    configurar_sqlite(async_engine.sync_engine)
+
+# Medimos el número y el tiempo de las consultas de ambos motores (métricas de /metrics)
+registrar_eventos_bd(engine)
+registrar_eventos_bd(async_engine.sync_engine)
 
 # Crear una sesión de base de datos
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Crear una sesión de base de datos asíncrona. No se expiran los objetos al hacer commit
+# porque en asíncrono no se pueden recargar atributos de forma perezosa al serializarlos
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Crear una clase base para las clases de base de datos
 Base = declarative_base()
 
 # Función para inicializar la base de datos
 def init_db():
     """
-    Función para inicializar la base de datos
+    Función para crear las tablas directamente a partir de los modelos
+
+    Solo para bases de datos temporales (tests y pruebas locales). El esquema de la
+    API se gestiona con las migraciones (python -m migraciones upgrade).
 
     """
     Base.metadata.create_all(bind=engine)
 
-# Función para obtener la sesión de la base de datos
-def get_db():
+# Función para obtener la sesión asíncrona de la base de datos
+async def get_db():
     """
-    Función para obtener la sesión de la base de datos
+    Función para obtener la sesión asíncrona de la base de datos
 
     Returns:
-    SessionLocal: Sesión de la base de datos
+    AsyncSession: Sesión asíncrona de la base de datos
 
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# Función para cerrar las conexiones del motor asíncrono
+async def close_db():
+    """
+    Función para cerrar las conexiones del motor asíncrono
+
+    """
+    await async_engine.dispose()
+
+# Función para comprobar que la base de datos responde
+async def comprobar_db():
+    """
+    Función para comprobar que la base de datos responde con una consulta mínima
+
+    Returns:
+    bool: True si la base de datos responde
+
+    """
+    async with async_engine.connect() as conexion:
+        await conexion.execute(text('SELECT 1'))
+
+    return True
 
 def get_db_info ():
     """
@@ -81,6 +248,32 @@ def get_db_info ():
             'url': str(engine.url),
         }
     
+def get_pool_stats ():
+    """
+    Función para obtener las estadísticas del pool de conexiones de las rutas
+
+    Returns:
+    dict: Estadísticas del pool de conexiones
+
+    """
+    pool = async_engine.sync_engine.pool
+    checkouts = metricas_pool.checkouts
+    creadas = metricas_pool.conexiones_creadas
+
+    return {
+        'pool_size': pool.size(),
+        'max_overflow': OPCIONES_POOL['max_overflow'],
+        'conexiones_en_uso': pool.checkedout(),
+        'conexiones_libres': pool.checkedin(),
+        'overflow_en_uso': max(pool.overflow(), 0),
+        'checkouts': checkouts,
+        'fallos_checkout': metricas_pool.fallos_checkout,
+        'espera_media_ms': round(metricas_pool.espera_total / checkouts * 1000, 3) if checkouts else 0.0,
+        'espera_maxima_ms': round(metricas_pool.espera_maxima * 1000, 3),
+        'conexiones_creadas': creadas,
+        'creacion_media_ms': round(metricas_pool.creacion_total / creadas * 1000, 3) if creadas else 0.0,
+    }
+
 def insertar_datos_ejemplo ():
     """
     Función para insertar datos de ejemplo en la base de datos
@@ -0,0 +1,89 @@
+# Funciones para exportar el catálogo completo en streaming (NDJSON / CSV)
+
+import csv
+import io
+import logging
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from database import AsyncSessionLocal
+from models.libro import Libro
+from schemas.libro_schemas import LibroResponse
+
+internal_logger = logging.getLogger('internal_activity')
+
+# Número de filas que se leen de la base de datos en cada lote
+TAMANO_LOTE = 1000
+
+# Columnas del CSV exportado
+COLUMNAS_CSV = [
+    'id', 'isbn', 'titulo', 'autores', 'descripcion', 'editorial', 'generos',
+    'pais', 'idioma', 'num_paginas', 'ano_edicion', 'precio',
+]
+
+# Función para recorrer todos los libros por lotes con un cursor del servidor
+async def iterar_libros(tamano_lote: int = TAMANO_LOTE):
+    """
+    Función para recorrer el catálogo completo sin cargarlo en memoria
+
+    Abre su propia sesión porque el streaming continúa después de que la ruta
+    haya devuelto la respuesta y cerrado la sesión de la petición. Cada libro se
+    valida antes de enviarlo: los que no cumplen LibroResponse (por ejemplo, con
+    columnas a NULL) se registran y se omiten, porque un error a mitad del
+    streaming cortaría la respuesta ya empezada.
+
+    Returns:
+    AsyncIterator[list[LibroResponse]]: Lotes de libros serializados
+
+    """
+    consulta = (
+        select(Libro)
+        .options(selectinload(Libro.autores), selectinload(Libro.generos))
+        .order_by(Libro.id)
+        .execution_options(yield_per=tamano_lote)
+    )
+
+    async with AsyncSessionLocal() as db:
+        resultado = await db.stream(consulta)
+
+        async for lote in resultado.scalars().partitions():
+            validos = []
+            for libro in lote:
+                try:
+                    validos.append(LibroResponse.model_validate(libro))
+                except ValidationError as e:
+                    internal_logger.error(f'Libro {libro.id} omitido en la exportación: {e.error_count()} campos no válidos ({", ".join(str(error["loc"][0]) for error in e.errors())})')
+            yield validos
+
+            # Se quitan de la sesión los libros del lote para que la memoria no crezca con el
+            # catálogo. No se puede usar expunge_all: el resultado sigue cargando los lotes
+            # siguientes en el mapa de identidad de la sesión
+            for libro in lote:
+                db.expunge(libro)
+
+# Función para exportar el catálogo en NDJSON (una línea JSON por libro)
+async def exportar_ndjson():
+    async for lote in iterar_libros(TAMANO_LOTE):
+        yield ''.join(libro.model_dump_json() + '\n' for libro in lote)
+
+# Función para exportar el catálogo en CSV. Los IDs de autores y géneros se separan con '|'
+async def exportar_csv():
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    escritor.writerow(COLUMNAS_CSV)
+    yield buffer.getvalue()
+
+    async for lote in iterar_libros(TAMANO_LOTE):
+        buffer.seek(0)
+        buffer.truncate()
+
+        for libro in lote:
+            fila = libro.model_dump()
+            fila['autores'] = '|'.join(str(id) for id in fila['autores'])
+            fila['generos'] = '|'.join(str(id) for id in fila['generos'])
+            escritor.writerow([fila[columna] for columna in COLUMNAS_CSV])
+
+        yield buffer.getvalue()
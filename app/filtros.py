@@ -0,0 +1,107 @@
+# Funciones para filtrar los libros y calcular las facetas del catálogo
+
+from fastapi import Query
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.libro import Libro
+from models.libros_generos import libros_generos
+from models.libros_autores import libros_autores
+
+# Número máximo de valores que se devuelven por faceta
+MAX_VALORES_FACETA = 20
+
+# Dependencia con los filtros de los listados de libros
+def filtros_libros(
+    idioma: str = Query(None, description='Idioma del libro'),
+    pais: str = Query(None, description='País del libro'),
+    editorial: str = Query(None, description='Editorial del libro'),
+    ano_min: int = Query(None, description='Año de edición mínimo'),
+    ano_max: int = Query(None, description='Año de edición máximo'),
+    precio_min: float = Query(None, ge=0, description='Precio mínimo'),
+    precio_max: float = Query(None, ge=0, description='Precio máximo'),
+    genero: list[int] = Query(None, description='IDs de género (libros con cualquiera de ellos)'),
+    autor: list[int] = Query(None, description='IDs de autor (libros con cualquiera de ellos)'),
+):
+    return {
+        'idioma': idioma,
+        'pais': pais,
+        'editorial': editorial,
+        'ano_min': ano_min,
+        'ano_max': ano_max,
+        'precio_min': precio_min,
+        'precio_max': precio_max,
+        'genero': genero,
+        'autor': autor,
+    }
+
+# Función para obtener las condiciones SQL de los filtros recibidos
+def condiciones(filtros: dict) -> list:
+    """
+    Función para convertir los filtros en condiciones sobre Libro
+
+    Los filtros por género y autor son subconsultas sobre las tablas de relación
+    que usan sus índices (genero_id, libro_id) y (autor_id, libro_id).
+
+    Returns:
+    list: Condiciones para el where de la consulta
+
+    """
+    resultado = []
+
+    for campo in ('idioma', 'pais', 'editorial'):
+        if filtros.get(campo) is not None:
+            resultado.append(getattr(Libro, campo) == filtros[campo])
+
+    if filtros.get('ano_min') is not None:
+        resultado.append(Libro.ano_edicion >= filtros['ano_min'])
+    if filtros.get('ano_max') is not None:
+        resultado.append(Libro.ano_edicion <= filtros['ano_max'])
+    if filtros.get('precio_min') is not None:
+        resultado.append(Libro.precio >= filtros['precio_min'])
+    if filtros.get('precio_max') is not None:
+        resultado.append(Libro.precio <= filtros['precio_max'])
+
+    if filtros.get('genero'):
+        resultado.append(Libro.id.in_(
+            select(libros_generos.c.libro_id).where(libros_generos.c.genero_id.in_(filtros['genero']))
+        ))
+    if filtros.get('autor'):
+        resultado.append(Libro.id.in_(
+            select(libros_autores.c.libro_id).where(libros_autores.c.autor_id.in_(filtros['autor']))
+        ))
+
+    return resultado
+
+# Función para contar los libros filtrados agrupados por una columna
+async def contar_por(db: AsyncSession, columna, condiciones_libros: list, tabla_relacion=None):
+    consulta = select(columna.label('valor'), func.count().label('total'))
+
+    if tabla_relacion is not None:
+        # Facetas de relaciones: se cuentan las filas de la tabla de relación de los libros filtrados
+        consulta = consulta.where(tabla_relacion.c.libro_id.in_(select(Libro.id).where(*condiciones_libros)))
+    else:
+        consulta = consulta.where(*condiciones_libros, columna.is_not(None))
+
+    consulta = consulta.group_by(columna).order_by(func.count().desc(), columna).limit(MAX_VALORES_FACETA)
+
+    return [{'valor': valor, 'total': total} for valor, total in (await db.execute(consulta)).all()]
+
+async def calcular_facetas(db: AsyncSession, filtros: dict) -> dict:
+    """
+    Función para calcular los recuentos por faceta de los libros filtrados
+
+    Returns:
+    dict: Para cada faceta, los valores más frecuentes con su número de libros
+
+    """
+    condiciones_libros = condiciones(filtros)
+
+    return {
+        'idioma': await contar_por(db, Libro.idioma, condiciones_libros),
+        'pais': await contar_por(db, Libro.pais, condiciones_libros),
+        'editorial': await contar_por(db, Libro.editorial, condiciones_libros),
+        'ano_edicion': await contar_por(db, Libro.ano_edicion, condiciones_libros),
+        'genero': await contar_por(db, libros_generos.c.genero_id, condiciones_libros, libros_generos),
+        'autor': await contar_por(db, libros_autores.c.autor_id, condiciones_libros, libros_autores),
+    }
@@ -1,16 +1,109 @@
 # Archivo para funciones varias
 
-from reportlab.lib.pagesizes import letter
+from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 
-from schemas.libro_schemas import LibroResponse
+from database import SessionLocal
+from models.libro import Libro
 
-def generar_pdf(libros: list[LibroResponse], file_path: str):
-    c = canvas.Canvas(file_path, pagesize=letter)
+# Número de libros que se leen de la base de datos en cada lote
+TAMANO_LOTE = 500
+
+# Márgenes y altura de cada fila del listado (en puntos)
+MARGEN = 40
+ALTO_FILA = 14
+
+# Columnas del listado: (cabecera, posición x, número máximo de caracteres)
+COLUMNAS = [
+    ('ISBN', MARGEN, 14),
+    ('Título', MARGEN + 90, 45),
+    ('Autores', MARGEN + 320, 28),
+    ('Año', MARGEN + 460, 4),
+    ('Precio', MARGEN + 495, 9),
+]
+
+# Función para recortar un texto al ancho de su columna
+def recortar(texto, maximo: int) -> str:
+    texto = '' if texto is None else str(texto)
+    return texto if len(texto) <= maximo else texto[:maximo - 1] + '…'
+
+# Función para dibujar la cabecera de una página del listado
+def dibujar_cabecera(c, pagina: int, alto: float) -> float:
+    c.setFont('Helvetica-Bold', 14)
+    c.drawString(MARGEN, alto - MARGEN, 'Listado de libros')
+    c.setFont('Helvetica', 8)
+    c.drawRightString(A4[0] - MARGEN, alto - MARGEN, f'Página {pagina}')
+
+    y = alto - MARGEN - 2 * ALTO_FILA
+    c.setFont('Helvetica-Bold', 9)
+    for cabecera, x, _ in COLUMNAS:
+        c.drawString(x, y, cabecera)
+
+    c.line(MARGEN, y - 4, A4[0] - MARGEN, y - 4)
+    c.setFont('Helvetica', 8)
+
+    return y - ALTO_FILA
+
+def generar_pdf(file_path: str):
+    """
+    Función para generar el PDF con el listado completo de libros
+
+    Es síncrona (ReportLab) y se ejecuta en un hilo aparte. Lee los libros por lotes
+    con un cursor del servidor para no cargar todo el catálogo en memoria.
+
+    Returns:
+    int: Número de libros incluidos en el PDF
+
+    """
+    c = canvas.Canvas(file_path, pagesize=A4)
 
     c.setTitle("Listado de libros")
     c.setAuthor("Julio Acuña")
 
-    c.drawString(100, 800, "Listado de libros")
+    alto = A4[1]
+    pagina = 1
+    y = dibujar_cabecera(c, pagina, alto)
+    total = 0
+
+    consulta = (
+        select(Libro)
+        .options(selectinload(Libro.autores))
+        .order_by(Libro.id)
+        .execution_options(yield_per=TAMANO_LOTE)
+    )
+
+    with SessionLocal() as db:
+        for lote in db.scalars(consulta).partitions():
+            for libro in lote:
+                # Si no cabe otra fila, pasamos a una página nueva
+                if y < MARGEN:
+                    c.showPage()
+                    pagina += 1
+                    y = dibujar_cabecera(c, pagina, alto)
+
+                autores = ', '.join(f'{autor.nombre} {autor.apellido}' for autor in libro.autores)
+                valores = [
+                    libro.isbn,
+                    libro.titulo,
+                    autores,
+                    libro.ano_edicion,
+                    f'{libro.precio:.2f} €' if libro.precio is not None else '',
+                ]
+
+                for (_, x, maximo), valor in zip(COLUMNAS, valores):
+                    c.drawString(x, y, recortar(valor, maximo))
+
+                y -= ALTO_FILA
+                total += 1
+
+            # Se quitan de la sesión los libros del lote para que la memoria no crezca con el
+            # catálogo. No se puede usar expunge_all: el resultado sigue cargando los lotes
+            # siguientes en el mapa de identidad de la sesión
+            for libro in lote:
+                db.expunge(libro)
+
+    c.save()
 
-    c.save()
\ No newline at end of file
+    return total
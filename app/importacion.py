@@ -0,0 +1,284 @@
+# Funciones para la importación y la actualización masiva de libros
+
+import json
+from collections import defaultdict
+
+from pydantic import ValidationError
+from sqlalchemy import select, insert, update, values, column, bindparam, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import invalidar_libro
+from isbn import normalizar_isbn, normalizar_lote, formas_isbn
+from registro_generos import registro_generos
+from models.libro import Libro
+from models.autor import Autor
+from models.libros_generos import libros_generos
+from models.libros_autores import libros_autores
+from schemas.libro_schemas import LibroCreate
+
+# Número de libros que se insertan en cada transacción
+TAMANO_LOTE = 1000
+
+# Columnas de Libro que se copian directamente de LibroCreate
+COLUMNAS_LIBRO = ['isbn', 'titulo', 'descripcion', 'editorial', 'pais', 'idioma', 'num_paginas', 'ano_edicion', 'precio', 'ejemplares']
+
+# Función para leer las filas de la petición (array JSON o NDJSON)
+def leer_filas(cuerpo: bytes, ndjson: bool) -> list:
+    """
+    Función para convertir el cuerpo de la petición en una lista de filas
+
+    Las líneas NDJSON que no son JSON válido se devuelven como None para
+    informar del error en su posición.
+
+    Returns:
+    list: Filas sin validar
+
+    """
+    if not ndjson:
+        filas = json.loads(cuerpo)
+        if not isinstance(filas, list):
+            raise ValueError('Se esperaba un array JSON de libros')
+        return filas
+
+    filas = []
+    for linea in cuerpo.splitlines():
+        if not linea.strip():
+            continue
+        try:
+            filas.append(json.loads(linea))
+        except json.JSONDecodeError:
+            filas.append(None)
+
+    return filas
+
+# Función para consultar qué IDs de un conjunto existen en una tabla
+async def ids_existentes(db: AsyncSession, columna, ids: set) -> set:
+    if not ids:
+        return set()
+    return set((await db.scalars(select(columna).where(columna.in_(ids)))).all())
+
+async def importar_libros(db: AsyncSession, filas: list) -> dict:
+    """
+    Función para validar e insertar libros en bloque
+
+    Las validaciones se hacen con consultas por conjuntos (ISBN existentes, géneros
+    y autores) y las inserciones en lotes de TAMANO_LOTE por transacción. Un error
+    en una fila no impide insertar las demás.
+
+    Returns:
+    dict: Total de filas, libros insertados y errores por fila
+
+    """
+    errores = []
+    validos = []
+    isbns_vistos = set()
+
+    # Validación del esquema de cada fila
+    candidatos = []
+    for posicion, fila in enumerate(filas):
+        if fila is None:
+            errores.append({'fila': posicion, 'error': 'JSON no válido'})
+            continue
+
+        try:
+            candidatos.append((posicion, LibroCreate.model_validate(fila)))
+        except ValidationError as e:
+            errores.append({'fila': posicion, 'isbn': fila.get('isbn') if isinstance(fila, dict) else None, 'error': str(e.errors()[0]['msg'])})
+
+    # Validación y normalización de todos los ISBN de una vez, y de repetidos dentro de la propia entrada
+    for (posicion, libro), isbn in zip(candidatos, normalizar_lote(libro.isbn for _, libro in candidatos)):
+        if isbn is None:
+            errores.append({'fila': posicion, 'isbn': libro.isbn, 'error': 'El ISBN no es válido'})
+        elif isbn in isbns_vistos:
+            errores.append({'fila': posicion, 'isbn': libro.isbn, 'error': 'ISBN repetido en la importación'})
+        else:
+            isbns_vistos.add(isbn)
+            libro.isbn = isbn
+            validos.append((posicion, libro))
+
+    # Se comprueban a la vez todos los géneros (en el registro en memoria) y autores referenciados
+    generos_pedidos = {id for _, libro in validos for id in libro.generos}
+    generos = generos_pedidos - set(await registro_generos.faltan(db, generos_pedidos))
+    autores = await ids_existentes(db, Autor.id, {id for _, libro in validos for id in libro.autores})
+
+    insertados = 0
+    for inicio in range(0, len(validos), TAMANO_LOTE):
+        lote = validos[inicio:inicio + TAMANO_LOTE]
+
+        # ISBN que ya existen en la base de datos para este lote (en cualquiera de sus formas)
+        existentes = await ids_existentes(db, Libro.isbn, {forma for _, libro in lote for forma in formas_isbn(libro.isbn)})
+
+        a_insertar = []
+        for posicion, libro in lote:
+            if not existentes.isdisjoint(formas_isbn(libro.isbn)):
+                errores.append({'fila': posicion, 'isbn': libro.isbn, 'error': 'El libro ya existe'})
+            elif not set(libro.generos) <= generos:
+                errores.append({'fila': posicion, 'isbn': libro.isbn, 'error': 'Uno o más géneros no existen'})
+            elif not set(libro.autores) <= autores:
+                errores.append({'fila': posicion, 'isbn': libro.isbn, 'error': 'Uno o más autores no existen'})
+            else:
+                a_insertar.append((posicion, libro))
+
+        if not a_insertar:
+            continue
+
+        try:
+            # Insertamos los libros en una sola sentencia y recuperamos sus IDs
+            resultado = await db.execute(
+                insert(Libro).returning(Libro.id, Libro.isbn),
+                [{**{columna: getattr(libro, columna) for columna in COLUMNAS_LIBRO}, 'disponibles': libro.ejemplares} for _, libro in a_insertar],
+            )
+            ids = {isbn: id for id, isbn in resultado.all()}
+
+            # Insertamos las filas de las tablas de relación con executemany
+            filas_generos = [{'libro_id': ids[libro.isbn], 'genero_id': genero_id} for _, libro in a_insertar for genero_id in set(libro.generos)]
+            filas_autores = [{'libro_id': ids[libro.isbn], 'autor_id': autor_id} for _, libro in a_insertar for autor_id in set(libro.autores)]
+
+            if filas_generos:
+                await db.execute(insert(libros_generos), filas_generos)
+            if filas_autores:
+                await db.execute(insert(libros_autores), filas_autores)
+
+            await db.commit()
+            insertados += len(a_insertar)
+        except SQLAlchemyError as e:
+            # Si falla el lote (por ejemplo, un ISBN insertado a la vez por otra petición)
+            # se descarta entero y se informa en cada una de sus filas
+            await db.rollback()
+            error = f'Error insertando el lote: {e.__class__.__name__}'
+            errores.extend({'fila': posicion, 'isbn': libro.isbn, 'error': error} for posicion, libro in a_insertar)
+
+    errores.sort(key=lambda error: error['fila'])
+
+    return {'total': len(filas), 'insertados': insertados, 'errores': errores}
+
+# ----------------------------- ACTUALIZACIÓN MASIVA -----------------------------
+# Campos de Libro que se pueden cambiar con la actualización masiva
+CAMPOS_ACTUALIZABLES = ['titulo', 'descripcion', 'editorial', 'pais', 'idioma', 'num_paginas', 'ano_edicion', 'precio']
+
+async def actualizar_grupo(db: AsyncSession, campos: tuple, filas: list) -> dict:
+    """
+    Función para actualizar con una sola sentencia varios libros que cambian los mismos campos
+
+    En PostgreSQL es un UPDATE ... FROM (VALUES ...) que devuelve los libros
+    actualizados. SQLite no admite nombres de columna en VALUES, así que se usa
+    un executemany y se leen después los libros.
+
+    Returns:
+    dict: ISBN de los libros actualizados por su ID
+
+    """
+    columnas = Libro.__table__.c
+
+    if db.bind.dialect.name == 'postgresql':
+        cambios = values(
+            column('id', columnas.id.type), *[column(campo, columnas[campo].type) for campo in campos], name='cambios'
+        ).data([(id, *[valores[campo] for campo in campos]) for id, valores in filas])
+
+        resultado = await db.execute(
+            update(Libro)
+            .where(Libro.id == cambios.c.id)
+            .values({**{campo: cambios.c[campo] for campo in campos}, 'updated_at': func.now()})
+            .returning(Libro.id, Libro.isbn)
+            .execution_options(synchronize_session=False)
+        )
+        return dict(resultado.all())
+
+    await db.execute(
+        update(Libro.__table__)
+        .where(columnas.id == bindparam('b_id'))
+        .values({**{campo: bindparam(campo) for campo in campos}, 'updated_at': func.now()}),
+        [{'b_id': id, **valores} for id, valores in filas],
+    )
+    return dict((await db.execute(select(Libro.id, Libro.isbn).where(Libro.id.in_([id for id, _ in filas])))).all())
+
+async def actualizar_libros(db: AsyncSession, libros: list) -> dict:
+    """
+    Función para actualizar campos de muchos libros indicados por ID o ISBN
+
+    Los libros se procesan en lotes de TAMANO_LOTE por transacción. En cada lote
+    se resuelven los ISBN con una consulta y se agrupan los libros por los campos
+    que cambian: cada grupo es una sola sentencia UPDATE. Si un libro aparece
+    varias veces, se aplica su última aparición.
+
+    Returns:
+    dict: Total de elementos, libros actualizados y resultado de cada elemento
+
+    """
+    resultados = [
+        {'fila': posicion, 'id': libro.id, 'isbn': libro.isbn, 'actualizado': False, 'error': None}
+        for posicion, libro in enumerate(libros)
+    ]
+
+    # Validación de cada elemento y normalización de todos los ISBN de una vez
+    candidatos = []
+    for posicion, (libro, isbn) in enumerate(zip(libros, normalizar_lote(libro.isbn for libro in libros))):
+        resultado = resultados[posicion]
+        cambios = libro.model_dump(include=set(CAMPOS_ACTUALIZABLES), exclude_none=True)
+
+        if (libro.id is None) == (libro.isbn is None):
+            resultado['error'] = 'Se debe indicar el id o el isbn del libro, pero no los dos'
+        elif libro.isbn is not None and isbn is None:
+            resultado['error'] = 'El ISBN no es válido'
+        elif not cambios:
+            resultado['error'] = 'No hay campos que actualizar'
+        else:
+            if isbn:
+                resultado['isbn'] = isbn
+            candidatos.append((posicion, cambios))
+
+    actualizados = 0
+    for inicio in range(0, len(candidatos), TAMANO_LOTE):
+        lote = candidatos[inicio:inicio + TAMANO_LOTE]
+
+        try:
+            # IDs de los libros indicados por ISBN (en cualquiera de sus formas)
+            isbns = {resultados[posicion]['isbn'] for posicion, _ in lote if resultados[posicion]['id'] is None}
+            ids_por_isbn = {}
+            if isbns:
+                filas = await db.execute(select(Libro.id, Libro.isbn).where(Libro.isbn.in_({forma for isbn in isbns for forma in formas_isbn(isbn)})))
+                ids_por_isbn = {normalizar_isbn(isbn): id for id, isbn in filas.all()}
+
+            # Última aparición de cada libro del lote
+            ultimos = {}
+            for posicion, cambios in lote:
+                resultado = resultados[posicion]
+                id = resultado['id'] if resultado['id'] is not None else ids_por_isbn.get(resultado['isbn'])
+                if id is None:
+                    resultado['error'] = 'Libro no encontrado'
+                    continue
+
+                resultado['id'] = id
+                if id in ultimos:
+                    resultados[ultimos[id][0]]['error'] = 'Libro repetido en la actualización: se aplica su última aparición'
+                ultimos[id] = (posicion, cambios)
+
+            # Un UPDATE por cada combinación de campos
+            grupos = defaultdict(list)
+            for id, (_, cambios) in ultimos.items():
+                grupos[tuple(sorted(cambios))].append((id, cambios))
+
+            actualizados_lote = {}
+            for campos, filas in grupos.items():
+                actualizados_lote.update(await actualizar_grupo(db, campos, filas))
+
+            await db.commit()
+        except SQLAlchemyError as e:
+            # Si falla el lote se descarta entero y se informa en cada uno de sus elementos
+            await db.rollback()
+            error = f'Error actualizando el lote: {e.__class__.__name__}'
+            for posicion, _ in lote:
+                resultados[posicion]['error'] = resultados[posicion]['error'] or error
+            continue
+
+        for id, (posicion, _) in ultimos.items():
+            if id in actualizados_lote:
+                resultados[posicion]['actualizado'] = True
+                invalidar_libro(id, resultados[posicion]['isbn'], actualizados_lote[id])
+            else:
+                resultados[posicion]['error'] = 'Libro no encontrado'
+
+        actualizados += sum(1 for id in ultimos if id in actualizados_lote)
+
+    return {'total': len(libros), 'actualizados': actualizados, 'resultados': resultados}
@@ -0,0 +1,132 @@
+# Funciones para validar y normalizar ISBN
+
+from functools import lru_cache
+from typing import Iterable, Optional
+
+# Caracteres que se ignoran al leer un ISBN
+SEPARADORES = str.maketrans('', '', '- ')
+
+# Pesos de la suma de control de ISBN-10 (10..2) e ISBN-13 (1, 3, 1, 3...)
+PESOS_10 = range(10, 1, -1)
+PESOS_13 = (1, 3) * 6
+
+# Valor de cada carácter multiplicado por el peso de cada posición, para los lotes. Solo
+# tienen los dígitos ASCII (y la X del control de ISBN-10)
+DIGITOS = '0123456789'
+def tabla_pesos(pesos: Iterable[int], x: bool = False) -> list[dict]:
+    tablas = [{d: int(d) * p for d in DIGITOS} for p in pesos]
+    if x:
+        tablas[-1]['X'] = 10 * pesos[-1]
+    return tablas
+
+# Suma completa: incluye el dígito de control, que tiene peso 1
+TABLAS_10 = tabla_pesos(range(10, 0, -1), x=True)
+TABLAS_13 = tabla_pesos(PESOS_13 + (1,))
+# Los 12 primeros dígitos del ISBN-13 que se forma con 978 y un ISBN-10
+TABLAS_978 = tabla_pesos(PESOS_13[3:])
+SUMA_978 = sum(int(d) * p for d, p in zip('978', PESOS_13))
+
+# Función para quitar guiones y espacios y pasar la X final a mayúscula
+def limpiar_isbn(isbn: str) -> str:
+    return isbn.translate(SEPARADORES).upper()
+
+# Función para saber si una cadena tiene solo dígitos ASCII. isdigit() acepta también otros
+# dígitos Unicode, como '²' o '٣', que int() no siempre sabe convertir
+def es_numerico(cadena: str) -> bool:
+    return cadena.isascii() and cadena.isdigit()
+
+# Función para calcular el dígito de control de los 9 primeros dígitos de un ISBN-10
+def control_isbn10(digitos: str) -> str:
+    resto = (11 - sum(int(d) * p for d, p in zip(digitos, PESOS_10)) % 11) % 11
+    return 'X' if resto == 10 else str(resto)
+
+# Función para calcular el dígito de control de los 12 primeros dígitos de un ISBN-13
+def control_isbn13(digitos: str) -> str:
+    return str((10 - sum(int(d) * p for d, p in zip(digitos, PESOS_13)) % 10) % 10)
+
+@lru_cache(maxsize=65536)
+def normalizar_isbn(isbn: str) -> Optional[str]:
+    """
+    Función para obtener la forma canónica (ISBN-13 sin guiones) de un ISBN
+
+    Acepta ISBN-10 e ISBN-13 con o sin guiones. El resultado se memoriza porque
+    los mismos ISBN se consultan una y otra vez.
+
+    Returns:
+    str: ISBN-13 canónico o None si el ISBN no es válido
+
+    """
+    if not isbn:
+        return None
+
+    isbn = limpiar_isbn(isbn)
+
+    if len(isbn) == 10 and es_numerico(isbn[:9]) and (es_numerico(isbn[9]) or isbn[9] == 'X'):
+        if control_isbn10(isbn[:9]) != isbn[9]:
+            return None
+        base = '978' + isbn[:9]
+        return base + control_isbn13(base)
+
+    if len(isbn) == 13 and es_numerico(isbn) and isbn[:3] in ('978', '979'):
+        return isbn if control_isbn13(isbn[:12]) == isbn[12] else None
+
+    return None
+
+# Función para calcular a la vez las sumas ponderadas de muchas cadenas de la misma longitud.
+# Se recorre el lote por columnas (una por posición) para que los bucles los hagan map y sum
+def sumas_ponderadas(cadenas: list[str], tablas: list[dict]) -> Iterable[int]:
+    columnas = [map(tabla.__getitem__, columna) for tabla, columna in zip(tablas, zip(*cadenas))]
+    return map(sum, zip(*columnas))
+
+def normalizar_lote(isbns: Iterable[str]) -> list[Optional[str]]:
+    """
+    Función para normalizar un lote de ISBN de una vez (importaciones masivas)
+
+    Da el mismo resultado que normalizar_isbn con cada uno, pero calcula las sumas de
+    control de todo el lote a la vez, sin pasar por la caché de normalizar_isbn (los
+    ISBN de una importación no se suelen repetir).
+
+    Returns:
+    list: ISBN-13 canónico de cada ISBN o None si no es válido
+
+    """
+    limpios = [limpiar_isbn(isbn) if isbn else '' for isbn in isbns]
+    resultado = [None] * len(limpios)
+
+    isbn13 = [
+        (posicion, isbn) for posicion, isbn in enumerate(limpios)
+        if len(isbn) == 13 and es_numerico(isbn) and isbn[:3] in ('978', '979')
+    ]
+    isbn10 = [
+        (posicion, isbn) for posicion, isbn in enumerate(limpios)
+        if len(isbn) == 10 and es_numerico(isbn[:9]) and (es_numerico(isbn[9]) or isbn[9] == 'X')
+    ]
+
+    # Un ISBN-13 es válido si su suma ponderada completa es múltiplo de 10
+    for (posicion, isbn), suma in zip(isbn13, sumas_ponderadas([isbn for _, isbn in isbn13], TABLAS_13)):
+        if suma % 10 == 0:
+            resultado[posicion] = isbn
+
+    # Un ISBN-10 es válido si su suma ponderada completa es múltiplo de 11
+    validos = [
+        (posicion, isbn[:9]) for (posicion, isbn), suma in zip(isbn10, sumas_ponderadas([isbn for _, isbn in isbn10], TABLAS_10))
+        if suma % 11 == 0
+    ]
+
+    # Y se pasa a ISBN-13 con el prefijo 978 y un nuevo dígito de control
+    for (posicion, digitos), suma in zip(validos, sumas_ponderadas([digitos for _, digitos in validos], TABLAS_978)):
+        resultado[posicion] = f'978{digitos}{(10 - (SUMA_978 + suma) % 10) % 10}'
+
+    return resultado
+
+# Función para obtener el ISBN-10 equivalente de un ISBN-13 con prefijo 978
+def isbn13_a_isbn10(isbn13: str) -> Optional[str]:
+    if not isbn13.startswith('978'):
+        return None
+    return isbn13[3:12] + control_isbn10(isbn13[3:12])
+
+# Función para obtener las formas con las que puede estar guardado un ISBN canónico.
+# Los libros dados de alta antes de normalizar pueden tener guardado el ISBN-10
+def formas_isbn(isbn13: str) -> list[str]:
+    isbn10 = isbn13_a_isbn10(isbn13)
+    return [isbn13, isbn10] if isbn10 else [isbn13]
@@ -1,11 +1,53 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
+import queue
+
+# Tamaño máximo de la cola de logs. Si se llena, los registros se descartan
+# en lugar de bloquear la petición que los genera
+TAMANO_COLA = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+# Atributos estándar de un LogRecord. El resto son campos extra del registro
+ATRIBUTOS_RECORD = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+# Formateador que escribe cada registro como una línea JSON
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        linea = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+
+        # Añadimos los campos pasados con extra={...}
+        for clave, valor in vars(record).items():
+            if clave not in ATRIBUTOS_RECORD:
+                linea[clave] = valor
+
+        return json.dumps(linea, ensure_ascii=False, default=str)
+
+# Handler que encola sin bloquear y cuenta los registros descartados
+class ColaHandler(QueueHandler):
+    def __init__(self, cola):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+# Cola, handler y listener compartidos por todo el proceso
+cola_logs = queue.Queue(maxsize=TAMANO_COLA)
+cola_handler = ColaHandler(cola_logs)
+listener = None
 
 def setup_logger():
-    # Crea el directorio de logs si no existe
-    if not os.path.exists('logs'):
-        os.mkdir('logs')
+    global listener
 
     # Logger para usuarios
     user_logger = logging.getLogger('user_activity')
@@ -15,20 +57,50 @@ def setup_logger():
     internal_logger = logging.getLogger('internal_activity')
     internal_logger.setLevel(logging.DEBUG)
 
-    if not user_logger.handlers:
+    if listener is None:
+        # Crea el directorio de logs si no existe
+        if not os.path.exists('logs'):
+            os.mkdir('logs')
+
         # Formato de logs
-        formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
+        formatter = JSONFormatter()
 
         # Handler para logs de usuarios
         file_handler = RotatingFileHandler('logs/user_activity.log', maxBytes=5_000_000, backupCount=3)
         file_handler.setFormatter(formatter)
+        file_handler.addFilter(lambda record: record.name == 'user_activity')
 
         # Handler para logs internos
         internal_file_handler = RotatingFileHandler('logs/internal_activity.log', maxBytes=5_000_000, backupCount=3)
         internal_file_handler.setFormatter(formatter)
+        internal_file_handler.addFilter(lambda record: record.name == 'internal_activity')
+
+        # Los loggers solo encolan; la escritura y la rotación de los ficheros
+        # se hacen en el hilo del listener, fuera de las peticiones
+        listener = QueueListener(cola_logs, file_handler, internal_file_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(detener_logger)
+
+    # Añadir el handler de la cola a los loggers
+    if cola_handler not in user_logger.handlers:
+        user_logger.addHandler(cola_handler)
+    if cola_handler not in internal_logger.handlers:
+        internal_logger.addHandler(cola_handler)
+
+    return user_logger, internal_logger
+
+# Función para vaciar la cola y parar el hilo de escritura
+def detener_logger():
+    global listener
 
-        # Añadir los handlers a los loggers
-        user_logger.addHandler(file_handler)
-        internal_logger.addHandler(internal_file_handler)
+    if listener is not None:
+        listener.stop()
+        listener = None
 
-    return user_logger, internal_logger
\ No newline at end of file
+# Función para obtener las estadísticas de la cola de logs
+def get_log_stats():
+    return {
+        'pendientes': cola_logs.qsize(),
+        'capacidad': TAMANO_COLA,
+        'descartados': cola_handler.descartados,
+    }
@@ -0,0 +1,221 @@
+# Métricas de la API en el formato de texto de Prometheus (endpoint /metrics)
+#
+# Las métricas de las peticiones solo se actualizan desde el middleware, que se ejecuta
+# en el hilo del bucle de eventos, así que no necesitan bloqueos. Las consultas a la base
+# de datos también pueden ejecutarse en hilos (motor síncrono), por eso se cuentan por hilo
+# y se suman al exponerlas.
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from fastapi.routing import iter_route_contexts
+from sqlalchemy import event
+from starlette.routing import Match
+
+# Límites de los buckets del histograma de duración de las peticiones (segundos)
+BUCKETS_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Etiqueta de las peticiones que no coinciden con ninguna ruta (evita una serie por cada URL)
+SIN_RUTA = 'sin_ruta'
+
+class ConsultasPeticion:
+    # Consultas a la base de datos hechas durante una petición
+    __slots__ = ('consultas', 'segundos')
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+# Acumulador de consultas de la petición en curso. Las tareas y los hilos que lanza la
+# petición heredan una copia del contexto, así que comparten el mismo acumulador
+consultas_peticion: ContextVar = ContextVar('consultas_peticion', default=None)
+
+class MetricasRuta:
+    # Métricas de una ruta (método y plantilla de la ruta)
+    __slots__ = ('buckets', 'suma', 'total', 'estados', 'consultas_db', 'segundos_db')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_DURACION) + 1)
+        self.suma = 0.0
+        self.total = 0
+        self.estados = {}
+        self.consultas_db = 0
+        self.segundos_db = 0.0
+
+class ContadoresHilo:
+    """
+    Contadores de consultas a la base de datos con un acumulador por hilo
+
+    Cada hilo solo escribe en su propio acumulador; al exponer las métricas
+    se suman todos.
+
+    """
+    def __init__(self):
+        self.local = threading.local()
+        self.acumuladores = []
+
+    def acumulador(self) -> list:
+        acumulador = getattr(self.local, 'acumulador', None)
+        if acumulador is None:
+            acumulador = self.local.acumulador = [0, 0.0]
+            self.acumuladores.append(acumulador)
+        return acumulador
+
+    def totales(self) -> tuple[int, float]:
+        acumuladores = list(self.acumuladores)
+        return sum(a[0] for a in acumuladores), sum(a[1] for a in acumuladores)
+
+class MetricasAPI:
+    def __init__(self):
+        self.rutas = {}
+        # Peticiones en curso por (método, ruta)
+        self.en_curso = {}
+        self.consultas = ContadoresHilo()
+
+    def inicio_peticion(self, metodo: str, ruta: str):
+        """
+        Función para registrar el inicio de una petición
+
+        Returns:
+        tuple: Acumulador de consultas de la petición y token para restaurar el contexto
+
+        """
+        self.en_curso[(metodo, ruta)] = self.en_curso.get((metodo, ruta), 0) + 1
+        consultas = ConsultasPeticion()
+        return consultas, consultas_peticion.set(consultas)
+
+    def fin_peticion(self, metodo: str, ruta: str, estado: int, duracion: float, consultas: ConsultasPeticion, token):
+        consultas_peticion.reset(token)
+        self.en_curso[(metodo, ruta)] -= 1
+
+        metricas = self.rutas.get((metodo, ruta))
+        if metricas is None:
+            metricas = self.rutas[(metodo, ruta)] = MetricasRuta()
+
+        metricas.buckets[bisect.bisect_left(BUCKETS_DURACION, duracion)] += 1
+        metricas.suma += duracion
+        metricas.total += 1
+        metricas.estados[estado] = metricas.estados.get(estado, 0) + 1
+        metricas.consultas_db += consultas.consultas
+        metricas.segundos_db += consultas.segundos
+
+    def exponer(self, estadisticas: dict) -> str:
+        """
+        Función para generar el texto de las métricas en formato Prometheus
+
+        Las estadísticas extra (pool, cachés, tareas) se exponen como gauges con
+        el nombre formado por sus claves.
+
+        Returns:
+        str: Métricas en formato de texto de Prometheus
+
+        """
+        lineas = ['# HELP api_peticiones_en_curso Peticiones que se están atendiendo por ruta', '# TYPE api_peticiones_en_curso gauge']
+        for (metodo, ruta), cantidad in sorted(self.en_curso.items()):
+            lineas.append(f'api_peticiones_en_curso{{metodo="{metodo}",ruta="{escapar(ruta)}"}} {cantidad}')
+
+        lineas += ['# HELP api_peticion_duracion_seconds Duración de las peticiones por ruta', '# TYPE api_peticion_duracion_seconds histogram']
+
+        rutas = sorted(self.rutas.items())
+        for (metodo, ruta), metricas in rutas:
+            etiquetas = f'metodo="{metodo}",ruta="{escapar(ruta)}"'
+            acumulado = 0
+            for limite, cantidad in zip(BUCKETS_DURACION, metricas.buckets):
+                acumulado += cantidad
+                lineas.append(f'api_peticion_duracion_seconds_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'api_peticion_duracion_seconds_bucket{{{etiquetas},le="+Inf"}} {metricas.total}')
+            lineas.append(f'api_peticion_duracion_seconds_sum{{{etiquetas}}} {metricas.suma}')
+            lineas.append(f'api_peticion_duracion_seconds_count{{{etiquetas}}} {metricas.total}')
+
+        lineas += ['# HELP api_peticiones_total Peticiones por ruta y código de estado', '# TYPE api_peticiones_total counter']
+        for (metodo, ruta), metricas in rutas:
+            for estado, cantidad in sorted(metricas.estados.items()):
+                lineas.append(f'api_peticiones_total{{metodo="{metodo}",ruta="{escapar(ruta)}",estado="{estado}"}} {cantidad}')
+
+        lineas += ['# HELP api_peticion_consultas_db_total Consultas a la base de datos hechas por las peticiones de cada ruta', '# TYPE api_peticion_consultas_db_total counter']
+        for (metodo, ruta), metricas in rutas:
+            lineas.append(f'api_peticion_consultas_db_total{{metodo="{metodo}",ruta="{escapar(ruta)}"}} {metricas.consultas_db}')
+
+        lineas += ['# HELP api_peticion_db_seconds_total Tiempo en la base de datos de las peticiones de cada ruta', '# TYPE api_peticion_db_seconds_total counter']
+        for (metodo, ruta), metricas in rutas:
+            lineas.append(f'api_peticion_db_seconds_total{{metodo="{metodo}",ruta="{escapar(ruta)}"}} {metricas.segundos_db}')
+
+        # Todas las consultas del proceso, también las de las tareas periódicas y el arranque
+        consultas, segundos = self.consultas.totales()
+        lineas += [
+            '# HELP db_consultas_total Consultas ejecutadas en la base de datos',
+            '# TYPE db_consultas_total counter',
+            f'db_consultas_total {consultas}',
+            '# HELP db_consultas_seconds_total Tiempo total de las consultas a la base de datos',
+            '# TYPE db_consultas_seconds_total counter',
+            f'db_consultas_seconds_total {segundos}',
+        ]
+
+        for nombre, valor in aplanar(estadisticas):
+            lineas += [f'# TYPE {nombre} gauge', f'{nombre} {valor}']
+
+        return '\n'.join(lineas) + '\n'
+
+# Función para escapar los valores de las etiquetas
+def escapar(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Función para convertir estadísticas anidadas en pares (nombre, valor) numéricos
+def aplanar(estadisticas: dict, prefijo: str = ''):
+    for clave, valor in estadisticas.items():
+        nombre = f'{prefijo}_{clave}' if prefijo else str(clave)
+        if isinstance(valor, dict):
+            yield from aplanar(valor, nombre)
+        elif isinstance(valor, bool):
+            yield nombre, int(valor)
+        elif isinstance(valor, (int, float)):
+            yield nombre, valor
+
+# Métricas del proceso
+metricas_api = MetricasAPI()
+
+def plantilla_ruta(rutas: list, scope: dict) -> str:
+    """
+    Función para obtener la plantilla de la ruta que va a atender una petición ('/libros/{libro_id}')
+
+    Se resuelve al empezar la petición, antes de que la atienda el router, para
+    contarla en las peticiones en curso de su ruta. Se elige igual que el router:
+    la primera ruta que coincide del todo o, si no hay ninguna, la primera que
+    coincide en la URL pero no en el método (405). Las rutas de los routers incluidos
+    se recorren con su prefijo (iter_route_contexts).
+
+    Returns:
+    str: Plantilla de la ruta o SIN_RUTA
+
+    """
+    parcial = None
+    for ruta in iter_route_contexts(rutas):
+        coincidencia, _ = ruta.matches(scope)
+        if coincidencia == Match.FULL:
+            return ruta.path
+        if coincidencia == Match.PARTIAL and parcial is None:
+            parcial = ruta.path
+    return parcial or SIN_RUTA
+
+# ----------------------------- EVENTOS DE SQLALCHEMY -----------------------------
+def antes_consulta(conexion, cursor, sentencia, parametros, contexto, executemany):
+    contexto._inicio_metricas = time.perf_counter()
+
+def despues_consulta(conexion, cursor, sentencia, parametros, contexto, executemany):
+    duracion = time.perf_counter() - contexto._inicio_metricas
+
+    acumulador = metricas_api.consultas.acumulador()
+    acumulador[0] += 1
+    acumulador[1] += duracion
+
+    consultas = consultas_peticion.get()
+    if consultas is not None:
+        consultas.consultas += 1
+        consultas.segundos += duracion
+
+# Función para medir las consultas de un motor síncrono (con el asíncrono, su sync_engine)
+def registrar_eventos_bd(engine):
+    event.listen(engine, 'before_cursor_execute', antes_consulta)
+    event.listen(engine, 'after_cursor_execute', despues_consulta)
@@ -0,0 +1,153 @@
+# Migraciones versionadas del esquema de la base de datos
+#
+# Cada migración es un módulo mNNNN_<descripcion>.py con REVISION, DESCRIPCION y una
+# función aplicar(conexion). Se aplican en orden con la línea de comandos:
+#
+#     python -m migraciones upgrade
+#
+# y la tabla schema_version guarda las que ya se han aplicado.
+
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Table, Column, Integer, String, MetaData, inspect, select, insert, func, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, OperationalError, ProgrammingError
+
+# Clave del bloqueo consultivo de PostgreSQL para que dos procesos no migren a la vez
+CLAVE_BLOQUEO_MIGRACIONES = 2_718_281_828
+
+# Tabla con las revisiones aplicadas. No forma parte de Base para que create_all no la toque
+metadata_versiones = MetaData()
+schema_version = Table(
+    'schema_version',
+    metadata_versiones,
+    Column('revision', Integer, primary_key=True),
+    Column('descripcion', String, nullable=False),
+    Column('aplicada_en', String, nullable=False),
+)
+
+# ----------------------------- UTILIDADES PARA LAS MIGRACIONES -----------------------------
+# Las migraciones deben poder aplicarse sobre bases de datos creadas antes con create_all,
+# así que no fallan si la tabla, la columna o el índice ya existen
+
+def tiene_columna(conexion: Connection, tabla: str, columna: str) -> bool:
+    return any(c['name'] == columna for c in inspect(conexion).get_columns(tabla))
+
+def es_texto(conexion: Connection, tabla: str, columna: str) -> bool:
+    return any(c['name'] == columna and isinstance(c['type'], String) for c in inspect(conexion).get_columns(tabla))
+
+def crear_indice(conexion: Connection, nombre: str, tabla: str, columnas: str, unico: bool = False):
+    unique = 'UNIQUE ' if unico else ''
+    conexion.execute(text(f'CREATE {unique}INDEX IF NOT EXISTS {nombre} ON {tabla} ({columnas})'))
+
+# ----------------------------- CARGA Y APLICACIÓN -----------------------------
+def cargar_migraciones() -> list:
+    """
+    Función para cargar los módulos de migración ordenados por revisión
+
+    Returns:
+    list: Módulos de migración
+
+    """
+    migraciones = [
+        importlib.import_module(f'{__name__}.{modulo.name}')
+        for modulo in pkgutil.iter_modules(__path__)
+        if modulo.name[0] == 'm' and modulo.name[1:5].isdigit()
+    ]
+    migraciones.sort(key=lambda migracion: migracion.REVISION)
+
+    # Las revisiones tienen que ser consecutivas y empezar en 1
+    for esperada, migracion in enumerate(migraciones, start=1):
+        if migracion.REVISION != esperada:
+            raise RuntimeError(f'Falta la migración {esperada} (encontrada {migracion.REVISION} en {migracion.__name__})')
+
+    return migraciones
+
+# Revisión del esquema que necesita el código
+def revision_esperada() -> int:
+    return len(cargar_migraciones())
+
+# Función para saber si un error es el de una tabla que no existe (código SQLSTATE 42P01 en
+# PostgreSQL, con psycopg2 o asyncpg, y 'no such table' en SQLite). Los demás errores de
+# conexión o de permisos no se pueden confundir con una base de datos sin migraciones
+def tabla_inexistente(error: DBAPIError) -> bool:
+    return getattr(error.orig, 'pgcode', None) == '42P01' or str(error.orig).startswith('no such table')
+
+def revision_actual(conexion: Connection) -> int:
+    """
+    Función para obtener la revisión aplicada en la base de datos
+
+    Returns:
+    int: Última revisión aplicada (0 si no se ha aplicado ninguna)
+
+    """
+    # Una sola consulta: si falla porque la tabla no existe, no se ha aplicado ninguna
+    try:
+        return conexion.scalar(select(func.max(schema_version.c.revision))) or 0
+    except (ProgrammingError, OperationalError) as e:
+        if not tabla_inexistente(e):
+            raise
+        return 0
+
+# Función para tomar el bloqueo consultivo de las migraciones hasta el final de la transacción
+def bloquear(conexion: Connection):
+    if conexion.dialect.name == 'postgresql':
+        conexion.execute(select(func.pg_advisory_xact_lock(CLAVE_BLOQUEO_MIGRACIONES)))
+
+def aplicar_migraciones(engine: Engine, hasta: int = None) -> list:
+    """
+    Función para aplicar las migraciones pendientes
+
+    Cada migración se aplica en su propia transacción junto con su registro en
+    schema_version. En PostgreSQL se toma un bloqueo consultivo y se vuelve a leer
+    la revisión, así que varios procesos pueden lanzarla a la vez sin aplicar nada dos veces.
+
+    Returns:
+    list: Revisiones aplicadas
+
+    """
+    # La tabla schema_version se crea con el bloqueo tomado y en la misma transacción: si
+    # no, dos procesos que arrancan a la vez pueden intentar crearla los dos
+    with engine.begin() as conexion:
+        bloquear(conexion)
+        metadata_versiones.create_all(conexion)
+
+    aplicadas = []
+    for migracion in cargar_migraciones():
+        if hasta is not None and migracion.REVISION > hasta:
+            break
+
+        with engine.begin() as conexion:
+            bloquear(conexion)
+
+            if migracion.REVISION <= revision_actual(conexion):
+                continue
+
+            migracion.aplicar(conexion)
+            conexion.execute(insert(schema_version).values(
+                revision=migracion.REVISION,
+                descripcion=migracion.DESCRIPCION,
+                aplicada_en=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            ))
+
+        aplicadas.append(migracion.REVISION)
+
+    return aplicadas
+
+def comprobar_revision(engine: Engine) -> tuple:
+    """
+    Función para comprobar en el arranque que el esquema está al día
+
+    Si la tabla schema_version no existe, la revisión es 0. Los demás errores (la
+    base de datos no responde, permisos...) no se ocultan: se propagan.
+
+    Returns:
+    tuple: (revisión de la base de datos, revisión que necesita el código)
+
+    """
+    with engine.connect() as conexion:
+        actual = revision_actual(conexion)
+
+    return actual, revision_esperada()
@@ -0,0 +1,40 @@
+# Línea de comandos de las migraciones. Se ejecuta desde la carpeta app:
+#
+#     python -m migraciones upgrade [--hasta N]   Aplica las migraciones pendientes
+#     python -m migraciones current               Muestra la revisión de la base de datos
+#     python -m migraciones history               Lista las migraciones y si están aplicadas
+
+import argparse
+
+from database import engine
+from migraciones import cargar_migraciones, aplicar_migraciones, revision_actual
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m migraciones', description='Migraciones del esquema de la base de datos')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    upgrade = comandos.add_parser('upgrade', help='Aplicar las migraciones pendientes')
+    upgrade.add_argument('--hasta', type=int, default=None, help='Última revisión que se aplica')
+    comandos.add_parser('current', help='Mostrar la revisión de la base de datos')
+    comandos.add_parser('history', help='Listar las migraciones')
+
+    args = parser.parse_args()
+
+    if args.comando == 'upgrade':
+        aplicadas = aplicar_migraciones(engine, hasta=args.hasta)
+        print(f'Migraciones aplicadas: {aplicadas}' if aplicadas else 'El esquema ya está al día')
+        return
+
+    with engine.connect() as conexion:
+        actual = revision_actual(conexion)
+
+    if args.comando == 'current':
+        print(f'Revisión de la base de datos: {actual}')
+        return
+
+    for migracion in cargar_migraciones():
+        marca = 'x' if migracion.REVISION <= actual else ' '
+        print(f'[{marca}] {migracion.REVISION:04d} {migracion.DESCRIPCION}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Migración 1: tablas iniciales de la biblioteca
+#
+# Copia fija del esquema original (el que creaba create_all). No se importan los
+# modelos para que esta migración no cambie cuando cambien ellos.
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, Date, DateTime, ForeignKey, Numeric
+from sqlalchemy.engine import Connection
+
+REVISION = 1
+DESCRIPCION = 'Tablas iniciales: libros, autores, géneros, usuarios y préstamos'
+
+metadata = MetaData()
+
+Table(
+    'libros', metadata,
+    Column('id', Integer, primary_key=True, index=True),
+    Column('isbn', String(13), index=True, unique=True, nullable=True),
+    Column('titulo', String, nullable=False),
+    Column('descripcion', String, nullable=True),
+    Column('editorial', String, nullable=True),
+    Column('pais', String, nullable=True),
+    Column('idioma', String, nullable=True),
+    Column('num_paginas', Integer, nullable=True),
+    Column('ano_edicion', Integer, nullable=True),
+    Column('precio', Numeric(10, 2), nullable=True),
+    Column('created_at', String, nullable=False),
+    Column('updated_at', String, nullable=True),
+)
+
+Table(
+    'autores', metadata,
+    Column('id', Integer, primary_key=True, index=True),
+    Column('nombre', String, nullable=False),
+    Column('apellido', String, nullable=False),
+    Column('nacionalidad', String, nullable=False),
+    Column('fecha_nacimiento', String, nullable=False),
+    Column('fecha_fallecimiento', String, nullable=True),
+    Column('biografia', String, nullable=False),
+    Column('imagen', String, nullable=True),
+    Column('created_at', String, nullable=False),
+    Column('updated_at', String, nullable=True),
+)
+
+Table(
+    'generos', metadata,
+    Column('id', Integer, primary_key=True, index=True),
+    Column('nombre', String, nullable=False),
+    Column('descripcion', String, nullable=True),
+    Column('created_at', String, nullable=False),
+    Column('updated_at', String, nullable=True),
+)
+
+Table(
+    'users', metadata,
+    Column('id', Integer, primary_key=True, index=True),
+    Column('email', String, unique=True, nullable=False),
+    Column('nombre', String, nullable=False),
+    Column('apellido', String, nullable=False),
+    Column('fecha_nacimiento', Date, nullable=False),
+    Column('dni', String, nullable=False, unique=True),
+    Column('pais', String, nullable=False),
+    Column('ciudad', String, nullable=False),
+    Column('direccion', String, nullable=False),
+    Column('telefono', String, nullable=False),
+    Column('password', String, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    Column('updated_at', DateTime, nullable=True),
+)
+
+Table(
+    'prestamos', metadata,
+    Column('id', Integer, primary_key=True, index=True),
+    Column('fecha_prestamo', Date, nullable=False),
+    Column('fecha_devolucion', Date, nullable=False),
+    Column('estado', String, nullable=False),
+    Column('usuario_id', Integer, ForeignKey('users.id')),
+)
+
+Table(
+    'prestamos_libros', metadata,
+    Column('prestamo_id', Integer, ForeignKey('prestamos.id'), primary_key=True),
+    Column('libro_id', Integer, ForeignKey('libros.id'), primary_key=True),
+)
+
+Table(
+    'libros_generos', metadata,
+    Column('libro_id', Integer, ForeignKey('libros.id'), primary_key=True),
+    Column('genero_id', Integer, ForeignKey('generos.id'), primary_key=True),
+)
+
+Table(
+    'libros_autores', metadata,
+    Column('libro_id', Integer, ForeignKey('libros.id'), primary_key=True),
+    Column('autor_id', Integer, ForeignKey('autores.id'), primary_key=True),
+)
+
+def aplicar(conexion: Connection):
+    # checkfirst: las bases de datos creadas con create_all ya tienen estas tablas
+    metadata.create_all(conexion, checkfirst=True)
@@ -0,0 +1,93 @@
+# Migración 2: índices de consulta
+#
+# create_all no añade índices a tablas que ya existen, así que las bases de datos
+# creadas antes de declararlos en los modelos no los tienen.
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from migraciones import crear_indice
+
+REVISION = 2
+DESCRIPCION = 'Índices de filtros, tablas de relación, préstamos y búsqueda de texto'
+
+# (nombre, tabla, columnas)
+INDICES = [
+    # Filtros por igualdad del listado de libros con el ID para la paginación por cursor
+    ('ix_libros_idioma_id', 'libros', 'idioma, id'),
+    ('ix_libros_pais_id', 'libros', 'pais, id'),
+    ('ix_libros_editorial_id', 'libros', 'editorial, id'),
+    # Filtros por rango: las filas no salen ordenadas por ID, así que basta con la columna
+    ('ix_libros_ano_edicion', 'libros', 'ano_edicion'),
+    ('ix_libros_precio', 'libros', 'precio'),
+    # Índices inversos de las tablas de relación
+    ('ix_libros_generos_genero_id_libro_id', 'libros_generos', 'genero_id, libro_id'),
+    ('ix_libros_autores_autor_id_libro_id', 'libros_autores', 'autor_id, libro_id'),
+    ('ix_prestamos_libros_libro_id_prestamo_id', 'prestamos_libros', 'libro_id, prestamo_id'),
+    # Préstamos de un usuario por estado y préstamos activos vencidos
+    ('ix_prestamos_usuario_id_estado', 'prestamos', 'usuario_id, estado'),
+    ('ix_prestamos_estado_fecha_devolucion', 'prestamos', 'estado, fecha_devolucion'),
+    # Búsqueda de géneros por nombre (comprobación de duplicados al crearlos)
+    ('ix_generos_nombre', 'generos', 'nombre'),
+]
+
+# Índices GIN de búsqueda de texto (PostgreSQL). Las expresiones tienen que ser las mismas
+# que vector_busqueda_libro y vector_busqueda_autor para que las consultas los usen
+INDICES_POSTGRESQL = [
+    """CREATE INDEX IF NOT EXISTS ix_libros_busqueda ON libros USING gin (
+        to_tsvector('spanish', coalesce(titulo, '') || ' ' || coalesce(descripcion, '') || ' ' || coalesce(editorial, ''))
+    )""",
+    """CREATE INDEX IF NOT EXISTS ix_autores_busqueda ON autores USING gin (
+        to_tsvector('simple', nombre || ' ' || apellido)
+    )""",
+]
+
+# Tabla FTS5 de búsqueda de SQLite y sus triggers, tal como eran en esta revisión. Se copian
+# aquí y no se importan de busqueda.py para que la migración no cambie si cambia la aplicación
+REFRESCAR_FTS = """
+    INSERT OR REPLACE INTO libros_fts(rowid, titulo, descripcion, editorial, autores)
+    SELECT l.id, l.titulo, coalesce(l.descripcion, ''), coalesce(l.editorial, ''),
+           coalesce((SELECT group_concat(a.nombre || ' ' || a.apellido, ' ')
+                     FROM libros_autores la JOIN autores a ON a.id = la.autor_id
+                     WHERE la.libro_id = l.id), '')
+    FROM libros l WHERE {condicion};
+"""
+
+FTS_SQLITE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS libros_fts USING fts5(
+        titulo, descripcion, editorial, autores, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS libros_fts_insert AFTER INSERT ON libros BEGIN
+        {REFRESCAR_FTS.format(condicion='l.id = NEW.id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS libros_fts_update AFTER UPDATE ON libros BEGIN
+        {REFRESCAR_FTS.format(condicion='l.id = NEW.id')}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS libros_fts_delete AFTER DELETE ON libros BEGIN
+        DELETE FROM libros_fts WHERE rowid = OLD.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS libros_autores_fts_insert AFTER INSERT ON libros_autores BEGIN
+        {REFRESCAR_FTS.format(condicion='l.id = NEW.libro_id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS libros_autores_fts_delete AFTER DELETE ON libros_autores BEGIN
+        {REFRESCAR_FTS.format(condicion='l.id = OLD.libro_id')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS autores_fts_update AFTER UPDATE ON autores BEGIN
+        {REFRESCAR_FTS.format(condicion='l.id IN (SELECT libro_id FROM libros_autores WHERE autor_id = NEW.id)')}
+    END""",
+    # Indexa los libros que existían antes de crear la tabla de búsqueda
+    REFRESCAR_FTS.format(condicion='l.id NOT IN (SELECT rowid FROM libros_fts)'),
+]
+
+def aplicar(conexion: Connection):
+    for nombre, tabla, columnas in INDICES:
+        crear_indice(conexion, nombre, tabla, columnas)
+
+    if conexion.dialect.name == 'postgresql':
+        for sentencia in INDICES_POSTGRESQL:
+            conexion.execute(text(sentencia))
+
+    # En SQLite la búsqueda usa la tabla FTS5 y sus triggers (todas las sentencias son IF NOT EXISTS)
+    if conexion.dialect.name == 'sqlite':
+        for sentencia in FTS_SQLITE:
+            conexion.execute(text(sentencia))
@@ -0,0 +1,33 @@
+# Migración 3: ejemplares y disponibilidad de los libros para los préstamos
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from migraciones import tiene_columna
+
+REVISION = 3
+DESCRIPCION = 'Columnas ejemplares y disponibles de libros'
+
+# Préstamos sin devolver de cada libro
+PRESTAMOS_ACTIVOS = """(
+    SELECT count(*) FROM prestamos_libros pl JOIN prestamos p ON p.id = pl.prestamo_id
+    WHERE pl.libro_id = libros.id AND p.estado <> 'devuelto'
+)"""
+
+def aplicar(conexion: Connection):
+    # Las bases de datos creadas con create_all después de añadir las columnas ya las tienen
+    if tiene_columna(conexion, 'libros', 'ejemplares'):
+        return
+
+    conexion.execute(text("ALTER TABLE libros ADD COLUMN ejemplares INTEGER NOT NULL DEFAULT 1"))
+    conexion.execute(text("ALTER TABLE libros ADD COLUMN disponibles INTEGER NOT NULL DEFAULT 1"))
+
+    # Cada libro tiene al menos tantos ejemplares como préstamos sin devolver
+    conexion.execute(text(f"UPDATE libros SET ejemplares = {PRESTAMOS_ACTIVOS} WHERE {PRESTAMOS_ACTIVOS} > 1"))
+    conexion.execute(text(f"UPDATE libros SET disponibles = ejemplares - {PRESTAMOS_ACTIVOS}"))
+
+    # SQLite no permite añadir restricciones a una tabla existente
+    if conexion.dialect.name == 'postgresql':
+        conexion.execute(text(
+            "ALTER TABLE libros ADD CONSTRAINT ck_libros_disponibles CHECK (disponibles >= 0 AND disponibles <= ejemplares)"
+        ))
@@ -0,0 +1,70 @@
+# Migración 4: fechas de libros, géneros y autores como tipos de fecha
+#
+# created_at/updated_at pasan de texto ('%Y-%m-%d %H:%M:%S') a timestamp con zona horaria
+# con now() por defecto, y updated_at deja de ser nula (se rellena con created_at) para
+# poder consultar los cambios por índice.
+#
+# Las fechas de texto las escribía la API con datetime.now(), en la hora local del servidor
+# y sin zona horaria. Se interpretan en la zona horaria de la sesión de PostgreSQL, que
+# normalmente es la misma, o en la de ZONA_HORARIA_FECHAS si se indica (por ejemplo
+# ZONA_HORARIA_FECHAS=Europe/Madrid si la API y la base de datos tenían zonas distintas).
+
+import os
+
+from sqlalchemy import text, select, func
+from sqlalchemy.engine import Connection
+
+from migraciones import crear_indice, es_texto
+
+REVISION = 4
+DESCRIPCION = 'created_at/updated_at como timestamp y fechas de autores como date'
+
+TABLAS = ['libros', 'generos', 'autores']
+
+# Zona horaria en la que se escribieron las fechas de texto (por defecto, la de la sesión)
+ZONA_HORARIA = os.getenv('ZONA_HORARIA_FECHAS')
+
+INDICES = [
+    ('ix_libros_created_at', 'libros', 'created_at'),
+    ('ix_libros_updated_at_id', 'libros', 'updated_at, id'),
+    ('ix_generos_updated_at', 'generos', 'updated_at'),
+    ('ix_autores_updated_at', 'autores', 'updated_at'),
+]
+
+def aplicar(conexion: Connection):
+    postgresql = conexion.dialect.name == 'postgresql'
+
+    # Solo para esta transacción: timestamp::timestamptz usa la zona horaria de la sesión
+    if postgresql and ZONA_HORARIA:
+        conexion.execute(select(func.set_config('TimeZone', ZONA_HORARIA, True)))
+
+    for tabla in TABLAS:
+        # Las tablas creadas con create_all después de este cambio ya tienen los tipos nuevos
+        convertir = postgresql and es_texto(conexion, tabla, 'created_at')
+
+        if convertir:
+            conexion.execute(text(f"""
+                ALTER TABLE {tabla}
+                    ALTER COLUMN created_at TYPE timestamptz USING (created_at::timestamp::timestamptz),
+                    ALTER COLUMN created_at SET DEFAULT now(),
+                    ALTER COLUMN updated_at TYPE timestamptz USING (NULLIF(updated_at, '')::timestamp::timestamptz),
+                    ALTER COLUMN updated_at SET DEFAULT now()
+            """))
+
+        conexion.execute(text(f"UPDATE {tabla} SET updated_at = created_at WHERE updated_at IS NULL"))
+
+        if convertir:
+            conexion.execute(text(f"ALTER TABLE {tabla} ALTER COLUMN updated_at SET NOT NULL"))
+
+    if postgresql and es_texto(conexion, 'autores', 'fecha_nacimiento'):
+        conexion.execute(text("""
+            ALTER TABLE autores
+                ALTER COLUMN fecha_nacimiento TYPE date USING fecha_nacimiento::date,
+                ALTER COLUMN fecha_fallecimiento TYPE date USING NULLIF(fecha_fallecimiento, '')::date
+        """))
+
+    # En SQLite los tipos de columna no restringen lo que se guarda: las fechas de texto ya
+    # tienen el formato que lee SQLAlchemy y los modelos ponen now() en cada INSERT y UPDATE
+
+    for nombre, tabla, columnas in INDICES:
+        crear_indice(conexion, nombre, tabla, columnas)
@@ -0,0 +1,24 @@
+# Migración 5: índices del autocompletado de autores por prefijo (PostgreSQL)
+#
+# Las expresiones tienen que ser las mismas que nombre_completo_autor y apellido_autor.
+# En SQLite no se crean: el autocompletado recorre la tabla, que en desarrollo es pequeña
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+REVISION = 5
+DESCRIPCION = 'Índices de prefijo del nombre y el apellido de los autores'
+
+INDICES_POSTGRESQL = [
+    """CREATE INDEX IF NOT EXISTS ix_autores_nombre_completo_prefijo ON autores (
+        (lower(nombre || ' ' || apellido) COLLATE "C")
+    )""",
+    """CREATE INDEX IF NOT EXISTS ix_autores_apellido_prefijo ON autores (
+        (lower(apellido) COLLATE "C")
+    )""",
+]
+
+def aplicar(conexion: Connection):
+    if conexion.dialect.name == 'postgresql':
+        for sentencia in INDICES_POSTGRESQL:
+            conexion.execute(text(sentencia))
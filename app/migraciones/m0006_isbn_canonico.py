@@ -0,0 +1,87 @@
+# Migración 6: ISBN de los libros en su forma canónica (ISBN-13 sin guiones)
+#
+# Los libros dados de alta antes de normalizar los ISBN pueden tenerlos guardados como
+# ISBN-10 o con guiones y espacios ('0-306-40615-2'). Las búsquedas por ISBN solo buscan
+# la forma canónica y el ISBN-10 sin guiones, así que esos libros no se encontraban.
+#
+# Se dejan como están los ISBN que no son válidos y los que darían un ISBN canónico que ya
+# tiene otro libro, para no perder datos ni romper la restricción de unicidad.
+#
+# La normalización está copiada aquí y no se importa del módulo isbn: la migración tiene
+# que dar siempre el mismo resultado aunque la aplicación cambie después.
+
+from typing import Optional
+
+from sqlalchemy import text, bindparam, table, column, update, func
+from sqlalchemy.engine import Connection
+
+REVISION = 6
+DESCRIPCION = 'ISBN de los libros como ISBN-13 sin guiones'
+
+# Libros que se leen y actualizan en cada paso
+TAMANO_LOTE = 5000
+
+LEER_LOTE = text("SELECT id, isbn FROM libros WHERE id > :ultimo_id AND isbn IS NOT NULL ORDER BY id LIMIT :limite")
+ISBN_OCUPADOS = text("SELECT isbn FROM libros WHERE isbn IN :isbns").bindparams(bindparam('isbns', expanding=True))
+# Se actualiza también updated_at para que los clientes que sincronizan vean el cambio. Con
+# func.now() la fecha tiene el mismo formato que las demás en SQLite (ver database.py)
+libros = table('libros', column('id'), column('isbn'), column('updated_at'))
+ACTUALIZAR = update(libros).where(libros.c.id == bindparam('b_id')).values(isbn=bindparam('b_isbn'), updated_at=func.now())
+
+# ----------------------------- ISBN -----------------------------
+SEPARADORES = str.maketrans('', '', '- ')
+PESOS_10 = range(10, 1, -1)
+PESOS_13 = (1, 3) * 6
+
+def es_numerico(cadena: str) -> bool:
+    return cadena.isascii() and cadena.isdigit()
+
+def control_isbn10(digitos: str) -> str:
+    resto = (11 - sum(int(d) * p for d, p in zip(digitos, PESOS_10)) % 11) % 11
+    return 'X' if resto == 10 else str(resto)
+
+def control_isbn13(digitos: str) -> str:
+    return str((10 - sum(int(d) * p for d, p in zip(digitos, PESOS_13)) % 10) % 10)
+
+# Función para obtener el ISBN-13 sin guiones de un ISBN-10 o ISBN-13, o None si no es válido
+def normalizar(isbn: str) -> Optional[str]:
+    isbn = isbn.translate(SEPARADORES).upper()
+
+    if len(isbn) == 10 and es_numerico(isbn[:9]) and (es_numerico(isbn[9]) or isbn[9] == 'X'):
+        if control_isbn10(isbn[:9]) != isbn[9]:
+            return None
+        base = '978' + isbn[:9]
+        return base + control_isbn13(base)
+
+    if len(isbn) == 13 and es_numerico(isbn) and isbn[:3] in ('978', '979'):
+        return isbn if control_isbn13(isbn[:12]) == isbn[12] else None
+
+    return None
+
+def aplicar(conexion: Connection):
+    ultimo_id = 0
+    while True:
+        filas = conexion.execute(LEER_LOTE, {'ultimo_id': ultimo_id, 'limite': TAMANO_LOTE}).all()
+        if not filas:
+            break
+        ultimo_id = filas[-1].id
+
+        cambios = []
+        for id, isbn in filas:
+            canonico = normalizar(isbn)
+            if canonico is not None and canonico != isbn:
+                cambios.append((id, canonico))
+        if not cambios:
+            continue
+
+        # ISBN canónicos que ya tiene algún libro (de este lote, de uno anterior o de uno posterior)
+        ocupados = set(conexion.scalars(ISBN_OCUPADOS, {'isbns': list({canonico for _, canonico in cambios})}))
+
+        actualizar = []
+        for id, canonico in cambios:
+            if canonico not in ocupados:
+                ocupados.add(canonico)
+                actualizar.append({'b_id': id, 'b_isbn': canonico})
+
+        if actualizar:
+            conexion.execute(ACTUALIZAR, actualizar)
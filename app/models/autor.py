@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Table, String
+from sqlalchemy import Column, Integer, ForeignKey, Table, String, Date, DateTime, Index, func, literal_column
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -10,12 +10,32 @@ class Autor(Base):
     nombre = Column(String, nullable=False)
     apellido = Column(String, nullable=False)
     nacionalidad = Column(String, nullable=False)
-    fecha_nacimiento = Column(String, nullable=False)
-    fecha_fallecimiento = Column(String, nullable=True)
+    fecha_nacimiento = Column(Date, nullable=False)
+    fecha_fallecimiento = Column(Date, nullable=True)
     biografia = Column(String, nullable=False)
     imagen = Column(String, nullable=True)
-    created_at = Column(String, nullable=False)
-    updated_at = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=func.now(), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, index=True, default=func.now(), server_default=func.now(), onupdate=func.now())
 
     libros = relationship('Libro', secondary='libros_autores', back_populates='autores')
 
+    __mapper_args__ = {'eager_defaults': True}
+
+# Vector de búsqueda de texto completo del nombre del autor (PostgreSQL). Se usa la
+# configuración 'simple' porque los nombres propios no se deben reducir a su raíz
+vector_busqueda_autor = func.to_tsvector(
+    literal_column("'simple'"),
+    Autor.nombre.op('||')(literal_column("' '")).op('||')(Autor.apellido),
+)
+
+Index('ix_autores_busqueda', vector_busqueda_autor, postgresql_using='gin').ddl_if(dialect='postgresql')
+
+
+# Expresiones del autocompletado de autores por prefijo ('gabriel garc', 'garcía m'). En PostgreSQL
+# se indexan con la intercalación "C" para que el prefijo se busque como un rango del índice
+# (>= prefijo y < siguiente prefijo) aunque la consulta use parámetros
+nombre_completo_autor = func.lower(Autor.nombre.op('||')(literal_column("' '")).op('||')(Autor.apellido))
+apellido_autor = func.lower(Autor.apellido)
+
+Index('ix_autores_nombre_completo_prefijo', nombre_completo_autor.collate('C')).ddl_if(dialect='postgresql')
+Index('ix_autores_apellido_prefijo', apellido_autor.collate('C')).ddl_if(dialect='postgresql')
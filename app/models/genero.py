@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DateTime, func
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -7,10 +7,13 @@ from models.libros_generos import libros_generos
 class Genero(Base):
     __tablename__ = 'generos'
     id = Column(Integer, primary_key=True, index=True)
-    nombre = Column(String, nullable=False)
+    # Índice para comprobar si ya existe un género con el mismo nombre
+    nombre = Column(String, nullable=False, index=True)
     descripcion = Column(String, nullable=True)
-    created_at = Column(String, nullable=False)
-    updated_at = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=func.now(), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, index=True, default=func.now(), server_default=func.now(), onupdate=func.now())
 
     libros = relationship('Libro', secondary='libros_generos', back_populates='generos')
 
+    __mapper_args__ = {'eager_defaults': True}
+
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DateTime, Index, CheckConstraint, func, literal_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import Numeric
 
@@ -16,9 +16,49 @@ class Libro(Base):
     num_paginas = Column(Integer, nullable=True)
     ano_edicion = Column(Integer, nullable=True)
     precio = Column(Numeric(10, 2), nullable=True)
-    created_at = Column(String, nullable=False)
-    updated_at = Column(String, nullable=True)
+    # Número de ejemplares del libro y cuántos quedan sin prestar
+    ejemplares = Column(Integer, nullable=False, default=1, server_default='1')
+    disponibles = Column(Integer, nullable=False, default=1, server_default='1')
+    # Fechas de alta y de última modificación. Las pone la base de datos con now() (también en
+    # los UPDATE en bloque) y updated_at nunca es nula para poder consultar los cambios por índice.
+    # El default además del server_default es para SQLite, donde la migración no puede cambiar
+    # el DEFAULT de una columna existente
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True, default=func.now(), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=func.now(), server_default=func.now(), onupdate=func.now())
 
     prestamos = relationship("Prestamo", secondary="prestamos_libros", back_populates="libros")
     autores = relationship('Autor', secondary='libros_autores', back_populates='libros')
-    generos = relationship('Genero', secondary='libros_generos', back_populates='libros')
\ No newline at end of file
+    generos = relationship('Genero', secondary='libros_generos', back_populates='libros')
+
+    # Índices para los filtros del listado. Los de igualdad incluyen el ID para que el
+    # filtro y el orden de la paginación por cursor se resuelvan con el mismo índice. Con
+    # los rangos las filas del índice no salen ordenadas por ID (hay que ordenarlas igual),
+    # así que sus índices son de una sola columna
+    __table_args__ = (
+        Index('ix_libros_idioma_id', 'idioma', 'id'),
+        Index('ix_libros_pais_id', 'pais', 'id'),
+        Index('ix_libros_editorial_id', 'editorial', 'id'),
+        Index('ix_libros_ano_edicion', 'ano_edicion'),
+        Index('ix_libros_precio', 'precio'),
+        # Cambios desde una fecha (sincronización incremental) paginados por (updated_at, id)
+        Index('ix_libros_updated_at_id', 'updated_at', 'id'),
+        # Nunca puede haber más préstamos que ejemplares
+        CheckConstraint('disponibles >= 0 AND disponibles <= ejemplares', name='ck_libros_disponibles'),
+    )
+
+    # Se leen las fechas generadas por la base de datos en el mismo INSERT/UPDATE (RETURNING)
+    # porque en las sesiones asíncronas no se pueden cargar después de forma perezosa
+    __mapper_args__ = {'eager_defaults': True}
+
+# Vector de búsqueda de texto completo (PostgreSQL). Las consultas deben usar esta misma
+# expresión para que se aproveche el índice GIN. Se usan literales y no parámetros
+# para que la expresión de la consulta coincida con la del índice
+ESPACIO = literal_column("' '")
+vector_busqueda_libro = func.to_tsvector(
+    literal_column("'spanish'"),
+    func.coalesce(Libro.titulo, literal_column("''")).op('||')(ESPACIO)
+    .op('||')(func.coalesce(Libro.descripcion, literal_column("''"))).op('||')(ESPACIO)
+    .op('||')(func.coalesce(Libro.editorial, literal_column("''"))),
+)
+
+Index('ix_libros_busqueda', vector_busqueda_libro, postgresql_using='gin').ddl_if(dialect='postgresql')
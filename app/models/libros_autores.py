@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Table
+from sqlalchemy import Column, Integer, ForeignKey, Table, Index
 
 from database import Base
 
@@ -6,5 +6,7 @@ libros_autores = Table(
     'libros_autores',
     Base.metadata,
     Column('libro_id', Integer, ForeignKey('libros.id'), primary_key=True),
-    Column('autor_id', Integer, ForeignKey('autores.id'), primary_key=True)
+    Column('autor_id', Integer, ForeignKey('autores.id'), primary_key=True),
+    # Índice inverso: la clave primaria (libro_id, autor_id) no sirve para buscar por autor_id
+    Index('ix_libros_autores_autor_id_libro_id', 'autor_id', 'libro_id'),
 )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Table
+from sqlalchemy import Column, Integer, ForeignKey, Table, Index
 
 from database import Base
 
@@ -6,5 +6,7 @@ libros_generos = Table(
     'libros_generos',
     Base.metadata,
     Column('libro_id', Integer, ForeignKey('libros.id'), primary_key=True),
-    Column('genero_id', Integer, ForeignKey('generos.id'), primary_key=True)
+    Column('genero_id', Integer, ForeignKey('generos.id'), primary_key=True),
+    # Índice inverso: la clave primaria (libro_id, genero_id) no sirve para buscar por genero_id
+    Index('ix_libros_generos_genero_id_libro_id', 'genero_id', 'libro_id'),
 )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Index
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -14,4 +14,11 @@ class Prestamo(Base):
     usuario_id = Column(Integer, ForeignKey('users.id'))
     usuario = relationship("User", back_populates="prestamos")
 
-    libros = relationship("Libro", secondary="prestamos_libros", back_populates="prestamos")
\ No newline at end of file
+    libros = relationship("Libro", secondary="prestamos_libros", back_populates="prestamos")
+
+    # Índices para los préstamos de un usuario por estado (préstamos activos) y para
+    # buscar los préstamos activos con la devolución vencida (tarea de retrasados)
+    __table_args__ = (
+        Index('ix_prestamos_usuario_id_estado', 'usuario_id', 'estado'),
+        Index('ix_prestamos_estado_fecha_devolucion', 'estado', 'fecha_devolucion'),
+    )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Index
 
 from database import Base
 
@@ -6,5 +6,7 @@ prestamos_libros = Table(
     'prestamos_libros',
     Base.metadata,
     Column('prestamo_id', Integer, ForeignKey('prestamos.id'), primary_key=True),
-    Column('libro_id', Integer, ForeignKey('libros.id'), primary_key=True)
+    Column('libro_id', Integer, ForeignKey('libros.id'), primary_key=True),
+    # Índice inverso para los préstamos de un libro
+    Index('ix_prestamos_libros_libro_id_prestamo_id', 'libro_id', 'prestamo_id'),
 )
\ No newline at end of file
@@ -0,0 +1,71 @@
+# Funciones para la paginación por cursor (keyset) de los listados
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Límites de elementos por página
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+
+# Función para codificar el cursor a partir del último ID de la página
+def codificar_cursor(ultimo_id: int) -> str:
+    return base64.urlsafe_b64encode(str(ultimo_id).encode()).decode().rstrip('=')
+
+# Función para decodificar el cursor recibido. Si no es válido, se lanza una excepción
+def decodificar_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        ultimo_id = int(base64.urlsafe_b64decode(cursor + relleno).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail='El cursor no es válido')
+
+    if ultimo_id < 0:
+        raise HTTPException(status_code=400, detail='El cursor no es válido')
+
+    return ultimo_id
+
+# Función para paginar una consulta ordenada por ID a partir de un cursor
+async def paginar(db: AsyncSession, consulta, columna_id, cursor: Optional[str], limite: int, escalares: bool = True):
+    """
+    Función para paginar una consulta por keyset sobre la columna ID
+
+    Se pide un elemento más del límite para saber si hay una página siguiente
+    sin necesidad de contar las filas de la tabla. Con escalares=False se devuelven
+    las filas completas (consultas de varias columnas).
+
+    Returns:
+    tuple: Elementos de la página y cursor de la siguiente página (o None)
+
+    """
+    ultimo_id = decodificar_cursor(cursor)
+
+    resultado = await db.execute(consulta.where(columna_id > ultimo_id).order_by(columna_id).limit(limite + 1))
+    elementos = resultado.scalars().all() if escalares else resultado.all()
+
+    siguiente_cursor = None
+    if len(elementos) > limite:
+        elementos = elementos[:limite]
+        siguiente_cursor = codificar_cursor(elementos[-1].id)
+
+    return elementos, siguiente_cursor
+
+# Función para codificar el cursor de una consulta ordenada por (fecha, ID)
+def codificar_cursor_fecha(fecha: datetime, ultimo_id: int) -> str:
+    return base64.urlsafe_b64encode(f'{fecha.isoformat()}|{ultimo_id}'.encode()).decode().rstrip('=')
+
+# Función para decodificar el cursor de una consulta ordenada por (fecha, ID)
+def decodificar_cursor_fecha(cursor: str) -> tuple[datetime, int]:
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        fecha, ultimo_id = base64.urlsafe_b64decode(cursor + relleno).decode().split('|')
+        return datetime.fromisoformat(fecha), int(ultimo_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail='El cursor no es válido')
@@ -0,0 +1,132 @@
+# Tareas periódicas de la API (marcado de préstamos retrasados)
+
+import asyncio
+import logging
+import os
+import time
+from datetime import date, datetime
+
+from sqlalchemy import select, update, func
+
+from database import AsyncSessionLocal
+from models.prestamo import Prestamo
+from schemas.prestamo_schemas import EstadoPrestamo
+
+internal_logger = logging.getLogger('internal_activity')
+
+# Segundos entre ejecuciones y préstamos que se actualizan en cada lote
+INTERVALO_RETRASADOS = float(os.getenv('OVERDUE_INTERVAL', '300'))
+TAMANO_LOTE = int(os.getenv('OVERDUE_BATCH_SIZE', '1000'))
+
+# Clave del bloqueo consultivo de PostgreSQL. Solo un worker marca los retrasados a la vez
+CLAVE_BLOQUEO_RETRASADOS = 4_815_162_342
+
+# Métricas de la tarea de préstamos retrasados
+metricas_retrasados = {
+    'ejecuciones': 0,
+    'omitidas_por_bloqueo': 0,
+    'errores': 0,
+    'ultima_ejecucion': None,
+    'ultima_duracion_ms': None,
+    'ultimas_filas_actualizadas': 0,
+    'total_filas_actualizadas': 0,
+}
+
+async def marcar_retrasados(tamano_lote: int = TAMANO_LOTE):
+    """
+    Función para pasar a 'retrasado' los préstamos activos con la fecha de devolución vencida
+
+    Actualiza por lotes con un UPDATE por conjunto apoyado en el índice (estado,
+    fecha_devolucion). Cada lote es una transacción corta que toma un bloqueo
+    consultivo: si otro worker lo tiene, este no hace nada.
+
+    Returns:
+    int: Préstamos actualizados o None si otro worker tenía el bloqueo
+
+    """
+    hoy = date.today()
+    actualizados = 0
+
+    while True:
+        async with AsyncSessionLocal() as db:
+            if db.bind.dialect.name == 'postgresql':
+                bloqueado = await db.scalar(select(func.pg_try_advisory_xact_lock(CLAVE_BLOQUEO_RETRASADOS)))
+                if not bloqueado:
+                    return None if actualizados == 0 else actualizados
+
+            # Préstamos del lote. SKIP LOCKED evita esperar a los que se están devolviendo
+            lote = (
+                select(Prestamo.id)
+                .where(Prestamo.estado == EstadoPrestamo.activo.value, Prestamo.fecha_devolucion < hoy)
+                .order_by(Prestamo.id)
+                .limit(tamano_lote)
+                .with_for_update(skip_locked=True)
+            )
+            # En PostgreSQL el lote va en una CTE materializada: como subconsulta del IN se
+            # puede volver a ejecutar por cada fila (semi join con bucle anidado) y entonces se
+            # actualizan más préstamos que el tamaño del lote. En SQLite no hace falta, y el
+            # driver no da el número de filas de un UPDATE que empieza por WITH
+            if db.bind.dialect.name == 'postgresql':
+                lote = select(lote.cte('lote').prefix_with('MATERIALIZED').c.id)
+
+            resultado = await db.execute(
+                update(Prestamo)
+                .where(Prestamo.id.in_(lote), Prestamo.estado == EstadoPrestamo.activo.value)
+                .values(estado=EstadoPrestamo.retrasado.value)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+        actualizados += resultado.rowcount
+        if resultado.rowcount < tamano_lote:
+            return actualizados
+
+# Función para ejecutar la tarea una vez y registrar sus métricas
+async def ejecutar_retrasados():
+    inicio = time.perf_counter()
+
+    try:
+        actualizados = await marcar_retrasados()
+    except Exception as e:
+        metricas_retrasados['errores'] += 1
+        internal_logger.error(f'Error al marcar los préstamos retrasados: {str(e)}')
+        return
+
+    if actualizados is None:
+        metricas_retrasados['omitidas_por_bloqueo'] += 1
+        return
+
+    metricas_retrasados['ejecuciones'] += 1
+    metricas_retrasados['ultima_ejecucion'] = datetime.now().isoformat(timespec='seconds')
+    metricas_retrasados['ultima_duracion_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+    metricas_retrasados['ultimas_filas_actualizadas'] = actualizados
+    metricas_retrasados['total_filas_actualizadas'] += actualizados
+
+    if actualizados:
+        internal_logger.info(f'Préstamos marcados como retrasados: {actualizados}')
+
+# Bucle de la tarea periódica
+async def bucle_retrasados():
+    while True:
+        await ejecutar_retrasados()
+        await asyncio.sleep(INTERVALO_RETRASADOS)
+
+# Tareas en ejecución del proceso
+tareas = []
+
+# Función para arrancar las tareas periódicas. Se llama en el arranque de la API
+def iniciar_tareas():
+    if not tareas:
+        tareas.append(asyncio.create_task(bucle_retrasados(), name='prestamos_retrasados'))
+
+# Función para parar las tareas periódicas. Se llama al parar la API
+async def detener_tareas():
+    for tarea in tareas:
+        tarea.cancel()
+
+    await asyncio.gather(*tareas, return_exceptions=True)
+    tareas.clear()
+
+# Función para obtener las métricas de las tareas periódicas
+def get_tareas_stats():
+    return {'prestamos_retrasados': {**metricas_retrasados, 'intervalo_segundos': INTERVALO_RETRASADOS}}
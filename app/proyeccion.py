@@ -0,0 +1,112 @@
+# Funciones para construir las respuestas de los listados directamente desde filas,
+# sin crear objetos ORM ni pasar por la validación de los esquemas
+
+from collections import defaultdict
+from dataclasses import make_dataclass
+from functools import lru_cache
+from operator import attrgetter
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.libro import Libro
+from models.genero import Genero
+from models.libros_autores import libros_autores
+from models.libros_generos import libros_generos
+
+# Campos que se pueden pedir en los listados de libros (los de LibroResponse). Los
+# autores y los géneros no son columnas: se obtienen de las tablas de relación
+CAMPOS_LIBRO = {
+    'id': Libro.id,
+    'isbn': Libro.isbn,
+    'titulo': Libro.titulo,
+    'autores': None,
+    'descripcion': Libro.descripcion,
+    'editorial': Libro.editorial,
+    'generos': None,
+    'pais': Libro.pais,
+    'idioma': Libro.idioma,
+    'num_paginas': Libro.num_paginas,
+    'ano_edicion': Libro.ano_edicion,
+    'precio': Libro.precio,
+}
+
+# Función para obtener los campos pedidos con el parámetro fields (separados por comas)
+def campos_libro(fields: Optional[str]) -> list[str]:
+    if not fields:
+        return list(CAMPOS_LIBRO)
+
+    campos = [campo.strip() for campo in fields.split(',') if campo.strip()]
+    desconocidos = [campo for campo in campos if campo not in CAMPOS_LIBRO]
+    if desconocidos or not campos:
+        raise HTTPException(status_code=400, detail=f'Campos no válidos: {", ".join(desconocidos)}. Campos posibles: {", ".join(CAMPOS_LIBRO)}')
+
+    # Se mantiene el orden de los campos y se eliminan los repetidos
+    return list(dict.fromkeys(campos))
+
+# Función para obtener las columnas a consultar para unos campos. Siempre se incluyen
+# el ID (cursor) y las fechas (versión de la página para el ETag)
+def columnas_libro(campos: list[str]) -> list:
+    columnas = [Libro.id, Libro.created_at, Libro.updated_at]
+    columnas += [CAMPOS_LIBRO[campo] for campo in campos if CAMPOS_LIBRO[campo] is not None and campo != 'id']
+    return columnas
+
+# Columnas de los listados de géneros
+COLUMNAS_GENERO = (Genero.id, Genero.nombre, Genero.descripcion, Genero.created_at, Genero.updated_at)
+
+# Función para obtener los IDs relacionados de varios libros con una sola consulta
+async def ids_relacionados(db: AsyncSession, tabla, columna, libros_id: list) -> dict:
+    relacionados = defaultdict(list)
+
+    if libros_id:
+        resultado = await db.execute(
+            select(tabla.c.libro_id, columna).where(tabla.c.libro_id.in_(libros_id)).order_by(tabla.c.libro_id, columna)
+        )
+        for libro_id, id in resultado.all():
+            relacionados[libro_id].append(id)
+
+    return relacionados
+
+# Función para obtener la clase de los libros de un listado con unos campos. Es un
+# dataclass con __slots__ (sin diccionario por objeto) que orjson serializa como un
+# objeto JSON con los campos en ese orden. Se crea una por combinación de campos
+@lru_cache(maxsize=256)
+def clase_libro(campos: tuple[str, ...]) -> type:
+    return make_dataclass('LibroProyectado', campos, slots=True)
+
+async def filas_a_libros(db: AsyncSession, filas, campos: list[str]) -> list:
+    """
+    Función para convertir filas de columnas_libro en objetos ligeros con los campos pedidos
+
+    Los objetos son de clase_libro(campos). Los autores y géneros de toda la página,
+    si se piden, se obtienen con una consulta por tabla de relación.
+
+    Returns:
+    list: Libros listos para serializar
+
+    """
+    libros_id = [fila.id for fila in filas]
+    relacionados = {}
+    if 'autores' in campos:
+        relacionados['autores'] = await ids_relacionados(db, libros_autores, libros_autores.c.autor_id, libros_id)
+    if 'generos' in campos:
+        relacionados['generos'] = await ids_relacionados(db, libros_generos, libros_generos.c.genero_id, libros_id)
+
+    # Función de cada campo para leer su valor de una fila
+    lectores = []
+    for campo in campos:
+        if campo in relacionados:
+            lectores.append(lambda fila, ids=relacionados[campo]: ids[fila.id])
+        elif campo == 'precio':
+            lectores.append(lambda fila: float(fila.precio) if fila.precio is not None else None)
+        else:
+            lectores.append(attrgetter(campo))
+
+    clase = clase_libro(tuple(campos))
+    return [clase(*[lector(fila) for lector in lectores]) for fila in filas]
+
+# Función para convertir filas de COLUMNAS_GENERO en diccionarios con la forma de GeneroResponse
+def filas_a_generos(filas) -> list[dict]:
+    return [{'id': fila.id, 'nombre': fila.nombre, 'descripcion': fila.descripcion} for fila in filas]
@@ -0,0 +1,141 @@
+# Registro en memoria de los géneros (tabla pequeña de datos de referencia)
+
+import asyncio
+import bisect
+import os
+import time
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from condicional import version_recurso
+from models.genero import Genero
+from proyeccion import COLUMNAS_GENERO, filas_a_generos
+from schemas.genero_schemas import GeneroResponse
+
+# Segundos entre comprobaciones de la versión de la tabla (cambios hechos por otros workers)
+INTERVALO_COMPROBACION = float(os.getenv('GENRE_REGISTRY_CHECK_INTERVAL', '5'))
+
+# Función para normalizar el nombre de un género (minúsculas y espacios simples)
+def normalizar_nombre(nombre: str) -> str:
+    return ' '.join(nombre.lower().split())
+
+class RegistroGeneros:
+    """
+    Registro de todos los géneros del proceso: por ID y por nombre normalizado
+
+    Se carga en el arranque y se recarga cuando las rutas de géneros escriben.
+    Los cambios hechos desde otros workers se detectan comparando la versión de
+    la tabla (número de filas, última modificación y último ID), como mucho una
+    vez cada INTERVALO_COMPROBACION segundos o cuando se pide un ID desconocido.
+
+    """
+    def __init__(self, intervalo: float = INTERVALO_COMPROBACION):
+        self.intervalo = intervalo
+        # ID -> fila (id, nombre, descripcion, created_at, updated_at)
+        self.filas = {}
+        # ID -> (GeneroResponse, ETag, fecha de modificación)
+        self.respuestas = {}
+        # Nombre normalizado -> ID
+        self.por_nombre = {}
+        # IDs ordenados para la paginación por cursor
+        self.ids = []
+        self.version = None
+        self.comprobado = 0.0
+        self.cargas = 0
+        self.comprobaciones = 0
+        self.bloqueo = asyncio.Lock()
+
+    @staticmethod
+    async def version_bd(db: AsyncSession):
+        return tuple((await db.execute(
+            select(func.count(Genero.id), func.max(Genero.updated_at), func.max(Genero.id))
+        )).one())
+
+    async def cargar(self, db: AsyncSession):
+        async with self.bloqueo:
+            await self._cargar(db)
+
+    async def _cargar(self, db: AsyncSession):
+        version = await self.version_bd(db)
+        filas = (await db.execute(select(*COLUMNAS_GENERO).order_by(Genero.id))).all()
+
+        self.filas = {fila.id: fila for fila in filas}
+        self.respuestas = {
+            fila.id: (GeneroResponse.model_validate(genero), *version_recurso(fila))
+            for fila, genero in zip(filas, filas_a_generos(filas))
+        }
+        self.por_nombre = {normalizar_nombre(fila.nombre): fila.id for fila in filas}
+        self.ids = [fila.id for fila in filas]
+        self.version = version
+        self.comprobado = time.monotonic()
+        self.cargas += 1
+
+    async def actualizar(self, db: AsyncSession, forzar: bool = False):
+        """
+        Función para recargar el registro si la tabla ha cambiado
+
+        Sin forzar, solo consulta la versión si ha pasado el intervalo desde la
+        última comprobación.
+
+        """
+        if not forzar and self.version is not None and time.monotonic() - self.comprobado < self.intervalo:
+            return
+
+        async with self.bloqueo:
+            self.comprobaciones += 1
+            if self.version is not None and await self.version_bd(db) == self.version:
+                self.comprobado = time.monotonic()
+                return
+            await self._cargar(db)
+
+    async def faltan(self, db: AsyncSession, ids) -> list[int]:
+        """
+        Función para obtener qué IDs de géneros no existen
+
+        Si falta alguno se comprueba antes si otro worker lo ha creado.
+
+        Returns:
+        list: IDs que no existen
+
+        """
+        await self.actualizar(db)
+        faltan = [id for id in ids if id not in self.filas]
+        if faltan:
+            await self.actualizar(db, forzar=True)
+            faltan = [id for id in faltan if id not in self.filas]
+        return faltan
+
+    async def respuesta(self, db: AsyncSession, id: int):
+        await self.actualizar(db)
+        if id not in self.respuestas:
+            await self.actualizar(db, forzar=True)
+        return self.respuestas.get(id)
+
+    async def id_por_nombre(self, db: AsyncSession, nombre: str, forzar: bool = False):
+        await self.actualizar(db, forzar=forzar)
+        return self.por_nombre.get(normalizar_nombre(nombre))
+
+    async def pagina(self, db: AsyncSession, ultimo_id: int, limite: int) -> tuple[list, bool]:
+        """
+        Función para obtener una página de géneros ordenada por ID
+
+        Returns:
+        tuple: Filas de la página y si hay una página siguiente
+
+        """
+        await self.actualizar(db)
+        inicio = bisect.bisect_right(self.ids, ultimo_id)
+        ids = self.ids[inicio:inicio + limite + 1]
+        return [self.filas[id] for id in ids[:limite]], len(ids) > limite
+
+    def stats(self):
+        return {
+            'generos': len(self.filas),
+            'cargas': self.cargas,
+            'comprobaciones': self.comprobaciones,
+            'intervalo_comprobacion': self.intervalo,
+        }
+
+# Registro de géneros del proceso
+registro_generos = RegistroGeneros()
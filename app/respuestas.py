@@ -0,0 +1,39 @@
+# Clases de respuesta JSON de la API
+
+import dataclasses
+import json
+import os
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+# orjson es opcional: si no está instalado se usa el JSONResponse estándar
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Se puede desactivar con JSON_RAPIDO=false aunque orjson esté instalado
+JSON_RAPIDO = orjson is not None and os.getenv('JSON_RAPIDO', 'true').lower() in ('1', 'true', 'yes')
+
+# Respuesta JSON codificada con orjson. Es la de ORJSONResponse de FastAPI, que está
+# obsoleta y avisa cada vez que se crea una respuesta
+class RespuestaORJSON(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+# Función para convertir en diccionarios los objetos que el json estándar no sabe codificar:
+# los dataclasses de las proyecciones, que orjson codifica directamente
+def a_diccionario(objeto: Any) -> dict:
+    if dataclasses.is_dataclass(objeto):
+        return {campo.name: getattr(objeto, campo.name) for campo in dataclasses.fields(objeto)}
+    raise TypeError(f'El objeto de tipo {type(objeto).__name__} no se puede codificar en JSON')
+
+# Respuesta JSON codificada con el json de la biblioteca estándar, igual que JSONResponse
+# pero aceptando los dataclasses de las proyecciones
+class RespuestaJSONEstandar(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':'), default=a_diccionario).encode('utf-8')
+
+# Clase de respuesta por defecto de la API
+RespuestaJSON = RespuestaORJSON if JSON_RAPIDO else RespuestaJSONEstandar
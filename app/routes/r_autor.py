@@ -0,0 +1,367 @@
+# Rutas para la entidad Autor
+
+# Importamos las librerías necesarias
+import logging
+from fastapi import APIRouter, HTTPException, Depends, Path, Query
+from sqlalchemy import select, update, delete, func, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+# Importamos las funciones de paginación
+from paginacion import paginar, LIMITE_POR_DEFECTO, LIMITE_MAXIMO
+
+# Importamos la caché de libros
+from cache import cache_libros
+
+# Importamos la proyección de filas y la respuesta JSON rápida para los listados
+from proyeccion import campos_libro, columnas_libro, filas_a_libros
+from respuestas import RespuestaJSON
+
+# Importamos los modelos y esquemas necesarios
+from models.autor import Autor, nombre_completo_autor, apellido_autor
+from models.libro import Libro
+from models.libros_autores import libros_autores
+from schemas.autor_schemas import AutorResponse, AutorCreate, AutorUpdate, AutorPagina, AutorSugerencia
+from schemas.libro_schemas import LibroPagina
+
+# Importamos la función para obtener la base de datos
+from database import get_db
+
+# Creamos el router para los autores
+autores_router = APIRouter(
+    prefix='/autores',
+    tags=['Autores']
+)
+
+# Obtenemos los loggers (se configuran una sola vez en run.py)
+user_logger = logging.getLogger('user_activity')
+internal_logger = logging.getLogger('internal_activity')
+
+# Número máximo de sugerencias del autocompletado
+LIMITE_SUGERENCIAS = 50
+
+# Columnas de Autor que se copian directamente de AutorCreate/AutorUpdate
+CAMPOS_AUTOR = ['nombre', 'apellido', 'nacionalidad', 'fecha_nacimiento', 'fecha_fallecimiento', 'biografia', 'imagen']
+
+def consulta_sugerencias(q: str, limite: int, dialecto: str):
+    """
+    Función para construir la consulta de los autores cuyo nombre completo o apellido empieza por un texto
+
+    Cada rama de la unión recorre un índice de prefijo como un rango
+    (>= prefijo y < prefijo siguiente) y se detiene en el límite, así que el
+    coste no depende del número de autores.
+
+    Returns:
+    Select: Consulta de las filas (id, nombre, apellido) ordenadas por apellido y nombre, o None si el texto está vacío
+
+    """
+    prefijo = ' '.join(q.lower().split())
+    if not prefijo:
+        return None
+
+    # Menor texto mayor que todos los que empiezan por el prefijo
+    siguiente = prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+
+    ramas = []
+    for expresion in (nombre_completo_autor, apellido_autor):
+        # En PostgreSQL la intercalación tiene que ser la del índice
+        if dialecto == 'postgresql':
+            expresion = expresion.collate('C')
+
+        rama = select(Autor.id).where(expresion >= prefijo, expresion < siguiente).order_by(expresion).limit(limite).subquery()
+        ramas.append(select(rama.c.id))
+
+    ids = union(*ramas).subquery()
+    return (
+        select(Autor.id, Autor.nombre, Autor.apellido)
+        .where(Autor.id.in_(select(ids.c.id)))
+        .order_by(Autor.apellido, Autor.nombre, Autor.id)
+        .limit(limite)
+    )
+
+# Función para obtener las sugerencias del autocompletado de autores
+async def sugerir_autores(db: AsyncSession, q: str, limite: int) -> list:
+    consulta = consulta_sugerencias(q, limite, db.bind.dialect.name)
+    if consulta is None:
+        return []
+
+    resultado = await db.execute(consulta)
+    return resultado.all()
+
+# Ruta para obtener todos los autores (paginados por cursor)
+@autores_router.get(
+    '/',
+    description='Obtener los autores paginados por cursor',
+    response_model=AutorPagina,
+    responses={
+        200: {
+            'description': 'Página de autores',
+            'model': AutorPagina
+        },
+        400: {
+            'description': 'Cursor incorrecto'
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def get_autores(
+    cursor: str = Query(None, description='Cursor de la página (next_cursor de la página anterior)'),
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO, description='Número de autores por página'),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        autores, next_cursor = await paginar(db, select(Autor), Autor.id, cursor, limit)
+
+        return {'items': autores, 'next_cursor': next_cursor}
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al obtener los autores: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error obteniendo los autores')
+
+# Ruta para autocompletar autores por el principio del nombre o del apellido.
+# Se declara antes de '/{autor_id}' para que 'sugerencias' no se interprete como un ID
+@autores_router.get(
+    '/sugerencias',
+    description='Autocompletar autores cuyo nombre completo o apellido empieza por el texto',
+    response_model=list[AutorSugerencia],
+    responses={
+        200: {
+            'description': 'Autores sugeridos',
+            'model': list[AutorSugerencia]
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def get_sugerencias_autores(
+    q: str = Query(..., min_length=1, max_length=100, description='Principio del nombre o del apellido'),
+    limit: int = Query(10, ge=1, le=LIMITE_SUGERENCIAS, description='Número de sugerencias'),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        filas = await sugerir_autores(db, q, limit)
+
+        return RespuestaJSON([{'id': fila.id, 'nombre': fila.nombre, 'apellido': fila.apellido} for fila in filas])
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al sugerir autores: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error sugiriendo autores')
+
+# Ruta para obtener un autor por su ID
+@autores_router.get(
+    '/{autor_id}',
+    description='Obtener un autor por su ID',
+    response_model=AutorResponse,
+    responses={
+        200: {
+            'description': 'Autor encontrado',
+            'model': AutorResponse
+        },
+        404: {
+            'description': 'Autor no encontrado'
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def get_autor(autor_id: int = Path(..., ge=1, description='ID del autor'), db: AsyncSession = Depends(get_db)):
+    try:
+        autor = await db.get(Autor, autor_id)
+
+        # Si el autor no existe, lanzamos una excepción
+        if not autor:
+            raise HTTPException(status_code=404, detail='Autor no encontrado')
+
+        return autor
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al obtener el autor: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error obteniendo el autor')
+
+# Ruta para obtener los libros de un autor (paginados por cursor)
+@autores_router.get(
+    '/{autor_id}/libros',
+    description='Obtener los libros de un autor paginados por cursor',
+    response_model=LibroPagina,
+    responses={
+        200: {
+            'description': 'Página de libros del autor',
+            'model': LibroPagina
+        },
+        400: {
+            'description': 'Cursor o campos incorrectos'
+        },
+        404: {
+            'description': 'Autor no encontrado'
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def get_libros_autor(
+    autor_id: int = Path(..., ge=1, description='ID del autor'),
+    cursor: str = Query(None, description='Cursor de la página (next_cursor de la página anterior)'),
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO, description='Número de libros por página'),
+    fields: str = Query(None, description='Campos a devolver separados por comas. Por defecto, todos'),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        # Los libros del autor se recorren con el índice inverso (autor_id, libro_id) de libros_autores
+        campos = campos_libro(fields)
+        consulta = (
+            select(*columnas_libro(campos))
+            .join(libros_autores, libros_autores.c.libro_id == Libro.id)
+            .where(libros_autores.c.autor_id == autor_id)
+        )
+        libros, next_cursor = await paginar(db, consulta, Libro.id, cursor, limit, escalares=False)
+
+        # Solo si no hay libros se comprueba si el autor existe
+        if not libros and not cursor and not await db.scalar(select(Autor.id).where(Autor.id == autor_id)):
+            raise HTTPException(status_code=404, detail='Autor no encontrado')
+
+        return RespuestaJSON({'items': await filas_a_libros(db, libros, campos), 'next_cursor': next_cursor, 'facets': None})
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al obtener los libros del autor: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error obteniendo los libros del autor')
+
+# Ruta para crear un autor
+@autores_router.post(
+    '/',
+    description='Crear un autor',
+    response_model=AutorResponse,
+    status_code=201,
+    responses={
+        201: {
+            'description': 'Autor creado',
+            'model': AutorResponse
+        },
+        400: {
+            'description': 'Datos inválidos'
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def create_autor(autor: AutorCreate, db: AsyncSession = Depends(get_db)):
+    try:
+        if autor.fecha_fallecimiento and autor.fecha_fallecimiento < autor.fecha_nacimiento:
+            raise HTTPException(status_code=400, detail='La fecha de fallecimiento no puede ser anterior a la de nacimiento')
+
+        nuevo_autor = Autor(**{campo: getattr(autor, campo) for campo in CAMPOS_AUTOR})
+        db.add(nuevo_autor)
+        await db.commit()
+
+        user_logger.info(f'Autor creado: {nuevo_autor.id}')
+
+        return nuevo_autor
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al crear el autor: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error creando el autor')
+
+# Ruta para actualizar un autor
+@autores_router.put(
+    '/{autor_id}',
+    description='Actualizar un autor',
+    response_model=AutorResponse,
+    responses={
+        200: {
+            'description': 'Autor actualizado',
+            'model': AutorResponse
+        },
+        400: {
+            'description': 'Datos inválidos'
+        },
+        404: {
+            'description': 'Autor no encontrado'
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def update_autor(autor: AutorUpdate, autor_id: int = Path(..., ge=1, description='ID del autor'), db: AsyncSession = Depends(get_db)):
+    try:
+        autor_db = await db.get(Autor, autor_id)
+
+        # Si el autor no existe, lanzamos una excepción
+        if not autor_db:
+            raise HTTPException(status_code=404, detail='Autor no encontrado')
+
+        # Actualizamos solo los campos que vienen en la petición
+        for campo in CAMPOS_AUTOR:
+            valor = getattr(autor, campo)
+            if valor is not None:
+                setattr(autor_db, campo, valor)
+
+        if autor_db.fecha_fallecimiento and autor_db.fecha_fallecimiento < autor_db.fecha_nacimiento:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail='La fecha de fallecimiento no puede ser anterior a la de nacimiento')
+
+        await db.commit()
+
+        user_logger.info(f'Autor actualizado: {autor_db.id}')
+
+        return autor_db
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al actualizar el autor: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error actualizando el autor')
+
+# Ruta para eliminar un autor
+@autores_router.delete(
+    '/{autor_id}',
+    description='Eliminar un autor y quitarlo de sus libros',
+    response_model=AutorResponse,
+    responses={
+        200: {
+            'description': 'Autor eliminado',
+            'model': AutorResponse
+        },
+        404: {
+            'description': 'Autor no encontrado'
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def delete_autor(autor_id: int = Path(..., ge=1, description='ID del autor'), db: AsyncSession = Depends(get_db)):
+    try:
+        autor = await db.get(Autor, autor_id)
+
+        # Si el autor no existe, lanzamos una excepción
+        if not autor:
+            raise HTTPException(status_code=404, detail='Autor no encontrado')
+
+        # Los libros del autor cambian (su lista de autores), así que se actualiza su fecha.
+        # Las relaciones y el autor se borran con sentencias por conjunto: borrar el objeto
+        # obligaría a cargar antes la colección de libros
+        libros_del_autor = select(libros_autores.c.libro_id).where(libros_autores.c.autor_id == autor_id)
+        await db.execute(
+            update(Libro)
+            .where(Libro.id.in_(libros_del_autor))
+            .values(updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(delete(libros_autores).where(libros_autores.c.autor_id == autor_id))
+        await db.execute(delete(Autor).where(Autor.id == autor_id))
+        await db.commit()
+
+        # Invalidamos los libros en caché que tenían al autor
+        cache_libros.invalidar_si(lambda entrada: autor_id in entrada[0].autores)
+
+        user_logger.info(f'Autor eliminado: {autor_id}')
+
+        return autor
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al eliminar el autor: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error eliminando el autor')
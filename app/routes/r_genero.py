@@ -1,18 +1,32 @@
 # Rutas para la entidad Género
 
 # Importamos las librerías necesarias
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends, Path
+import logging
+from fastapi import APIRouter, HTTPException, Depends, Path, Query, Request, Response
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
-# Importamos el logger
-from log_config import setup_logger
+# Importamos las funciones de paginación
+from paginacion import codificar_cursor, decodificar_cursor, LIMITE_POR_DEFECTO, LIMITE_MAXIMO
+
+# Importamos la caché de libros y el registro de géneros en memoria
+from cache import cache_libros
+from registro_generos import registro_generos, normalizar_nombre
+
+# Importamos las funciones para las peticiones condicionales
+from condicional import respuesta_condicional, poner_cabeceras, version_coleccion
+
+# Importamos la proyección de filas y la respuesta JSON rápida para los listados
+from proyeccion import filas_a_generos
+from respuestas import RespuestaJSON
 
 # Importamos los modelos y esquemas necesarios
 from models.genero import Genero
-from schemas.genero_schemas import GeneroResponse, GeneroCreate
+from models.libro import Libro
+from models.libros_generos import libros_generos
+from schemas.genero_schemas import GeneroResponse, GeneroCreate, GeneroPagina
 
 # Importamos la función para obtener la base de datos
 from database import get_db
@@ -23,18 +37,25 @@ generos_router = APIRouter(
     tags=['Géneros']
 )
 
-# Configuramos el logger
-user_logger, internal_logger = setup_logger()
+# Obtenemos los loggers (se configuran una sola vez en run.py)
+user_logger = logging.getLogger('user_activity')
+internal_logger = logging.getLogger('internal_activity')
 
-# Ruta para obtener todos los géneros
+# Ruta para obtener todos los géneros (paginados por cursor)
 @generos_router.get(
     '/',
-    description='Obtener todos los géneros',
-    response_model=list[GeneroResponse],
+    description='Obtener todos los géneros paginados por cursor',
+    response_model=GeneroPagina,
     responses={
         200: {
-            'description': 'Lista de géneros',
-            'model': GeneroResponse
+            'description': 'Página de géneros',
+            'model': GeneroPagina
+        },
+        304: {
+            'description': 'Página no modificada'
+        },
+        400: {
+            'description': 'Cursor incorrecto'
         },
         404: {
             'description': 'No hay géneros registrados'
@@ -44,16 +65,33 @@ user_logger, internal_logger = setup_logger()
         }
     }
 )
-async def get_libros(db: Session = Depends(get_db)):
+async def get_generos(
+    request: Request,
+    response: Response,
+    cursor: str = Query(None, description='Cursor de la página (next_cursor de la página anterior)'),
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO, description='Número de géneros por página'),
+    db: AsyncSession = Depends(get_db),
+):
     try: 
-        # Consultamos los géneros de la base de datos. Si no hay géneros, se lanza una excepción
-        generos = db.query(Genero).all()
+        # Obtenemos la página de géneros del registro en memoria a partir del cursor
+        generos, hay_siguiente = await registro_generos.pagina(db, decodificar_cursor(cursor), limit)
+        next_cursor = codificar_cursor(generos[-1].id) if hay_siguiente else None
 
-        # Si hay géneros, los devolvemos. Si no, lanzamos una excepción
-        if generos:
-            return generos
-        else:
+        # Si no hay géneros en la primera página, lanzamos una excepción
+        if not generos and not cursor:
             raise HTTPException(status_code=404, detail='No hay géneros registrados')
+
+        # Si el cliente ya tiene esta versión de la página, respondemos 304 sin serializarla
+        version = version_coleccion(generos, cursor, limit, next_cursor)
+        no_modificado = respuesta_condicional(request, response, *version)
+        if no_modificado:
+            return no_modificado
+
+        # Se construye la respuesta directamente desde las filas, sin pasar por GeneroResponse
+        respuesta = RespuestaJSON({'items': filas_a_generos(generos), 'next_cursor': next_cursor})
+        poner_cabeceras(respuesta, *version)
+
+        return respuesta
         
     except SQLAlchemyError as e:
         internal_logger.error(f'Error al obtener los géneros: {str(e)}')
@@ -69,6 +107,9 @@ async def get_libros(db: Session = Depends(get_db)):
             'description': 'Género encontrado',
             'model': GeneroResponse
         },
+        304: {
+            'description': 'Género no modificado'
+        },
         404: {
             'description': 'Género no encontrado'
         },
@@ -77,16 +118,18 @@ async def get_libros(db: Session = Depends(get_db)):
         }
     }
 )
-async def get_genero(genero_id: int = Path(..., ge=1, description='ID del género'), db: Session = Depends(get_db)):
+async def get_genero(request: Request, response: Response, genero_id: int = Path(..., ge=1, description='ID del género'), db: AsyncSession = Depends(get_db)):
     try:
-        # Consultamos el género por su ID. Si no existe, lanzamos una excepción
-        genero = db.query(Genero).filter(Genero.id == genero_id).first()
+        # Obtenemos el género ya serializado y con su versión del registro en memoria
+        entrada = await registro_generos.respuesta(db, genero_id)
 
-        # Si el género existe, lo devolvemos. Si no, lanzamos una excepción
-        if genero:
-            return genero
-        else:
+        # Si el género no existe, lanzamos una excepción
+        if not entrada:
             raise HTTPException(status_code=404, detail='Género no encontrado')
+
+        # Si el cliente ya tiene esta versión del género respondemos 304. Si no, lo devolvemos
+        respuesta, etag, ultima_modificacion = entrada
+        return respuesta_condicional(request, response, etag, ultima_modificacion) or respuesta
         
     except SQLAlchemyError as e:
         internal_logger.error(f'Error al obtener el género: {str(e)}')
@@ -110,19 +153,22 @@ async def get_genero(genero_id: int = Path(..., ge=1, description='ID del géner
         }
     }
 )
-async def create_genero(genero: GeneroCreate, db: Session = Depends(get_db)):
+async def create_genero(genero: GeneroCreate, db: AsyncSession = Depends(get_db)):
     try:
         # Normalizamos el nombre del género
-        genero.nombre = genero.nombre.lower()
+        genero.nombre = normalizar_nombre(genero.nombre)
 
-        if db.query(Genero).filter(Genero.nombre == genero.nombre).first():
+        # Se comprueba con el registro al día (una consulta de su versión) si el nombre ya existe
+        if await registro_generos.id_por_nombre(db, genero.nombre, forzar=True):
             raise HTTPException(status_code=400, detail='El género ya existe')
 
         # Creamos el género en la base de datos
-        nuevo_genero = Genero(**genero.dict(), created_at=datetime.now(), updated_at=datetime.now())
+        nuevo_genero = Genero(**genero.dict())
         db.add(nuevo_genero)
-        db.commit()
-        db.refresh(nuevo_genero)
+        await db.commit()
+
+        # Recargamos el registro de géneros
+        await registro_generos.cargar(db)
 
         user_logger.info(f'Género creado: {nuevo_genero.id}')
         
@@ -153,22 +199,25 @@ async def create_genero(genero: GeneroCreate, db: Session = Depends(get_db)):
         }
     }
 )
-async def update_genero(genero: GeneroCreate,genero_id: int = Path(..., ge=1, description='ID del género'), db: Session = Depends(get_db)):
+async def update_genero(genero: GeneroCreate,genero_id: int = Path(..., ge=1, description='ID del género'), db: AsyncSession = Depends(get_db)):
     try:
         # Consultamos el género por su ID. Si no existe, lanzamos una excepción
-        genero_db = db.query(Genero).filter(Genero.id == genero_id).first()
+        genero_db = await db.get(Genero, genero_id)
 
         # Si el género existe, lo actualizamos. Si no, lanzamos una excepción
         if genero_db:
             if genero.nombre:
-                genero_db.nombre = genero.nombre.lower()
+                nombre = normalizar_nombre(genero.nombre)
+                if await registro_generos.id_por_nombre(db, nombre, forzar=True) not in (None, genero_id):
+                    raise HTTPException(status_code=400, detail='El género ya existe')
+                genero_db.nombre = nombre
             if genero.descripcion:
                 genero_db.descripcion = genero.descripcion
 
-            genero_db.updated_at = datetime.now()
+            await db.commit()
 
-            db.commit()
-            db.refresh(genero_db)
+            # Recargamos el registro de géneros
+            await registro_generos.cargar(db)
 
             user_logger.info(f'Género actualizado: {genero_db.id}')
             
@@ -197,15 +246,30 @@ async def update_genero(genero: GeneroCreate,genero_id: int = Path(..., ge=1, de
         }
     }
 )
-async def delete_genero(genero_id: int = Path(..., ge=1, description='ID del género'), db: Session = Depends(get_db)):
+async def delete_genero(genero_id: int = Path(..., ge=1, description='ID del género'), db: AsyncSession = Depends(get_db)):
     try:
         # Consultamos el género por su ID. Si no existe, lanzamos una excepción
-        genero = db.query(Genero).filter(Genero.id == genero_id).first()
+        genero = await db.get(Genero, genero_id)
 
         # Si el género existe, lo eliminamos. Si no, lanzamos una excepción
         if genero:
-            db.delete(genero)
-            db.commit()
+            # Los libros del género cambian (su lista de géneros), así que se actualiza su fecha.
+            # Las relaciones y el género se borran con sentencias por conjunto: borrar el objeto
+            # obligaría a cargar antes la colección de libros
+            libros_del_genero = select(libros_generos.c.libro_id).where(libros_generos.c.genero_id == genero_id)
+            await db.execute(
+                update(Libro)
+                .where(Libro.id.in_(libros_del_genero))
+                .values(updated_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            await db.execute(delete(libros_generos).where(libros_generos.c.genero_id == genero_id))
+            await db.execute(delete(Genero).where(Genero.id == genero_id))
+            await db.commit()
+
+            # Recargamos el registro de géneros e invalidamos los libros en caché que lo tenían asignado
+            await registro_generos.cargar(db)
+            cache_libros.invalidar_si(lambda entrada: genero_id in entrada[0].generos)
 
             user_logger.info(f'Género eliminado: {genero.id}')
             
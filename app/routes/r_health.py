@@ -0,0 +1,80 @@
+# Rutas para comprobar el estado de la API
+
+# Importamos las librerías necesarias
+import asyncio
+import logging
+import os
+import time
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import SQLAlchemyError
+
+# Importamos la información de la máquina calculada en el arranque
+from utilities import host_info
+
+# Importamos las funciones de la base de datos
+from database import comprobar_db, get_pool_stats
+
+# Creamos el router para el estado de la API
+health_router = APIRouter(
+    prefix='/health',
+    tags=['Estado']
+)
+
+# Obtenemos los loggers (se configuran una sola vez en run.py)
+internal_logger = logging.getLogger('internal_activity')
+
+# Segundos durante los que se reutiliza el resultado de la comprobación de la base de datos
+TTL_READY = float(os.getenv('HEALTH_READY_TTL', '5'))
+
+# Último resultado de la comprobación de la base de datos
+estado_ready = {'ok': False, 'detalle': 'Sin comprobar', 'comprobado': 0.0}
+# Evita que varias peticiones simultáneas comprueben la base de datos a la vez
+lock_ready = asyncio.Lock()
+
+# Ruta para comprobar que el proceso está vivo. No hace ninguna operación de I/O
+@health_router.get(
+    '/live',
+    description='Comprobar que la API está viva',
+    responses={
+        200: {
+            'description': 'API en funcionamiento'
+        }
+    }
+)
+async def live():
+    return {'status': 'ok', **host_info}
+
+# Ruta para comprobar que la API puede atender peticiones (base de datos disponible)
+@health_router.get(
+    '/ready',
+    description='Comprobar que la API puede atender peticiones',
+    responses={
+        200: {
+            'description': 'API lista'
+        },
+        503: {
+            'description': 'Base de datos no disponible'
+        }
+    }
+)
+async def ready():
+    async with lock_ready:
+        # Solo se consulta la base de datos si el resultado anterior ha caducado
+        if time.monotonic() - estado_ready['comprobado'] > TTL_READY:
+            try:
+                await asyncio.wait_for(comprobar_db(), timeout=TTL_READY)
+                estado_ready.update(ok=True, detalle='Base de datos disponible')
+            except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+                internal_logger.error(f'Error al comprobar la base de datos: {str(e)}')
+                estado_ready.update(ok=False, detalle='Base de datos no disponible')
+
+            estado_ready['comprobado'] = time.monotonic()
+
+    contenido = {
+        'status': 'ok' if estado_ready['ok'] else 'error',
+        'detalle': estado_ready['detalle'],
+        'pool': get_pool_stats(),
+    }
+
+    return JSONResponse(status_code=200 if estado_ready['ok'] else 503, content=contenido)
@@ -1,26 +1,59 @@
 # Rutas para la entidad Libro
 
 # Importamos las librerías necesarias
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends, Path
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, HTTPException, Depends, Path, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, delete, func, tuple_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
-# Importamos el logger
-from log_config import setup_logger
-
 # Importamos las funciones de validación
 from validaciones import validar_isbn
+from isbn import formas_isbn
+
+# Importamos las funciones de paginación
+from paginacion import paginar, codificar_cursor_fecha, decodificar_cursor_fecha, LIMITE_POR_DEFECTO, LIMITE_MAXIMO
+
+# Importamos la caché de libros y el registro de géneros en memoria
+from cache import cache_libros, clave_libro_id, clave_libro_isbn, invalidar_libro
+from registro_generos import registro_generos
+
+# Importamos las funciones para las peticiones condicionales
+from condicional import respuesta_condicional, poner_cabeceras, version_recurso, version_coleccion
+
+# Importamos la proyección de filas y la respuesta JSON rápida para los listados
+from proyeccion import campos_libro, columnas_libro, filas_a_libros
+from respuestas import RespuestaJSON
 
 # Importamos las funciones necesarias para crear el pdf
 from functions import generar_pdf
 
+# Importamos las funciones para exportar el catálogo
+from exportacion import exportar_ndjson, exportar_csv
+
+# Importamos las funciones para la importación masiva
+from importacion import leer_filas, importar_libros, actualizar_libros
+
+# Importamos la búsqueda de texto completo
+from busqueda import buscar_libros
+
+# Importamos los filtros y las facetas de los listados
+from filtros import filtros_libros, condiciones, calcular_facetas
+
 # Importamos los modelos y esquemas necesarios
 from models.libro import Libro
-from schemas.libro_schemas import LibroResponse, LibroCreate, LibroUpdate
-from models.genero import Genero
+from schemas.libro_schemas import LibroResponse, LibroCreate, LibroUpdate, LibroPagina, LibroBulkResponse, LibroBusquedaPagina, LibroCambiosPagina, LibroPatch, LibroPatchResponse
 from models.autor import Autor
+from models.libros_generos import libros_generos
+from models.libros_autores import libros_autores
 
 # Importamos la función para obtener la base de datos
 from database import get_db
@@ -31,18 +64,77 @@ libros_router = APIRouter(
     tags=['Libros']
 )
 
-# Configuramos el logger
-user_logger, internal_logger = setup_logger()
+# Obtenemos los loggers (se configuran una sola vez en run.py)
+user_logger = logging.getLogger('user_activity')
+internal_logger = logging.getLogger('internal_activity')
+
+# Carga anticipada de las relaciones que se serializan en LibroResponse.
+# Con selectin se resuelven con una consulta por relación para toda la página
+# en lugar de dos consultas por cada libro (N+1). Con sesiones asíncronas es
+# además obligatorio: una carga perezosa al serializar no puede hacer I/O
+CARGA_RELACIONES = (selectinload(Libro.autores), selectinload(Libro.generos))
+
+async def diferencia_relacion(db: AsyncSession, columna, libro_id: int, nuevos) -> tuple[set, set]:
+    """
+    Función para calcular qué IDs hay que añadir y quitar de una relación de un libro
+
+    Solo se leen los IDs de la tabla de relación (índice de la clave primaria),
+    sin cargar los objetos relacionados.
+
+    Returns:
+    tuple: IDs a añadir e IDs a quitar
+
+    """
+    tabla = columna.table
+    actuales = set((await db.scalars(select(columna).where(tabla.c.libro_id == libro_id))).all())
+    nuevos = set(nuevos)
+
+    return nuevos - actuales, actuales - nuevos
+
+# Función para aplicar los cambios de una relación con un DELETE y un INSERT en bloque
+async def aplicar_diferencia(db: AsyncSession, columna, libro_id: int, anadir: set, quitar: set):
+    tabla = columna.table
+
+    if quitar:
+        await db.execute(delete(tabla).where(tabla.c.libro_id == libro_id, columna.in_(quitar)))
+    if anadir:
+        await db.execute(insert(tabla), [{'libro_id': libro_id, columna.key: id} for id in sorted(anadir)])
+
+# Margen de la consulta de cambios. Una transacción que empezó antes puede confirmar después
+# libros con una fecha anterior a la de los ya devueltos; los cambios más recientes que el
+# margen se dejan para la siguiente sincronización para no perderlos
+MARGEN_CAMBIOS = timedelta(seconds=float(os.getenv('CHANGES_SAFETY_MARGIN', '5')))
+
+# Función para pasar una fecha a UTC. Las fechas sin zona horaria (SQLite) ya son UTC
+def fecha_utc(fecha: datetime) -> datetime:
+    return fecha.replace(tzinfo=timezone.utc) if fecha.tzinfo is None else fecha.astimezone(timezone.utc)
+
+# Función para guardar un libro serializado y su versión (ETag y fecha de modificación)
+# en la caché por su ID y por su ISBN
+def guardar_libro_cache(libro: Libro):
+    entrada = (LibroResponse.model_validate(libro), *version_recurso(libro))
 
-# Ruta para obtener todos los libros
+    cache_libros.set(clave_libro_id(libro.id), entrada)
+    if libro.isbn:
+        cache_libros.set(clave_libro_isbn(libro.isbn), entrada)
+
+    return entrada
+
+# Ruta para obtener todos los libros (paginados por cursor)
 @libros_router.get(
     '/',
-    description='Obtener todos los libros',
-    response_model=list[LibroResponse],
+    description='Obtener los libros paginados por cursor, con filtros combinables y recuentos por faceta opcionales',
+    response_model=LibroPagina,
     responses={
         200: {
-            'description': 'Lista de libros',
-            'model': list[LibroResponse]
+            'description': 'Página de libros',
+            'model': LibroPagina
+        },
+        304: {
+            'description': 'Página no modificada'
+        },
+        400: {
+            'description': 'Cursor incorrecto'
         },
         404: {
             'description': 'No hay libros registrados'
@@ -52,125 +144,261 @@ user_logger, internal_logger = setup_logger()
         }
     }
 )
-async def get_libros(db: Session = Depends(get_db)):
+async def get_libros(
+    request: Request,
+    response: Response,
+    cursor: str = Query(None, description='Cursor de la página (next_cursor de la página anterior)'),
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO, description='Número de libros por página'),
+    facets: bool = Query(False, description='Incluir los recuentos por faceta de los libros filtrados'),
+    fields: str = Query(None, description='Campos a devolver separados por comas (por ejemplo: id,isbn,titulo,precio). Por defecto, todos'),
+    filtros: dict = Depends(filtros_libros),
+    db: AsyncSession = Depends(get_db),
+):
     try: 
-        # Consultamos los libros de la base de datos. Si no hay libros, se lanza una excepción
-        libros = db.query(Libro).all()
-
-        # Si hay libros, los devolvemos. Si no, lanzamos una excepción
-        if libros:
-            return libros
-        else:
+        # Consultamos la página de libros filtrados a partir del cursor. Solo se leen las
+        # columnas de los campos pedidos, sin crear objetos ORM
+        campos = campos_libro(fields)
+        consulta = select(*columnas_libro(campos)).where(*condiciones(filtros))
+        libros, next_cursor = await paginar(db, consulta, Libro.id, cursor, limit, escalares=False)
+
+        # Si no hay libros en la primera página sin filtros, lanzamos una excepción
+        if not libros and not cursor and not any(valor is not None for valor in filtros.values()):
             raise HTTPException(status_code=404, detail='No hay libros registrados')
+
+        # Las facetas pueden cambiar aunque no cambie la página, así que forman parte de su versión
+        facetas = await calcular_facetas(db, filtros) if facets else None
+
+        # Si el cliente ya tiene esta versión de la página, respondemos 304 sin serializarla
+        version = version_coleccion(libros, request.url.query, next_cursor, facetas)
+        no_modificado = respuesta_condicional(request, response, *version)
+        if no_modificado:
+            return no_modificado
+
+        # Se construye la respuesta directamente desde las filas, sin pasar por LibroResponse
+        respuesta = RespuestaJSON({'items': await filas_a_libros(db, libros, campos), 'next_cursor': next_cursor, 'facets': facetas})
+        poner_cabeceras(respuesta, *version)
+
+        return respuesta
         
     except SQLAlchemyError as e:
         internal_logger.error(f'Error al obtener los libros: {str(e)}')
         raise HTTPException(status_code=500, detail='Error obteniendo los libros')
     
-# Ruta para obtener un libro por su ID
+# Ruta para exportar el catálogo completo en streaming.
+# Se declara antes de '/{id}' para que 'export' no se interprete como un ID
 @libros_router.get(
-    '/{id}',
-    description='Obtener un libro por su ID',
-    response_model=LibroResponse,
+    '/export',
+    description='Exportar todos los libros en NDJSON o CSV (streaming)',
     responses={
         200: {
-            'description': 'Libro encontrado',
-            'model': LibroResponse
+            'description': 'Catálogo exportado',
+            'content': {
+                'application/x-ndjson': {},
+                'text/csv': {}
+            }
+        }
+    }
+)
+async def export_libros(formato: str = Query('ndjson', pattern='^(ndjson|csv)$', description='Formato de exportación: ndjson o csv')):
+    user_logger.info(f'Exportación del catálogo en {formato}')
+
+    if formato == 'csv':
+        return StreamingResponse(
+            exportar_csv(),
+            media_type='text/csv',
+            headers={'Content-Disposition': 'attachment; filename="libros.csv"'},
+        )
+
+    return StreamingResponse(exportar_ndjson(), media_type='application/x-ndjson')
+
+# Ruta para buscar libros por texto completo (título, descripción, editorial y autores)
+@libros_router.get(
+    '/search',
+    description='Buscar libros por título, descripción, editorial o nombre de autor, ordenados por relevancia',
+    response_model=LibroBusquedaPagina,
+    responses={
+        200: {
+            'description': 'Página de resultados',
+            'model': LibroBusquedaPagina
         },
-        404: {
-            'description': 'Libro no encontrado'
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def search_libros(
+    q: str = Query(..., min_length=1, max_length=200, description='Texto a buscar'),
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO, description='Número de libros por página'),
+    offset: int = Query(0, ge=0, description='Posición del primer resultado (next_offset de la página anterior)'),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        # Se pide un resultado más del límite para saber si hay una página siguiente
+        libros = await buscar_libros(db, q, limit + 1, offset, CARGA_RELACIONES)
+
+        next_offset = None
+        if len(libros) > limit:
+            libros = libros[:limit]
+            next_offset = offset + limit
+
+        return {'items': libros, 'next_offset': next_offset}
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al buscar libros: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error buscando los libros')
+
+# Ruta para obtener los libros modificados desde una fecha (sincronización incremental).
+# Se declara antes de '/{id}' para que 'changes' no se interprete como un ID
+@libros_router.get(
+    '/changes',
+    description='Obtener los libros creados o modificados desde una fecha, ordenados por fecha de actualización. Los libros eliminados no se incluyen',
+    response_model=LibroCambiosPagina,
+    responses={
+        200: {
+            'description': 'Página de libros modificados',
+            'model': LibroCambiosPagina
         },
-        422: {
-            'description': 'ID incorrecto'
+        400: {
+            'description': 'Cursor o campos incorrectos'
         },
         500: {
             'description': 'Error del servidor'
         }
     }
 )
-async def get_libro_by_id(id: int = Path(..., ge=1, description='ID del libro'), db: Session = Depends(get_db)):
+async def get_cambios_libros(
+    since: datetime = Query(..., description='Fecha desde la que se piden los cambios (ISO 8601). Para sincronizar, el next_since de la respuesta anterior'),
+    cursor: str = Query(None, description='Cursor de la página (next_cursor de la página anterior)'),
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO, description='Número de libros por página'),
+    fields: str = Query(None, description='Campos a devolver separados por comas. Por defecto, todos'),
+    db: AsyncSession = Depends(get_db),
+):
     try:
-        # Consultamos el libro por su ID
-        libro = db.query(Libro).filter(Libro.id == id).first()
+        campos = campos_libro(fields)
 
-        # Si el libro existe, lo devolvemos. Si no, lanzamos una excepción
-        if libro:
-            return libro
-        else:
-            raise HTTPException(status_code=404, detail='Libro no encontrado')
+        # Posición de la página: la del cursor o, en la primera página, la fecha since
+        desde, ultimo_id = decodificar_cursor_fecha(cursor) if cursor else (since, 0)
+        desde = fecha_utc(desde)
+
+        # Los cambios más recientes que el margen se dejan para la siguiente sincronización
+        hasta = datetime.now(timezone.utc) - MARGEN_CAMBIOS
+
+        # La consulta recorre el índice (updated_at, id) a partir de la posición de la página
+        filas = (await db.execute(
+            select(*columnas_libro(campos))
+            .where(tuple_(Libro.updated_at, Libro.id) > tuple_(desde, ultimo_id), Libro.updated_at < hasta)
+            .order_by(Libro.updated_at, Libro.id)
+            .limit(limit + 1)
+        )).all()
+
+        next_cursor = None
+        if len(filas) > limit:
+            filas = filas[:limit]
+            next_cursor = codificar_cursor_fecha(filas[-1].updated_at, filas[-1].id)
+
+        # La fecha de actualización se devuelve siempre, como un campo más
+        libros = await filas_a_libros(db, filas, [*campos, 'updated_at'])
+        for libro in libros:
+            libro.updated_at = fecha_utc(libro.updated_at).isoformat()
+
+        # La siguiente sincronización empieza en el último cambio devuelto
+        next_since = fecha_utc(filas[-1].updated_at) if filas else desde
+
+        return RespuestaJSON({'items': libros, 'next_cursor': next_cursor, 'next_since': next_since.isoformat()})
 
     except SQLAlchemyError as e:
-        internal_logger.error(f'Error al obtener el libro: {str(e)}')
-        raise HTTPException(status_code=500, detail='Error obteniendo el libro')
-    
-# Ruta para obtener un libro por su ISBN
+        internal_logger.error(f'Error al obtener los cambios de los libros: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error obteniendo los cambios de los libros')
+
+# Ruta para obtener un libro por su ID
 @libros_router.get(
-    '/isbn/{isbn}',
-    description='Obtener un libro por su ISBN',
+    '/{id}',
+    description='Obtener un libro por su ID',
     response_model=LibroResponse,
     responses={
         200: {
             'description': 'Libro encontrado',
             'model': LibroResponse
         },
+        304: {
+            'description': 'Libro no modificado'
+        },
         404: {
             'description': 'Libro no encontrado'
         },
+        422: {
+            'description': 'ID incorrecto'
+        },
         500: {
             'description': 'Error del servidor'
         }
     }
 )
-async def get_libro_by_isbn(isbn: str = Path(..., min_length=10, description='ISBN del libro (10 caracteres mín.)'), db: Session = Depends(get_db)):
+async def get_libro_by_id(request: Request, response: Response, id: int = Path(..., ge=1, description='ID del libro'), db: AsyncSession = Depends(get_db)):
     try:
-        # Comprobamos que el ISBN tenga 13 caracteres TODO: Podría hacerse una validación de ISBN de 10 dígitos
-        validar_isbn(isbn)
-        
-        # Consultamos el libro por su ISBN
-        libro = db.query(Libro).filter(Libro.isbn == isbn).first()
+        # Buscamos el libro en la caché. Si no está, lo consultamos y lo guardamos
+        entrada = cache_libros.get(clave_libro_id(id))
+        if not entrada:
+            libro = await db.scalar(select(Libro).options(*CARGA_RELACIONES).where(Libro.id == id))
 
-        # Si el libro existe, lo devolvemos. Si no, lanzamos una excepción
-        if libro:
-            return libro
-        else:
-            raise HTTPException(status_code=404, detail='Libro no encontrado')
+            # Si el libro no existe, lanzamos una excepción
+            if not libro:
+                raise HTTPException(status_code=404, detail='Libro no encontrado')
+
+            entrada = guardar_libro_cache(libro)
+
+        # Si el cliente ya tiene esta versión del libro respondemos 304. Si no, lo devolvemos
+        respuesta, etag, ultima_modificacion = entrada
+        return respuesta_condicional(request, response, etag, ultima_modificacion) or respuesta
 
     except SQLAlchemyError as e:
         internal_logger.error(f'Error al obtener el libro: {str(e)}')
         raise HTTPException(status_code=500, detail='Error obteniendo el libro')
     
-# Ruta para obtener todos los libros de un autor
+# Ruta para obtener un libro por su ISBN
 @libros_router.get(
-    '/autor/{autor}',
-    description='Obtener todos los libros de un autor',
-    response_model=list[LibroResponse],
+    '/isbn/{isbn}',
+    description='Obtener un libro por su ISBN',
+    response_model=LibroResponse,
     responses={
         200: {
-            'description': 'Lista de libros',
+            'description': 'Libro encontrado',
             'model': LibroResponse
         },
+        304: {
+            'description': 'Libro no modificado'
+        },
         404: {
-            'description': 'No hay libros del autor'
+            'description': 'Libro no encontrado'
         },
         500: {
             'description': 'Error del servidor'
         }
     }
 )
-async def get_libros_by_autor(autor: str = Path(..., description = 'Nombre del autor'), db: Session = Depends(get_db)):
+async def get_libro_by_isbn(request: Request, response: Response, isbn: str = Path(..., min_length=10, description='ISBN del libro (10 caracteres mín.)'), db: AsyncSession = Depends(get_db)):
     try:
-        # Consultamos los libros por el autor
-        libros = db.query(Libro).filter(Libro.autor == autor).all()
+        # Validamos el ISBN (10 o 13 dígitos, con o sin guiones) y lo pasamos a su forma canónica
+        isbn = validar_isbn(isbn)
+
+        # Buscamos el libro en la caché. Si no está, lo consultamos por su ISBN y lo guardamos
+        entrada = cache_libros.get(clave_libro_isbn(isbn))
+        if not entrada:
+            libro = await db.scalar(select(Libro).options(*CARGA_RELACIONES).where(Libro.isbn.in_(formas_isbn(isbn))))
+
+            # Si el libro no existe, lanzamos una excepción
+            if not libro:
+                raise HTTPException(status_code=404, detail='Libro no encontrado')
 
-        # Si hay libros, los devolvemos. Si no, lanzamos una excepción
-        if libros:
-            return libros
-        else:
-            raise HTTPException(status_code=404, detail='No hay libros del autor')
+            entrada = guardar_libro_cache(libro)
+
+        # Si el cliente ya tiene esta versión del libro respondemos 304. Si no, lo devolvemos
+        respuesta, etag, ultima_modificacion = entrada
+        return respuesta_condicional(request, response, etag, ultima_modificacion) or respuesta
 
     except SQLAlchemyError as e:
-        internal_logger.error(f'Error al obtener los libros: {str(e)}')
-        raise HTTPException(status_code=500, detail='Error obteniendo los libros')
+        internal_logger.error(f'Error al obtener el libro: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error obteniendo el libro')
     
 # Ruta para añadir un libro
 @libros_router.post(
@@ -193,32 +421,28 @@ async def get_libros_by_autor(autor: str = Path(..., description = 'Nombre del a
         }
     }
 )
-async def add_libro(libro: LibroCreate, db: Session = Depends(get_db)):
+async def add_libro(libro: LibroCreate, db: AsyncSession = Depends(get_db)):
     try:
         # ----------------------------- VALIDACIONES -----------------------------
-        # Comprobamos que el ISBN sea correcto
-        validar_isbn(libro.isbn)
-        # Comprobamos que no haya un libro con el mismo ISBN
-        if db.query(Libro).filter(Libro.isbn == libro.isbn).first():
+        # Comprobamos que el ISBN sea correcto y lo guardamos en su forma canónica (ISBN-13)
+        libro.isbn = validar_isbn(libro.isbn)
+        # Comprobamos que no haya un libro con el mismo ISBN (en cualquiera de sus formas)
+        if await db.scalar(select(Libro.id).where(Libro.isbn.in_(formas_isbn(libro.isbn))).limit(1)):
             raise HTTPException(status_code=409, detail=f'El libro con el ISBN - {libro.isbn} - ya existe')
         
         # ----------------------------- OBTENCIÓN DE DATOS -----------------------------
-        # Obtenemos los géneros del libro
-        if libro.generos:
-            generos = db.query(Genero).filter(Genero.id.in_(libro.generos)).all()
-
-            if len(generos) != len(libro.generos):
-                raise HTTPException(status_code=400, detail='Uno o más géneros no existen')
+        # Comprobamos los géneros del libro con el registro en memoria, sin consultar la base de datos
+        generos_id = sorted(set(libro.generos))
+        if await registro_generos.faltan(db, generos_id):
+            raise HTTPException(status_code=400, detail='Uno o más géneros no existen')
 
         # Obtenemos los autores del libro
+        autores = []
         if libro.autores:
-            autores = db.query(Autor).filter(Autor.id.in_(libro.autores)).all()
+            autores = (await db.scalars(select(Autor).where(Autor.id.in_(libro.autores)))).all()
 
-            if len(autores) != len(libro.autores):
+            if len(autores) != len(set(libro.autores)):
                 raise HTTPException(status_code=400, detail='Uno o más autores no existen')
-            
-        print(autores)
-        print(generos)
 
         # ----------------------------- CREACIÓN DEL OBJETO LIBRO -----------------------------
         # Creamos el objeto Libro
@@ -233,14 +457,16 @@ async def add_libro(libro: LibroCreate, db: Session = Depends(get_db)):
             num_paginas=libro.num_paginas,
             ano_edicion=libro.ano_edicion,
             precio=libro.precio,
-            generos=generos,
-            created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            ejemplares=libro.ejemplares,
+            disponibles=libro.ejemplares,
         )
 
-        # Añadimos el libro a la base de datos
+        # Añadimos el libro a la base de datos y sus géneros directamente en la tabla de relación
         db.add(nuevoLibro)
-        db.commit()
-        db.refresh(nuevoLibro)
+        await db.flush()
+        if generos_id:
+            await db.execute(insert(libros_generos), [{'libro_id': nuevoLibro.id, 'genero_id': genero_id} for genero_id in generos_id])
+        await db.commit()
 
         user_logger.info(f'Libro añadido: {nuevoLibro.titulo} - {nuevoLibro.isbn}')
         
@@ -249,7 +475,7 @@ async def add_libro(libro: LibroCreate, db: Session = Depends(get_db)):
             isbn=nuevoLibro.isbn,
             titulo=nuevoLibro.titulo,
             autores=[autor.id for autor in nuevoLibro.autores],
-            generos=[genero.id for genero in nuevoLibro.generos], 
+            generos=generos_id,
             descripcion=nuevoLibro.descripcion,
             editorial=nuevoLibro.editorial,
             pais=nuevoLibro.pais,
@@ -265,6 +491,70 @@ async def add_libro(libro: LibroCreate, db: Session = Depends(get_db)):
         internal_logger.error(f'Error al añadir el libro: {str(e)}')
         raise HTTPException(status_code=500, detail='Error añadiendo el libro')
     
+# Ruta para añadir libros en bloque
+@libros_router.post(
+    '/bulk',
+    description='Añadir libros en bloque (array JSON o NDJSON con Content-Type application/x-ndjson)',
+    response_model=LibroBulkResponse,
+    responses={
+        200: {
+            'description': 'Resultado de la importación con los errores por fila',
+            'model': LibroBulkResponse
+        },
+        400: {
+            'description': 'Cuerpo de la petición incorrecto'
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def add_libros_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    try:
+        # Leemos las filas del cuerpo de la petición
+        ndjson = 'ndjson' in request.headers.get('content-type', '')
+        try:
+            filas = leer_filas(await request.body(), ndjson)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f'Cuerpo de la petición incorrecto: {str(e)}')
+
+        resultado = await importar_libros(db, filas)
+
+        user_logger.info(f'Importación de libros: {resultado["insertados"]} de {resultado["total"]} insertados')
+
+        return resultado
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al importar los libros: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error importando los libros')
+
+# Ruta para actualizar campos de muchos libros a la vez
+@libros_router.patch(
+    '/bulk',
+    description='Actualizar campos de muchos libros a la vez, indicados por id o isbn, con sentencias UPDATE por lotes',
+    response_model=LibroPatchResponse,
+    responses={
+        200: {
+            'description': 'Resultado de la actualización de cada elemento',
+            'model': LibroPatchResponse
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def patch_libros_bulk(libros: list[LibroPatch], db: AsyncSession = Depends(get_db)):
+    try:
+        resultado = await actualizar_libros(db, libros)
+
+        user_logger.info(f'Actualización masiva de libros: {resultado["actualizados"]} de {resultado["total"]} actualizados')
+
+        return resultado
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al actualizar los libros: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error actualizando los libros')
+
 # Ruta para actualizar un libro
 @libros_router.put(
     '/{id}',
@@ -286,24 +576,39 @@ async def add_libro(libro: LibroCreate, db: Session = Depends(get_db)):
         }
     }
 )
-async def update_libro(libro_update: LibroUpdate, id: int = Path(..., ge=1, description='ID del libro'), db: Session = Depends(get_db)):
+async def update_libro(libro_update: LibroUpdate, id: int = Path(..., ge=1, description='ID del libro'), db: AsyncSession = Depends(get_db)):
     try:
-        libro = db.query(Libro).filter(Libro.id == id).first()
+        # Las relaciones no se cargan: se actualizan por diferencia en las tablas de relación
+        libro = await db.get(Libro, id)
 
         # Si el libro no existe, lanzamos una excepción
         if not libro:
             raise HTTPException(status_code=404, detail='Libro no encontrado')
-        
-        # Obtenemos los géneros del libro
-        if libro_update.generos:
-            generos = db.query(Genero).filter(Genero.id.in_(libro_update.generos)).all()
 
-            if len(generos) != len(libro_update.generos):
+        # Guardamos el ISBN anterior para invalidarlo en la caché si cambia
+        isbn_anterior = libro.isbn
+
+        # Calculamos los géneros y autores a añadir y quitar. Una lista vacía deja el libro sin ellos
+        generos = autores = None
+        if libro_update.generos is not None:
+            generos = await diferencia_relacion(db, libros_generos.c.genero_id, id, libro_update.generos)
+
+            # Los géneros nuevos se comprueban con el registro en memoria, sin consultar la base de datos
+            if await registro_generos.faltan(db, generos[0]):
                 raise HTTPException(status_code=400, detail='Uno o más géneros no existen')
-            
+
+        if libro_update.autores is not None:
+            autores = await diferencia_relacion(db, libros_autores.c.autor_id, id, libro_update.autores)
+
+            # Solo se comprueba que existan los autores nuevos
+            if autores[0] and len((await db.scalars(select(Autor.id).where(Autor.id.in_(autores[0])))).all()) != len(autores[0]):
+                raise HTTPException(status_code=400, detail='Uno o más autores no existen')
+
+        if libro_update.isbn:
+            libro_update.isbn = validar_isbn(libro_update.isbn)
+
         if libro_update.isbn and libro.isbn != libro_update.isbn:
-            validar_isbn(libro_update.isbn)
-            if db.query(Libro).filter(Libro.isbn == libro_update.isbn).first():
+            if await db.scalar(select(Libro.id).where(Libro.isbn.in_(formas_isbn(libro_update.isbn)), Libro.id != id).limit(1)):
                 raise HTTPException(status_code=409, detail=f'El libro con el ISBN - {libro_update.isbn} - ya existe')
             
         # Actualizamos los datos del libro
@@ -311,8 +616,6 @@ async def update_libro(libro_update: LibroUpdate, id: int = Path(..., ge=1, desc
             libro.isbn = libro_update.isbn
         if libro_update.titulo:
             libro.titulo = libro_update.titulo
-        if libro_update.autor:
-            libro.autor = libro_update.autor
         if libro_update.descripcion:
             libro.descripcion = libro_update.descripcion
         if libro_update.editorial:
@@ -327,16 +630,26 @@ async def update_libro(libro_update: LibroUpdate, id: int = Path(..., ge=1, desc
             libro.ano_edicion = libro_update.ano_edicion
         if libro_update.precio:
             libro.precio = libro_update.precio
-        if libro_update.generos:
-            generos = db.query(Genero).filter(Genero.id.in_(libro_update.generos)).all()
-            libro.generos = generos
 
-        # Actualizamos la fecha de actualización
-        libro.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # Solo se escriben las filas de relación que cambian: un DELETE y un INSERT por tabla
+        if generos:
+            await aplicar_diferencia(db, libros_generos.c.genero_id, id, *generos)
+        if autores:
+            await aplicar_diferencia(db, libros_autores.c.autor_id, id, *autores)
+
+        # Actualizamos la fecha de actualización con la hora de la base de datos. Se pone
+        # explícitamente porque si solo cambian los géneros o los autores no se actualiza la fila del libro
+        libro.updated_at = func.now()
+
+        # Guardamos los cambios en la base de datos y volvemos a consultar el libro
+        # con sus relaciones cargadas en lugar de hacer un refresh con cargas perezosas
+        await db.commit()
+        libro = await db.scalar(
+            select(Libro).options(*CARGA_RELACIONES).where(Libro.id == id).execution_options(populate_existing=True)
+        )
 
-        # Guardamos los cambios en la base de datos
-        db.commit()
-        db.refresh(libro)
+        # Invalidamos las entradas de la caché del libro
+        invalidar_libro(id, isbn_anterior, libro.isbn)
 
         user_logger.info(f'Libro actualizado: {libro.titulo} - {libro.isbn}')
         return libro
@@ -361,18 +674,21 @@ async def update_libro(libro_update: LibroUpdate, id: int = Path(..., ge=1, desc
         }
     }
 )
-async def delete_libro(id: int = Path(..., ge=1, description='ID del libro'), db: Session = Depends(get_db)):
+async def delete_libro(id: int = Path(..., ge=1, description='ID del libro'), db: AsyncSession = Depends(get_db)):
     try:
         # Consultamos el libro por su ID
-        libro = db.query(Libro).filter(Libro.id == id).first()
+        libro = await db.get(Libro, id)
 
         # Si el libro no existe, lanzamos una excepción
         if not libro:
             raise HTTPException(status_code=404, detail='Libro no encontrado')
         
         # Eliminamos el libro
-        db.delete(libro)
-        db.commit()
+        await db.delete(libro)
+        await db.commit()
+
+        # Invalidamos las entradas de la caché del libro
+        invalidar_libro(id, libro.isbn)
 
         user_logger.info(f'Libro eliminado: {libro.titulo} - {libro.isbn}')
         return None
@@ -386,25 +702,48 @@ async def delete_libro(id: int = Path(..., ge=1, description='ID del libro'), db
 @libros_router.get(
     '/pdf/download',
     description='Descargar un PDF con la lista de libros',
+    response_class=FileResponse,
     responses={
         200: {
-            'description': 'PDF descargado'
+            'description': 'PDF descargado',
+            'content': {
+                'application/pdf': {}
+            }
+        },
+        404: {
+            'description': 'No hay libros registrados'
         },
         500: {
             'description': 'Error del servidor'
         }
     }
 )
-async def download_pdf(db: Session = Depends(get_db)):
+async def download_pdf(db: AsyncSession = Depends(get_db)):
     try:
-        # Consultamos los libros de la base de datos
-        libros = db.query(Libro).all()
-
         # Si no hay libros, lanzamos una excepción
-        if not libros:
+        if not await db.scalar(select(Libro.id).limit(1)):
             raise HTTPException(status_code=404, detail='No hay libros registrados')
-        
-        # Generamos el PDF
-        generar_pdf(libros, 'lista_libros.pdf')
+
+        # Cada petición genera su propio fichero temporal para no pisarse con otras
+        fichero = tempfile.NamedTemporaryFile(prefix='lista_libros_', suffix='.pdf', delete=False)
+        fichero.close()
+
+        # Generamos el PDF en un hilo aparte para no bloquear el bucle de eventos
+        try:
+            total = await run_in_threadpool(generar_pdf, fichero.name)
+        except Exception:
+            os.remove(fichero.name)
+            raise
+
+        user_logger.info(f'PDF generado con {total} libros')
+
+        # Se envía el fichero por partes y se borra al terminar la respuesta
+        return FileResponse(
+            fichero.name,
+            media_type='application/pdf',
+            filename='lista_libros.pdf',
+            background=BackgroundTask(os.remove, fichero.name),
+        )
     except SQLAlchemyError as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        internal_logger.error(f'Error al generar el PDF: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error generando el PDF')
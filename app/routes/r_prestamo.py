@@ -0,0 +1,299 @@
+# Rutas para la entidad Préstamo
+
+# Importamos las librerías necesarias
+import logging
+from collections import defaultdict
+from fastapi import APIRouter, HTTPException, Depends, Path, Query
+from sqlalchemy import select, update, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+# Importamos las funciones de paginación
+from paginacion import paginar, LIMITE_POR_DEFECTO, LIMITE_MAXIMO
+
+# Importamos los modelos y esquemas necesarios
+from models.prestamo import Prestamo
+from models.prestamo_libros import prestamos_libros
+from models.libro import Libro
+from models.user import User
+from schemas.prestamo_schemas import PrestamoCreate, PrestamoResponse, PrestamoPagina, EstadoPrestamo
+
+# Importamos la función para obtener la base de datos
+from database import get_db
+
+# Creamos el router para los préstamos
+prestamos_router = APIRouter(
+    prefix='/prestamos',
+    tags=['Préstamos']
+)
+
+# Obtenemos los loggers (se configuran una sola vez en run.py)
+user_logger = logging.getLogger('user_activity')
+internal_logger = logging.getLogger('internal_activity')
+
+# Función para obtener los IDs de los libros de varios préstamos con una sola consulta
+async def libros_de_prestamos(db: AsyncSession, prestamos_id: list) -> dict:
+    libros = defaultdict(list)
+
+    if prestamos_id:
+        resultado = await db.execute(
+            select(prestamos_libros.c.prestamo_id, prestamos_libros.c.libro_id)
+            .where(prestamos_libros.c.prestamo_id.in_(prestamos_id))
+            .order_by(prestamos_libros.c.prestamo_id, prestamos_libros.c.libro_id)
+        )
+        for prestamo_id, libro_id in resultado.all():
+            libros[prestamo_id].append(libro_id)
+
+    return libros
+
+# Función para construir la respuesta de un préstamo
+def prestamo_a_respuesta(prestamo: Prestamo, libros_id: list[int]) -> PrestamoResponse:
+    return PrestamoResponse(
+        id=prestamo.id,
+        usuario_id=prestamo.usuario_id,
+        libros_id=libros_id,
+        fecha_prestamo=prestamo.fecha_prestamo,
+        fecha_devolucion=prestamo.fecha_devolucion,
+        estado=prestamo.estado,
+    )
+
+# Ruta para obtener los préstamos (paginados por cursor)
+@prestamos_router.get(
+    '/',
+    description='Obtener los préstamos paginados por cursor, filtrados por usuario, libro o estado',
+    response_model=PrestamoPagina,
+    responses={
+        200: {
+            'description': 'Página de préstamos',
+            'model': PrestamoPagina
+        },
+        400: {
+            'description': 'Cursor incorrecto'
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def get_prestamos(
+    usuario_id: int = Query(None, ge=1, description='ID del usuario'),
+    libro_id: int = Query(None, ge=1, description='ID del libro'),
+    estado: EstadoPrestamo = Query(None, description='Estado del préstamo'),
+    cursor: str = Query(None, description='Cursor de la página (next_cursor de la página anterior)'),
+    limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO, description='Número de préstamos por página'),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        # Los filtros usan los índices (usuario_id, estado) de prestamos y (libro_id, prestamo_id) de prestamos_libros
+        consulta = select(Prestamo)
+        if usuario_id:
+            consulta = consulta.where(Prestamo.usuario_id == usuario_id)
+        if estado:
+            consulta = consulta.where(Prestamo.estado == estado.value)
+        if libro_id:
+            consulta = consulta.where(Prestamo.id.in_(
+                select(prestamos_libros.c.prestamo_id).where(prestamos_libros.c.libro_id == libro_id)
+            ))
+
+        prestamos, next_cursor = await paginar(db, consulta, Prestamo.id, cursor, limit)
+        libros = await libros_de_prestamos(db, [prestamo.id for prestamo in prestamos])
+
+        return {
+            'items': [prestamo_a_respuesta(prestamo, libros[prestamo.id]) for prestamo in prestamos],
+            'next_cursor': next_cursor,
+        }
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al obtener los préstamos: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error obteniendo los préstamos')
+
+# Ruta para obtener un préstamo por su ID
+@prestamos_router.get(
+    '/{prestamo_id}',
+    description='Obtener un préstamo por su ID',
+    response_model=PrestamoResponse,
+    responses={
+        200: {
+            'description': 'Préstamo encontrado',
+            'model': PrestamoResponse
+        },
+        404: {
+            'description': 'Préstamo no encontrado'
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def get_prestamo(prestamo_id: int = Path(..., ge=1, description='ID del préstamo'), db: AsyncSession = Depends(get_db)):
+    try:
+        prestamo = await db.get(Prestamo, prestamo_id)
+
+        # Si el préstamo no existe, lanzamos una excepción
+        if not prestamo:
+            raise HTTPException(status_code=404, detail='Préstamo no encontrado')
+
+        libros = await libros_de_prestamos(db, [prestamo.id])
+
+        return prestamo_a_respuesta(prestamo, libros[prestamo.id])
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al obtener el préstamo: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error obteniendo el préstamo')
+
+# Ruta para crear un préstamo
+@prestamos_router.post(
+    '/',
+    description='Crear un préstamo de uno o varios libros',
+    response_model=PrestamoResponse,
+    status_code=201,
+    responses={
+        201: {
+            'description': 'Préstamo creado',
+            'model': PrestamoResponse
+        },
+        400: {
+            'description': 'Datos incorrectos'
+        },
+        404: {
+            'description': 'Usuario o libros no encontrados'
+        },
+        409: {
+            'description': 'Algún libro no tiene ejemplares disponibles'
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def create_prestamo(prestamo: PrestamoCreate, db: AsyncSession = Depends(get_db)):
+    try:
+        # ----------------------------- VALIDACIONES -----------------------------
+        libros_id = sorted(set(prestamo.libros_id))
+
+        if not libros_id:
+            raise HTTPException(status_code=400, detail='El préstamo debe incluir al menos un libro')
+        if prestamo.fecha_devolucion < prestamo.fecha_prestamo:
+            raise HTTPException(status_code=400, detail='La fecha de devolución no puede ser anterior a la de préstamo')
+
+        # En SQLite, que no tiene FOR UPDATE, la transacción toma el bloqueo de escritura
+        # antes de la primera lectura (BEGIN IMMEDIATE, ver configurar_sqlite)
+        await db.connection(execution_options={'bloqueo_escritura': True})
+
+        if not await db.scalar(select(User.id).where(User.id == prestamo.usuario_id)):
+            raise HTTPException(status_code=404, detail='Usuario no encontrado')
+
+        # ----------------------------- RESERVA DE EJEMPLARES -----------------------------
+        # Se bloquean las filas de los libros siempre en el mismo orden (por ID) para que dos
+        # préstamos simultáneos no se bloqueen mutuamente. Hasta el commit, ningún otro préstamo
+        # puede bloquear ni modificar la disponibilidad de estos libros
+        disponibles = dict((await db.execute(
+            select(Libro.id, Libro.disponibles).where(Libro.id.in_(libros_id)).order_by(Libro.id).with_for_update()
+        )).all())
+
+        no_encontrados = [id for id in libros_id if id not in disponibles]
+        if no_encontrados:
+            await db.rollback()
+            raise HTTPException(status_code=404, detail=f'Libros no encontrados: {no_encontrados}')
+
+        agotados = [id for id in libros_id if disponibles[id] < 1]
+        if agotados:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail=f'Libros sin ejemplares disponibles: {agotados}')
+
+        # Descontamos un ejemplar de cada libro. La condición evita prestar de más aunque
+        # la base de datos no soporte FOR UPDATE (SQLite). La disponibilidad no forma parte
+        # de la respuesta de los libros, así que no cambia su fecha de actualización (ni su ETag)
+        resultado = await db.execute(
+            update(Libro)
+            .where(Libro.id.in_(libros_id), Libro.disponibles > 0)
+            .values(disponibles=Libro.disponibles - 1, updated_at=Libro.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount != len(libros_id):
+            await db.rollback()
+            raise HTTPException(status_code=409, detail='Algún libro se ha quedado sin ejemplares disponibles')
+
+        # ----------------------------- CREACIÓN DEL PRÉSTAMO -----------------------------
+        nuevo_prestamo = Prestamo(
+            fecha_prestamo=prestamo.fecha_prestamo,
+            fecha_devolucion=prestamo.fecha_devolucion,
+            estado=EstadoPrestamo.activo.value,
+            usuario_id=prestamo.usuario_id,
+        )
+        db.add(nuevo_prestamo)
+        await db.flush()
+
+        await db.execute(insert(prestamos_libros), [{'prestamo_id': nuevo_prestamo.id, 'libro_id': id} for id in libros_id])
+        await db.commit()
+
+        user_logger.info(f'Préstamo creado: {nuevo_prestamo.id} - usuario {nuevo_prestamo.usuario_id} - libros {libros_id}')
+
+        return prestamo_a_respuesta(nuevo_prestamo, libros_id)
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al crear el préstamo: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error creando el préstamo')
+
+# Ruta para devolver un préstamo
+@prestamos_router.post(
+    '/{prestamo_id}/devolucion',
+    description='Devolver los libros de un préstamo',
+    response_model=PrestamoResponse,
+    responses={
+        200: {
+            'description': 'Préstamo devuelto',
+            'model': PrestamoResponse
+        },
+        404: {
+            'description': 'Préstamo no encontrado'
+        },
+        409: {
+            'description': 'El préstamo ya está devuelto'
+        },
+        500: {
+            'description': 'Error del servidor'
+        }
+    }
+)
+async def devolver_prestamo(prestamo_id: int = Path(..., ge=1, description='ID del préstamo'), db: AsyncSession = Depends(get_db)):
+    try:
+        # Marcamos el préstamo como devuelto solo si no lo estaba. Si dos peticiones lo
+        # devuelven a la vez, solo una actualiza la fila y repone los ejemplares
+        resultado = await db.execute(
+            update(Prestamo)
+            .where(Prestamo.id == prestamo_id, Prestamo.estado != EstadoPrestamo.devuelto.value)
+            .values(estado=EstadoPrestamo.devuelto.value)
+            .execution_options(synchronize_session=False)
+        )
+
+        if resultado.rowcount == 0:
+            existe = await db.scalar(select(Prestamo.id).where(Prestamo.id == prestamo_id))
+            await db.rollback()
+            if not existe:
+                raise HTTPException(status_code=404, detail='Préstamo no encontrado')
+            raise HTTPException(status_code=409, detail='El préstamo ya está devuelto')
+
+        # Reponemos un ejemplar de cada libro del préstamo, bloqueando sus filas en el
+        # mismo orden que al prestarlos
+        libros_id = (await libros_de_prestamos(db, [prestamo_id]))[prestamo_id]
+        if libros_id:
+            await db.execute(select(Libro.id).where(Libro.id.in_(libros_id)).order_by(Libro.id).with_for_update())
+            await db.execute(
+                update(Libro)
+                .where(Libro.id.in_(libros_id))
+                .values(disponibles=Libro.disponibles + 1, updated_at=Libro.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+
+        await db.commit()
+
+        prestamo = await db.get(Prestamo, prestamo_id, populate_existing=True)
+
+        user_logger.info(f'Préstamo devuelto: {prestamo_id} - libros {libros_id}')
+
+        return prestamo_a_respuesta(prestamo, libros_id)
+
+    except SQLAlchemyError as e:
+        internal_logger.error(f'Error al devolver el préstamo: {str(e)}')
+        raise HTTPException(status_code=500, detail='Error devolviendo el préstamo')
@@ -4,16 +4,24 @@
 import logging
 import uvicorn
 from fastapi import FastAPI, Request
-from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import time
+from contextlib import asynccontextmanager
+from sqlalchemy.exc import SQLAlchemyError
 
 # Importamos el logger de la API
-from log_config import setup_logger
+from log_config import setup_logger, detener_logger, get_log_stats
 
 # Importamos las librerías/funciones propias
-from utilities import get_ip
-from database import init_db, get_db, get_db_info, insertar_datos_ejemplo
+from utilities import cargar_host_info, host_info
+from cache import get_cache_stats
+from registro_generos import registro_generos
+from respuestas import RespuestaJSON
+from metricas import metricas_api, plantilla_ruta
+from migraciones import comprobar_revision
+from planificador import iniciar_tareas, detener_tareas, get_tareas_stats
+from database import engine, AsyncSessionLocal, close_db, get_db, get_db_info, get_pool_stats, insertar_datos_ejemplo
 
 # Modelos para crear las tablas de la base de datos
 from models import libro, user, prestamo, prestamo_libros, genero, libros_generos, autor, libros_autores
@@ -21,15 +29,68 @@ from models import libro, user, prestamo, prestamo_libros, genero, libros_genero
 # Importamos las rutas de la API
 from routes.r_libro import libros_router
 from routes.r_genero import generos_router
+from routes.r_autor import autores_router
+from routes.r_health import health_router
+from routes.r_prestamo import prestamos_router
 
-# Inicializamos el logger
+# Inicializamos el logger (una sola vez para toda la API)
 user_logger, internal_logger = setup_logger()
 
+# Comprobamos la base de datos. El esquema no se crea aquí: se aplica antes de arrancar
+# con las migraciones (python -m migraciones upgrade)
+def comprobar_esquema():
+    internal_logger.info('Comprobando la revisión del esquema de la base de datos...')
+
+    try:
+        actual, esperada = comprobar_revision(engine)
+    except SQLAlchemyError as e:
+        internal_logger.error(f'No se puede comprobar la revisión del esquema: {str(e)}')
+        raise
+
+    if actual < esperada:
+        internal_logger.error(f'El esquema está en la revisión {actual} y la API necesita la {esperada}. Ejecuta: python -m migraciones upgrade')
+        raise RuntimeError(f'El esquema de la base de datos no está actualizado: revisión {actual}, la API necesita la {esperada}')
+    if actual > esperada:
+        internal_logger.warning(f'El esquema está en la revisión {actual}, posterior a la {esperada} que conoce la API')
+
+    internal_logger.info(f'Esquema de la base de datos en la revisión {actual}')
+
+# Arranque y parada de la API
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Calculamos una sola vez la información de la máquina
+    cargar_host_info()
+
+    comprobar_esquema()
+
+    # Cargamos el registro de géneros y arrancamos las tareas periódicas (préstamos retrasados)
+    async with AsyncSessionLocal() as db:
+        await registro_generos.cargar(db)
+
+    internal_logger.info(f'Registro de géneros cargado: {len(registro_generos.filas)} géneros')
+
+    iniciar_tareas()
+
+    yield
+
+    # Paramos las tareas periódicas antes de cerrar las conexiones del motor asíncrono
+    await detener_tareas()
+
+    internal_logger.info('Cerrando las conexiones de la base de datos...')
+
+    await close_db()
+
+    # Vaciamos la cola de logs antes de terminar
+    detener_logger()
+
 app = FastAPI(
     title='API básica biblioteca',
     description='API básica para biblioteca',
     terms_of_service='http://example.com/terms/',
     version='0.0.1',
+    lifespan=lifespan,
+    # Respuesta JSON con orjson si está instalado
+    default_response_class=RespuestaJSON,
     contact={
         'name': 'Xulio',
         'url': 'http://example.com/contact/',
@@ -51,11 +112,27 @@ app.add_middleware(
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-
-    user_logger.info(f"{request.client.host} - {request.method} - {request.url.path} - {response.status_code} - {process_time:.2f}ms")
+    start_time = time.perf_counter()
+    # La ruta se registra por su plantilla ('/libros/{id}') para no crear una serie por URL
+    ruta = plantilla_ruta(app.router.routes, request.scope)
+    consultas, token = metricas_api.inicio_peticion(request.method, ruta)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        process_time = time.perf_counter() - start_time
+        metricas_api.fin_peticion(request.method, ruta, status, process_time, consultas, token)
+
+    user_logger.info('peticion', extra={
+        'ip': request.client.host if request.client else None,
+        'metodo': request.method,
+        'ruta': request.url.path,
+        'status': status,
+        'duracion_ms': round(process_time * 1000, 2),
+        'consultas_db': consultas.consultas,
+        'db_ms': round(consultas.segundos * 1000, 2),
+    })
 
     return response
 
@@ -63,28 +140,18 @@ async def log_requests(request: Request, call_next):
 # Añadimos las rutas a la API
 app.include_router(libros_router)
 app.include_router(generos_router)
-
-# Inicializamos la base de datos
-@app.on_event("startup")
-def startup ():
-    internal_logger.info('Iniciando la base de datos...')
-
-    try:
-        init_db()
-        internal_logger.info('Base de datos iniciada correctamente')
-    except Exception as e:
-        internal_logger.error(f'Error al iniciar la base de datos: {e}')
-        raise HTTPException(status_code=500, detail='Error al iniciar la base de datos')
+app.include_router(autores_router)
+app.include_router(health_router)
+app.include_router(prestamos_router)
 
 # Endpoint para comprobar que la API está funcionando
 @app.get(
         '/check',
         summary='Comprobar que la API está funcionando',
-        description='Comprueba que la API está funcionando correctamente',
+        description='Comprueba que la API está funcionando correctamente (ver también /health/live y /health/ready)',
 )
 def check():
-    ip = get_ip()
-    internal_logger.info(f'Peticion a /check: {ip}')
+    ip = host_info.get('ip')
     return {'IP': ip, 'status': 'API en funcionamiento' if ip else 'API no disponible'}
 
 # Endpoint para comprobar la base de datos
@@ -102,5 +169,48 @@ def db():
 
     return db_info
 
+# Endpoint para consultar las estadísticas del pool de conexiones
+@app.get(
+        '/db/pool',
+        summary='Estadísticas del pool de conexiones',
+        description='Devuelve las conexiones en uso, el overflow, el tiempo de espera y los fallos al obtener una conexión',
+)
+def db_pool():
+    return get_pool_stats()
+
+# Endpoint para consultar las estadísticas de la caché
+@app.get(
+        '/cache',
+        summary='Estadísticas de la caché',
+        description='Devuelve los aciertos, fallos y desalojos de la caché de libros y el estado del registro de géneros',
+)
+def cache():
+    return {**get_cache_stats(), 'registro_generos': registro_generos.stats()}
+
+# Endpoint para consultar las métricas de las tareas periódicas
+@app.get(
+        '/tareas',
+        summary='Métricas de las tareas periódicas',
+        description='Devuelve la duración de la última ejecución y los préstamos marcados como retrasados',
+)
+def tareas():
+    return get_tareas_stats()
+
+# Endpoint con las métricas de la API en formato Prometheus
+@app.get(
+        '/metrics',
+        summary='Métricas en formato Prometheus',
+        description='Devuelve la latencia por ruta, las peticiones en curso y por código de estado de cada ruta, las consultas a la base de datos y las estadísticas del pool, la caché, las tareas y los logs',
+        response_class=PlainTextResponse,
+)
+async def metrics():
+    estadisticas = {
+        'db_pool': get_pool_stats(),
+        'cache': {**get_cache_stats(), 'registro_generos': registro_generos.stats()},
+        'tareas': get_tareas_stats(),
+        'logs': get_log_stats(),
+    }
+    return PlainTextResponse(metricas_api.exponer(estadisticas), media_type='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     uvicorn.run(app='run:app', host='0.0.0.0', port=8995, reload=True, reload_excludes=['api.log'])
\ No newline at end of file
@@ -1,18 +1,19 @@
 from pydantic import BaseModel
+from typing import Optional
 from datetime import date, datetime
 
 class AutorBase(BaseModel):
     nombre: str
-    apellidos: str
+    apellido: str
     fecha_nacimiento: date
-    fecha_fallecimiento: date
+    fecha_fallecimiento: Optional[date] = None
     nacionalidad: str
     biografia: str
-    imagen: str
+    imagen: Optional[str] = None
 
 class AutorCreate(AutorBase):
     nombre: str
-    apellidos: str
+    apellido: str
     fecha_nacimiento: date
     fecha_fallecimiento: date = None
     nacionalidad: str
@@ -21,7 +22,7 @@ class AutorCreate(AutorBase):
 
 class AutorUpdate(AutorBase):
     nombre: str = None
-    apellidos: str = None
+    apellido: str = None
     fecha_nacimiento: date = None
     fecha_fallecimiento: date = None
     nacionalidad: str = None
@@ -36,7 +37,7 @@ class Autor(AutorBase):
 
 class AutorBasicResponse(BaseModel):
     nombre: str
-    apellidos: str
+    apellido: str
 
     class Config:
         from_attributes = True
@@ -59,4 +60,13 @@ class AutorInDB(AutorBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class AutorPagina(BaseModel):
+    items: list[AutorResponse]
+    next_cursor: Optional[str] = None
+
+class AutorSugerencia(BaseModel):
+    id: int
+    nombre: str
+    apellido: str
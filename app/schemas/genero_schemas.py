@@ -25,6 +25,10 @@ class GeneroResponse(GeneroBase):
     class Config:
         from_attributes = True
 
+class GeneroPagina(BaseModel):
+    items: list[GeneroResponse]
+    next_cursor: Optional[str] = None
+
 class GeneroLibroResponse(BaseModel):
     nombre: str
 
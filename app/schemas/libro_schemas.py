@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
+from typing import Optional, Union
 
 from .genero_schemas import GeneroResponse
 from .autor_schemas import AutorResponse, AutorBasicResponse
@@ -31,6 +32,8 @@ class LibroCreate(LibroBase):
     num_paginas: int
     ano_edicion: int 
     precio: float 
+    # Número de ejemplares para préstamo (puede no haber ninguno)
+    ejemplares: int = Field(1, ge=0)
 
 class LibroUpdate(LibroBase):
     titulo: str = None
@@ -53,6 +56,12 @@ class Libro(LibroBase):
 class LibroResponse(LibroBase):
     id: int
 
+    # Las relaciones del modelo son objetos Autor/Genero; se exponen sus IDs
+    @field_validator('autores', 'generos', mode='before')
+    @classmethod
+    def relaciones_a_ids(cls, valor):
+        return [item if isinstance(item, int) else item.id for item in valor]
+
     class Config:
         from_attributes = True
 
@@ -64,6 +73,65 @@ class LibroInDB(LibroBase):
     class Config:
         from_attributes = True
 
+class FacetaValor(BaseModel):
+    valor: Union[int, str]
+    total: int
+
+class LibroPagina(BaseModel):
+    items: list[LibroResponse]
+    next_cursor: Optional[str] = None
+    # Recuento de libros por faceta (solo si se piden con facets=true)
+    facets: Optional[dict[str, list[FacetaValor]]] = None
+
+class LibroCambio(LibroResponse):
+    updated_at: datetime
+
+class LibroCambiosPagina(BaseModel):
+    # Libros modificados ordenados por fecha de actualización
+    items: list[LibroCambio]
+    next_cursor: Optional[str] = None
+    # Valor de since para la siguiente sincronización
+    next_since: datetime
+
+class LibroBusquedaPagina(BaseModel):
+    # Libros ordenados por relevancia
+    items: list[LibroResponse]
+    next_offset: Optional[int] = None
+
+class LibroBulkError(BaseModel):
+    # Posición de la fila en la entrada (empezando en 0)
+    fila: int
+    isbn: Optional[str] = None
+    error: str
+
+class LibroBulkResponse(BaseModel):
+    total: int
+    insertados: int
+    errores: list[LibroBulkError]
 
+class LibroPatch(BaseModel):
+    # El libro se indica por su ID o por su ISBN (solo uno de los dos)
+    id: Optional[int] = None
+    isbn: Optional[str] = None
+    # Campos a cambiar. Los que no se envían (o son nulos) no se modifican
+    titulo: Optional[str] = None
+    descripcion: Optional[str] = None
+    editorial: Optional[str] = None
+    pais: Optional[str] = None
+    idioma: Optional[str] = None
+    num_paginas: Optional[int] = None
+    ano_edicion: Optional[int] = None
+    precio: Optional[float] = None
 
+class LibroPatchResultado(BaseModel):
+    # Posición del elemento en la entrada (empezando en 0)
+    fila: int
+    id: Optional[int] = None
+    isbn: Optional[str] = None
+    actualizado: bool
+    error: Optional[str] = None
 
+class LibroPatchResponse(BaseModel):
+    total: int
+    actualizados: int
+    resultados: list[LibroPatchResultado]
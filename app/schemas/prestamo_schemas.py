@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Optional
 from datetime import date
 from enum import Enum
 
@@ -27,6 +28,10 @@ class PrestamoResponse(PrestamoBase):
     class Config:
         from_attributes = True
 
+class PrestamoPagina(BaseModel):
+    items: list[PrestamoResponse]
+    next_cursor: Optional[str] = None
+
 class Prestamo(PrestamoBase):
     pass
 
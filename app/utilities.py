@@ -1,12 +1,33 @@
+import os
 import socket
+from datetime import datetime
+
+# Información de la máquina calculada una sola vez al arrancar la API
+host_info = {}
 
 # Función para obtener la IP de la máquina
 def get_ip():
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    s.connect(('8.8.8.8', 80))
-
-    ip = s.getsockname()[0]
 
-    s.close()
+    try:
+        # No se envía ningún paquete: solo se elige la interfaz de salida
+        s.connect(('8.8.8.8', 80))
+        ip = s.getsockname()[0]
+    except OSError:
+        # Sin red no hay ruta hacia fuera; usamos la IP local
+        ip = '127.0.0.1'
+    finally:
+        s.close()
     
-    return ip
\ No newline at end of file
+    return ip
+
+# Función para calcular la información de la máquina. Se llama en el arranque
+def cargar_host_info():
+    host_info.update({
+        'hostname': socket.gethostname(),
+        'ip': get_ip(),
+        'pid': os.getpid(),
+        'arranque': datetime.now().isoformat(timespec='seconds'),
+    })
+
+    return host_info
@@ -1,9 +1,12 @@
 # Se definen las funciones para validar diferentes campos.
 
-from isbnlib import is_isbn10, is_isbn13
 from fastapi import HTTPException
 
-# Función para validar el ISBN
-def validar_isbn(isbn: str):
-    if not is_isbn10(isbn) and not is_isbn13(isbn):
-        raise HTTPException(status_code=400, detail='El ISBN no es válido')
\ No newline at end of file
+from isbn import normalizar_isbn
+
+# Función para validar el ISBN. Devuelve su forma canónica (ISBN-13 sin guiones)
+def validar_isbn(isbn: str) -> str:
+    isbn_normalizado = normalizar_isbn(isbn)
+    if isbn_normalizado is None:
+        raise HTTPException(status_code=400, detail='El ISBN no es válido')
+    return isbn_normalizado
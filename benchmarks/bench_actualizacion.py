@@ -0,0 +1,87 @@
+# Benchmark de la actualización masiva: PUT /libros/{id} libro a libro (antes) frente a
+# PATCH /libros/bulk (después)
+#
+#     python benchmarks/bench_actualizacion.py [--libros 20000] [--individuales 1000]
+#
+# Simula una campaña de cambio de precios. Con PATCH /libros/bulk se mide el caso de un solo
+# grupo (todos los libros cambian el precio: un UPDATE por lote) y el de cuatro grupos de
+# campos distintos, indicando los libros por ID y por ISBN. Las actualizaciones de una en una
+# son lentas: se miden con --individuales libros y se dan en libros por segundo para comparar.
+
+import argparse
+import asyncio
+import time
+
+from comun import insertar_catalogo, isbn_prueba, libro_prueba, cliente_api, imprimir_tabla
+
+from database import async_engine
+
+# Función para medir los libros por segundo de una actualización
+async def libros_por_segundo(actualizar, cambios: list) -> float:
+    inicio = time.perf_counter()
+    actualizados = await actualizar(cambios)
+    segundos = time.perf_counter() - inicio
+
+    if actualizados != len(cambios):
+        raise RuntimeError(f'Se esperaban {len(cambios)} libros actualizados y hay {actualizados}')
+
+    return len(cambios) / segundos
+
+# Cambios de la campaña: precio nuevo de cada libro (la ronda cambia los valores en cada medida)
+def cambios_precio(libros: int, ronda: int) -> list:
+    return [{'id': i, 'precio': round(5 + (i * ronda) % 400 / 10, 2)} for i in range(1, libros + 1)]
+
+# Cambios de varios grupos de campos, con la mitad de los libros indicados por ISBN
+def cambios_mixtos(libros: int, ronda: int) -> list:
+    grupos = [
+        lambda i: {'precio': round(5 + (i * ronda) % 400 / 10, 2)},
+        lambda i: {'precio': round(6 + (i * ronda) % 300 / 10, 2), 'editorial': f'Editorial {ronda}'},
+        lambda i: {'titulo': f'Título {i} ({ronda})'},
+        lambda i: {'num_paginas': 100 + (i * ronda) % 500, 'ano_edicion': 1950 + ronda},
+    ]
+    return [
+        {**({'isbn': isbn_prueba(i)} if i % 2 else {'id': i}), **grupos[i % len(grupos)](i)}
+        for i in range(1, libros + 1)
+    ]
+
+async def main(args):
+    async with cliente_api() as cliente:
+        # Antes: una petición por libro con el libro completo (PUT no admite cambios parciales)
+        async def individual(cambios):
+            for cambio in cambios:
+                datos = {**libro_prueba(cambio['id']), 'precio': cambio['precio']}
+                respuesta = await cliente.put(f'/libros/{cambio["id"]}', json=datos)
+                respuesta.raise_for_status()
+            return len(cambios)
+
+        async def bulk(cambios):
+            respuesta = await cliente.patch('/libros/bulk', json=cambios)
+            return respuesta.json()['actualizados']
+
+        # Calentamiento: registro de géneros, compilación de las consultas...
+        await bulk(cambios_mixtos(100, 1))
+
+        resultados = [
+            (f'PUT /libros/{{id}} ({args.individuales} libros)', await libros_por_segundo(individual, cambios_precio(args.individuales, 2))),
+            (f'PATCH /libros/bulk, 1 grupo ({args.libros} libros)', await libros_por_segundo(bulk, cambios_precio(args.libros, 3))),
+            (f'PATCH /libros/bulk, 4 grupos ({args.libros} libros)', await libros_por_segundo(bulk, cambios_mixtos(args.libros, 4))),
+        ]
+
+    await async_engine.dispose()
+
+    referencia = resultados[0][1]
+    imprimir_tabla(
+        'Actualización masiva de libros',
+        ['método', 'libros/s', 'mejora'],
+        [(nombre, f'{libros:,.0f}', f'x{libros / referencia:.1f}') for nombre, libros in resultados],
+    )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Actualización de libros uno a uno frente a PATCH /libros/bulk')
+    parser.add_argument('--libros', type=int, default=20_000)
+    parser.add_argument('--individuales', type=int, default=1000)
+    args = parser.parse_args()
+
+    insertar_catalogo(args.libros)
+
+    asyncio.run(main(args))
@@ -0,0 +1,107 @@
+# Benchmark del autocompletado de autores (GET /autores/sugerencias), en milisegundos por consulta
+# y prefijo
+#
+#     python benchmarks/bench_autocompletado.py [--autores 100000] [--repeticiones 20]
+#
+# Compara la consulta de las rutas (unión de dos rangos sobre los índices de prefijo del nombre
+# completo y del apellido, cada uno con su límite) con la misma búsqueda escrita con LIKE y OR.
+# Con LIKE la base de datos puede usar los índices (un BitmapOr de los dos), pero tiene que leer
+# y ordenar todos los autores que coinciden antes de aplicar el límite: con prefijos cortos son
+# miles. Con los rangos cada rama se detiene en el límite.
+#
+# Los índices de prefijo solo existen en PostgreSQL (BENCH_DATABASE_URL): en SQLite las dos
+# consultas recorren la tabla.
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+from comun import preparar_bd, imprimir_tabla
+
+from sqlalchemy import insert, select, func, or_
+
+from database import engine, async_engine, AsyncSessionLocal
+from models.autor import Autor, nombre_completo_autor, apellido_autor
+from routes.r_autor import sugerir_autores
+
+NOMBRES = ['Gabriel', 'Federico', 'Jorge', 'Isabel', 'Julio', 'Rosalía', 'Miguel', 'Carmen', 'Pablo', 'Elena', 'Mario', 'Laura']
+APELLIDOS = ['García', 'Gómez', 'Martín', 'Márquez', 'López', 'Lorca', 'Borges', 'Cortázar', 'Allende', 'Castro', 'Pardo', 'Vargas']
+
+# Prefijos que se buscan: comunes (miles de autores), de nombre completo, raros y sin resultados
+PREFIJOS = ['g', 'gar', 'garcía', 'gabriel gar', 'castro1', 'lorca123', 'zzz']
+
+# Función para vaciar la base de datos e insertar los autores de prueba
+def insertar_autores(autores: int):
+    preparar_bd()
+
+    with engine.begin() as conexion:
+        conexion.execute(insert(Autor), [
+            {
+                'id': i,
+                'nombre': NOMBRES[i % len(NOMBRES)],
+                'apellido': f'{APELLIDOS[(i // len(NOMBRES)) % len(APELLIDOS)]}{i}',
+                'nacionalidad': 'es',
+                'fecha_nacimiento': date(1950, 1, 1),
+                'biografia': '-',
+            }
+            for i in range(1, autores + 1)
+        ])
+        if engine.dialect.name == 'postgresql':
+            conexion.exec_driver_sql('ANALYZE autores')
+
+# Antes: LIKE con OR sobre las dos expresiones, ordenado y limitado al final
+async def sugerir_con_like(db, q: str, limite: int) -> list:
+    prefijo = ' '.join(q.lower().split()) + '%'
+    resultado = await db.execute(
+        select(Autor.id, Autor.nombre, Autor.apellido)
+        .where(or_(nombre_completo_autor.like(prefijo), apellido_autor.like(prefijo)))
+        .order_by(Autor.apellido, Autor.nombre, Autor.id)
+        .limit(limite)
+    )
+    return resultado.all()
+
+# Función para medir las consultas de un prefijo. Devuelve la mediana en segundos
+async def medir(db, sugerir, prefijo: str, limite: int, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        await sugerir(db, prefijo, limite)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+async def main(args):
+    filas = []
+    async with AsyncSessionLocal() as db:
+        for prefijo in PREFIJOS:
+            # Las dos consultas tienen que dar los mismos autores
+            assert await sugerir_autores(db, prefijo, args.limite) == await sugerir_con_like(db, prefijo, args.limite), prefijo
+            coincidencias = await db.scalar(
+                select(func.count()).where(or_(nombre_completo_autor.like(prefijo + '%'), apellido_autor.like(prefijo + '%')))
+            )
+
+            antes = await medir(db, sugerir_con_like, prefijo, args.limite, args.repeticiones)
+            ahora = await medir(db, sugerir_autores, prefijo, args.limite, args.repeticiones)
+            filas.append((repr(prefijo), coincidencias, f'{antes * 1000:.2f}', f'{ahora * 1000:.2f}', f'x{antes / ahora:.1f}'))
+
+    await async_engine.dispose()
+
+    imprimir_tabla(
+        f'Autocompletado con {args.autores} autores, límite {args.limite}: mediana en ms de {args.repeticiones} consultas',
+        ['prefijo', 'autores', 'LIKE + OR (antes)', 'rangos de prefijo (ahora)', 'mejora'],
+        filas,
+    )
+    if engine.dialect.name != 'postgresql':
+        print('Sin los índices de prefijo de PostgreSQL las dos consultas recorren la tabla')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Coste del autocompletado de autores')
+    parser.add_argument('--autores', type=int, default=100_000)
+    parser.add_argument('--limite', type=int, default=10)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    insertar_autores(args.autores)
+
+    asyncio.run(main(args))
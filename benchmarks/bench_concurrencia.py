@@ -0,0 +1,91 @@
+# Benchmark de concurrencia: sesión síncrona dentro de rutas async (antes) frente a AsyncSession (después)
+#
+#     python benchmarks/bench_concurrencia.py [--peticiones 400] [--concurrencia 1 10 50] [--latencia-ms 2]
+#
+# Cada petición simulada hace una ida y vuelta a la base de datos y lee una página de libros.
+# SQLite no tiene red, así que la latencia de un servidor se simula con una función SQL que
+# espera --latencia-ms. Con la sesión síncrona la espera bloquea el bucle de eventos y las
+# peticiones van de una en una; con la asíncrona se espera en el hilo del driver y se solapan.
+
+import argparse
+import asyncio
+import time
+
+from comun import insertar_catalogo, imprimir_tabla
+
+from sqlalchemy import event, select, func
+
+from database import engine, async_engine, SessionLocal, AsyncSessionLocal
+from models.libro import Libro
+
+# Consultas de cada petición: la ida y vuelta simulada y una página de libros
+ESPERA = select(func.latencia())
+PAGINA = select(Libro.id, Libro.isbn, Libro.titulo, Libro.precio).order_by(Libro.id).limit(50)
+
+# Función para registrar la función SQL latencia() en las conexiones de SQLite de un motor
+def registrar_latencia(motor, segundos: float):
+    @event.listens_for(motor, 'connect')
+    def conectar(conexion_dbapi, registro):
+        conexion_dbapi.create_function('latencia', 0, lambda: time.sleep(segundos) or 0)
+
+# Antes: la ruta es async pero la sesión es síncrona y bloquea el bucle de eventos
+async def peticion_sincrona():
+    with SessionLocal() as db:
+        db.execute(ESPERA)
+        db.execute(PAGINA).all()
+
+# Después: la ruta espera a la base de datos sin bloquear el bucle de eventos
+async def peticion_asincrona():
+    async with AsyncSessionLocal() as db:
+        await db.execute(ESPERA)
+        (await db.execute(PAGINA)).all()
+
+# Función para lanzar las peticiones con una concurrencia máxima. Devuelve peticiones por segundo
+async def rendimiento(peticion, total: int, concurrencia: int) -> float:
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def una():
+        async with semaforo:
+            await peticion()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una() for _ in range(total)))
+    return total / (time.perf_counter() - inicio)
+
+async def main(args):
+    filas = []
+    for concurrencia in args.concurrencia:
+        # Calentamiento del pool de conexiones de cada motor
+        await rendimiento(peticion_sincrona, concurrencia, concurrencia)
+        await rendimiento(peticion_asincrona, concurrencia, concurrencia)
+
+        antes = await rendimiento(peticion_sincrona, args.peticiones, concurrencia)
+        despues = await rendimiento(peticion_asincrona, args.peticiones, concurrencia)
+        filas.append((concurrencia, f'{antes:.0f}', f'{despues:.0f}', f'x{despues / antes:.2f}'))
+
+    await async_engine.dispose()
+
+    imprimir_tabla(
+        f'Peticiones por segundo ({args.peticiones} peticiones, latencia simulada de {args.latencia_ms} ms)',
+        ['concurrencia', 'sesión síncrona', 'AsyncSession', 'mejora'],
+        filas,
+    )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrencia con sesión síncrona frente a AsyncSession')
+    parser.add_argument('--peticiones', type=int, default=400)
+    parser.add_argument('--concurrencia', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--latencia-ms', type=float, default=2.0)
+    parser.add_argument('--libros', type=int, default=1000)
+    args = parser.parse_args()
+
+    if engine.dialect.name != 'sqlite':
+        parser.error('Este benchmark simula la latencia con una función de SQLite: no indiques BENCH_DATABASE_URL')
+
+    insertar_catalogo(args.libros)
+
+    registrar_latencia(engine, args.latencia_ms / 1000)
+    registrar_latencia(async_engine.sync_engine, args.latencia_ms / 1000)
+    engine.dispose()
+
+    asyncio.run(main(args))
@@ -0,0 +1,81 @@
+# Benchmark de la importación de libros: POST /libros/ libro a libro (antes) frente a
+# POST /libros/bulk con un array JSON o con NDJSON (después)
+#
+#     python benchmarks/bench_importacion.py [--libros 20000] [--individuales 1000]
+#
+# Las peticiones van directamente a la aplicación ASGI, sin red, así que el resultado es el
+# coste de la API y la base de datos. Con PostgreSQL (BENCH_DATABASE_URL) cada ida y vuelta
+# a la base de datos cuenta y la diferencia es mayor. Las altas de una en una son lentas:
+# se miden con --individuales libros y se dan en filas por segundo para comparar.
+
+import argparse
+import asyncio
+import json
+import time
+
+from comun import insertar_catalogo, libro_prueba, vaciar_libros, cliente_api, imprimir_tabla
+
+from database import async_engine
+
+# Función para medir las filas por segundo de una importación que empieza con la tabla vacía
+async def filas_por_segundo(importar, libros: list) -> float:
+    vaciar_libros()
+
+    inicio = time.perf_counter()
+    insertados = await importar(libros)
+    segundos = time.perf_counter() - inicio
+
+    if insertados != len(libros):
+        raise RuntimeError(f'Se esperaban {len(libros)} libros insertados y hay {insertados}')
+
+    return len(libros) / segundos
+
+async def main(args):
+    libros = [libro_prueba(i) for i in range(1, args.libros + 1)]
+
+    async with cliente_api() as cliente:
+        # Antes: una petición (y una transacción) por libro
+        async def individual(libros):
+            for libro in libros:
+                respuesta = await cliente.post('/libros/', json=libro)
+                respuesta.raise_for_status()
+            return len(libros)
+
+        async def bulk_json(libros):
+            respuesta = await cliente.post('/libros/bulk', content=json.dumps(libros), headers={'Content-Type': 'application/json'})
+            return respuesta.json()['insertados']
+
+        async def bulk_ndjson(libros):
+            cuerpo = '\n'.join(json.dumps(libro) for libro in libros)
+            respuesta = await cliente.post('/libros/bulk', content=cuerpo, headers={'Content-Type': 'application/x-ndjson'})
+            return respuesta.json()['insertados']
+
+        casos = [
+            (f'POST /libros/ ({args.individuales} libros)', individual, libros[:args.individuales]),
+            (f'POST /libros/bulk JSON ({args.libros} libros)', bulk_json, libros),
+            (f'POST /libros/bulk NDJSON ({args.libros} libros)', bulk_ndjson, libros),
+        ]
+
+        # Calentamiento: carga del registro de géneros, compilación de las consultas...
+        await bulk_json(libros[:100])
+
+        resultados = [(nombre, await filas_por_segundo(importar, datos)) for nombre, importar, datos in casos]
+
+    await async_engine.dispose()
+
+    referencia = resultados[0][1]
+    imprimir_tabla(
+        'Importación de libros',
+        ['método', 'filas/s', 'mejora'],
+        [(nombre, f'{filas:,.0f}', f'x{filas / referencia:.1f}') for nombre, filas in resultados],
+    )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Importación de libros uno a uno frente a POST /libros/bulk')
+    parser.add_argument('--libros', type=int, default=20_000)
+    parser.add_argument('--individuales', type=int, default=1000)
+    args = parser.parse_args()
+
+    insertar_catalogo(0)
+
+    asyncio.run(main(args))
@@ -0,0 +1,89 @@
+# Benchmark de la validación de ISBN: isbnlib (antes) frente al módulo isbn (después)
+#
+#     python benchmarks/bench_isbn.py [--isbns 100000]
+#
+# Antes se validaba cada ISBN con isbnlib.is_isbn10/is_isbn13, sin normalizarlo. Ahora se
+# normaliza a ISBN-13 con normalizar_isbn (memorizado, para las lecturas por ISBN) o con
+# normalizar_lote (sumas de control de todo el lote a la vez, para las importaciones).
+# Para comparar lo mismo, isbnlib también normaliza con to_isbn13 y canonical.
+# Necesita isbnlib (pip install isbnlib).
+
+import argparse
+
+from comun import cronometrar, imprimir_tabla
+
+from isbn import normalizar_isbn, normalizar_lote, control_isbn10, control_isbn13
+
+# Función para generar ISBN válidos: ISBN-13, ISBN-10 y con guiones, a partes iguales
+def generar_isbns(total: int) -> list[str]:
+    isbns = []
+    for i in range(total):
+        digitos = f'{i * 7919 % 10**9:09d}'
+        if i % 3 == 0:
+            isbns.append(f'978{digitos}{control_isbn13("978" + digitos)}')
+        elif i % 3 == 1:
+            isbns.append(f'{digitos}{control_isbn10(digitos)}')
+        else:
+            isbns.append(f'978-{digitos[:1]}-{digitos[1:4]}-{digitos[4:]}-{control_isbn13("978" + digitos)}')
+    return isbns
+
+def main(args):
+    try:
+        import isbnlib
+    except ImportError:
+        raise SystemExit('Este benchmark necesita isbnlib: pip install isbnlib')
+
+    isbns = generar_isbns(args.isbns)
+
+    # Antes: solo validación, como hacía validar_isbn
+    def isbnlib_validar():
+        for isbn in isbns:
+            if not isbnlib.is_isbn10(isbn) and not isbnlib.is_isbn13(isbn):
+                raise ValueError(isbn)
+
+    # Antes, normalizando también a ISBN-13
+    def isbnlib_normalizar():
+        for isbn in isbns:
+            isbnlib.to_isbn13(isbnlib.canonical(isbn))
+
+    # Después, con cada ISBN por primera vez (sin caché)
+    def isbn_sin_cache():
+        for isbn in isbns:
+            normalizar_isbn.__wrapped__(isbn)
+
+    # Después, con la caché caliente (lecturas repetidas del mismo ISBN)
+    def isbn_con_cache():
+        for isbn in isbns:
+            normalizar_isbn(isbn)
+
+    def isbn_lote():
+        normalizar_lote(isbns)
+
+    # Todos dan el mismo resultado
+    assert normalizar_lote(isbns) == [isbnlib.to_isbn13(isbnlib.canonical(isbn)) for isbn in isbns]
+
+    normalizar_isbn.cache_clear()
+    isbn_con_cache()
+
+    casos = [
+        ('isbnlib is_isbn10/is_isbn13 (antes)', isbnlib_validar),
+        ('isbnlib canonical + to_isbn13', isbnlib_normalizar),
+        ('normalizar_isbn sin caché', isbn_sin_cache),
+        ('normalizar_isbn con caché', isbn_con_cache),
+        ('normalizar_lote', isbn_lote),
+    ]
+
+    tiempos = [(nombre, cronometrar(funcion, args.repeticiones)) for nombre, funcion in casos]
+    referencia = tiempos[0][1]
+
+    imprimir_tabla(
+        f'Validación de {args.isbns} ISBN',
+        ['método', 'ms', 'ISBN/s', 'frente a isbnlib'],
+        [(nombre, f'{tiempo * 1000:.1f}', f'{args.isbns / tiempo:,.0f}', f'x{referencia / tiempo:.2f}') for nombre, tiempo in tiempos],
+    )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Validación de ISBN con isbnlib frente al módulo isbn')
+    parser.add_argument('--isbns', type=int, default=100_000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,153 @@
+# Benchmark de la memoria y el tiempo de construir una página del listado de libros,
+# con todos los campos y con los de resumen (fields=id,isbn,titulo,precio)
+#
+#     python benchmarks/bench_proyeccion.py [--libros 1000] [--descripcion 2000] [--repeticiones 10]
+#
+# Compara tres formas de obtener la página:
+#   - objetos ORM completos con sus relaciones (selectinload): todas las columnas, también
+#     la descripción, aunque no se pidan
+#   - proyección de las columnas pedidas en diccionarios (la de antes)
+#   - proyección de las columnas pedidas en objetos con __slots__ (proyeccion.filas_a_libros)
+#
+# La memoria es la máxima reservada al cargar la página (tracemalloc) y el tiempo incluye
+# la consulta y la codificación de la respuesta con la clase por defecto de la API.
+
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from comun import insertar_catalogo, imprimir_tabla
+
+from sqlalchemy import select, update
+
+from database import engine, async_engine, AsyncSessionLocal
+from models.libro import Libro
+from models.libros_autores import libros_autores
+from models.libros_generos import libros_generos
+from proyeccion import campos_libro, columnas_libro, filas_a_libros, ids_relacionados
+from respuestas import RespuestaJSON
+from routes.r_libro import CARGA_RELACIONES
+
+CAMPOS = {
+    'todos': campos_libro(None),
+    'resumen': campos_libro('id,isbn,titulo,precio'),
+}
+
+# Antes: objetos ORM completos, convertidos en diccionarios con los campos pedidos
+async def cargar_orm(db, campos: list, limite: int) -> list:
+    libros = (await db.scalars(select(Libro).options(*CARGA_RELACIONES).order_by(Libro.id).limit(limite))).all()
+    resultado = []
+    for libro in libros:
+        datos = {}
+        for campo in campos:
+            valor = getattr(libro, campo)
+            if campo in ('autores', 'generos'):
+                valor = [relacionado.id for relacionado in valor]
+            elif campo == 'precio' and valor is not None:
+                valor = float(valor)
+            datos[campo] = valor
+        resultado.append(datos)
+    return resultado
+
+# Antes: proyección de las columnas en un diccionario por libro
+async def cargar_diccionarios(db, campos: list, limite: int) -> list:
+    filas = (await db.execute(select(*columnas_libro(campos)).order_by(Libro.id).limit(limite))).all()
+    libros_id = [fila.id for fila in filas]
+    relacionados = {}
+    if 'autores' in campos:
+        relacionados['autores'] = await ids_relacionados(db, libros_autores, libros_autores.c.autor_id, libros_id)
+    if 'generos' in campos:
+        relacionados['generos'] = await ids_relacionados(db, libros_generos, libros_generos.c.genero_id, libros_id)
+
+    libros = []
+    for fila in filas:
+        libro = {}
+        for campo in campos:
+            if campo in relacionados:
+                libro[campo] = relacionados[campo][fila.id]
+            elif campo == 'precio':
+                libro[campo] = float(fila.precio) if fila.precio is not None else None
+            else:
+                libro[campo] = getattr(fila, campo)
+        libros.append(libro)
+    return libros
+
+# Ahora: proyección de las columnas en objetos con __slots__
+async def cargar_proyeccion(db, campos: list, limite: int) -> list:
+    filas = (await db.execute(select(*columnas_libro(campos)).order_by(Libro.id).limit(limite))).all()
+    return await filas_a_libros(db, filas, campos)
+
+# Función para medir la memoria máxima al cargar una página, en bytes por libro. Incluye
+# los objetos intermedios (filas, objetos ORM) aunque luego se liberen
+async def medir_memoria(cargar, campos: list, limite: int) -> float:
+    async with AsyncSessionLocal() as db:
+        # Una primera carga para que las cachés de las sentencias no cuenten
+        await cargar(db, campos, limite)
+        db.expunge_all()
+
+        tracemalloc.start()
+        libros = await cargar(db, campos, limite)
+        _, maximo = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    assert len(libros) == limite
+    return maximo / limite
+
+# Función para medir el tiempo de una página (carga y codificación). Devuelve la mediana en segundos
+async def medir_tiempo(cargar, campos: list, limite: int, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        # Sesión nueva en cada repetición para que el mapa de identidad no guarde los objetos
+        async with AsyncSessionLocal() as db:
+            inicio = time.perf_counter()
+            cuerpo = RespuestaJSON({'items': await cargar(db, campos, limite)}).body
+            tiempos.append(time.perf_counter() - inicio)
+        assert cuerpo
+    return statistics.median(tiempos)
+
+async def main(args):
+    caminos = [
+        ('ORM completo (antes)', cargar_orm),
+        ('proyección en diccionarios', cargar_diccionarios),
+        ('proyección con __slots__ (ahora)', cargar_proyeccion),
+    ]
+
+    filas = []
+    for nombre_campos, campos in CAMPOS.items():
+        # Los tres caminos tienen que dar los mismos libros
+        async with AsyncSessionLocal() as db:
+            esperados = await cargar_diccionarios(db, campos, args.libros)
+            assert [dict(zip(campos, (getattr(libro, campo) for campo in campos))) for libro in await cargar_proyeccion(db, campos, args.libros)] == esperados
+        async with AsyncSessionLocal() as db:
+            orm = await cargar_orm(db, campos, args.libros)
+        assert [libro['id'] for libro in orm] == [libro['id'] for libro in esperados]
+
+        referencia = None
+        for nombre, cargar in caminos:
+            memoria = await medir_memoria(cargar, campos, args.libros)
+            tiempo = await medir_tiempo(cargar, campos, args.libros, args.repeticiones)
+            referencia = referencia or (memoria, tiempo)
+            filas.append((nombre_campos, nombre, f'{memoria:.0f}', f'x{referencia[0] / memoria:.1f}', f'{tiempo * 1000:.1f}', f'x{referencia[1] / tiempo:.2f}'))
+
+    await async_engine.dispose()
+
+    imprimir_tabla(
+        f'Página de {args.libros} libros con descripciones de {args.descripcion} caracteres (tiempo: mediana de {args.repeticiones})',
+        ['campos', 'camino', 'bytes/libro', 'memoria', 'ms/página', 'tiempo'],
+        filas,
+    )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Memoria y tiempo de las páginas del listado de libros')
+    parser.add_argument('--libros', type=int, default=1000)
+    parser.add_argument('--descripcion', type=int, default=2000, help='Longitud de las descripciones de los libros')
+    parser.add_argument('--repeticiones', type=int, default=10)
+    args = parser.parse_args()
+
+    insertar_catalogo(args.libros)
+    with engine.begin() as conexion:
+        conexion.execute(update(Libro).values(descripcion=Libro.descripcion + ' ' + 'x' * args.descripcion))
+
+    asyncio.run(main(args))
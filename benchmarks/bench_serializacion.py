@@ -0,0 +1,117 @@
+# Benchmark de la serialización de los listados de libros, en milisegundos por cada 1000 libros
+#
+#     python benchmarks/bench_serializacion.py [--libros 1000] [--repeticiones 10]
+#
+# Compara cada combinación de:
+#   - carga: objetos ORM con sus relaciones (selectinload) frente a la proyección de columnas
+#     de proyeccion.filas_a_libros (sin objetos ORM)
+#   - conversión: LibroResponse (from_attributes) + jsonable_encoder, como hace FastAPI con
+#     response_model, frente a los objetos con __slots__ de la proyección
+#   - codificación: json de la biblioteca estándar (JSONResponse y RespuestaJSONEstandar) frente
+#     a RespuestaORJSON
+#
+# La primera fila es el camino de antes (ORM + LibroResponse + json) y la última el de ahora
+# (proyección + RespuestaORJSON, la respuesta por defecto de la API).
+
+import argparse
+import asyncio
+import json
+import time
+
+from comun import insertar_catalogo, imprimir_tabla
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+
+from database import async_engine, AsyncSessionLocal
+from models.libro import Libro
+from proyeccion import campos_libro, columnas_libro, filas_a_libros
+from respuestas import RespuestaORJSON, RespuestaJSONEstandar, orjson
+from routes.r_libro import CARGA_RELACIONES
+from schemas.libro_schemas import LibroResponse
+
+CAMPOS = campos_libro(None)
+
+# ----------------------------- CARGA -----------------------------
+async def cargar_orm(db, limite: int) -> list:
+    return (await db.scalars(select(Libro).options(*CARGA_RELACIONES).order_by(Libro.id).limit(limite))).all()
+
+async def cargar_proyeccion(db, limite: int) -> list:
+    filas = (await db.execute(select(*columnas_libro(CAMPOS)).order_by(Libro.id).limit(limite))).all()
+    return await filas_a_libros(db, filas, CAMPOS)
+
+# ----------------------------- CONVERSIÓN Y CODIFICACIÓN -----------------------------
+def con_modelo(clase_respuesta):
+    def serializar(libros):
+        return clase_respuesta(jsonable_encoder([LibroResponse.model_validate(libro) for libro in libros]))
+    return serializar
+
+def sin_modelo(clase_respuesta):
+    def serializar(libros):
+        return clase_respuesta(libros)
+    return serializar
+
+# Función para medir el mejor tiempo de carga y de serialización de un camino
+async def medir(cargar, serializar, limite: int, repeticiones: int) -> tuple[float, float]:
+    mejor_carga = mejor_serializacion = float('inf')
+
+    for _ in range(repeticiones):
+        # Sesión nueva en cada repetición para que el mapa de identidad no guarde los objetos
+        async with AsyncSessionLocal() as db:
+            inicio = time.perf_counter()
+            libros = await cargar(db, limite)
+            mitad = time.perf_counter()
+            cuerpo = serializar(libros).body
+            fin = time.perf_counter()
+
+        assert len(libros) == limite and cuerpo
+        mejor_carga = min(mejor_carga, mitad - inicio)
+        mejor_serializacion = min(mejor_serializacion, fin - mitad)
+
+    return mejor_carga, mejor_serializacion
+
+async def main(args):
+    caminos = [
+        ('ORM + LibroResponse + json (antes)', cargar_orm, con_modelo(JSONResponse)),
+        ('proyección + json', cargar_proyeccion, sin_modelo(RespuestaJSONEstandar)),
+    ]
+    if orjson is not None:
+        caminos[1:1] = [('ORM + LibroResponse + orjson', cargar_orm, con_modelo(RespuestaORJSON))]
+        caminos.append(('proyección + orjson (ahora)', cargar_proyeccion, sin_modelo(RespuestaORJSON)))
+
+    # Los dos caminos tienen que dar los mismos datos (el orden de las claves puede cambiar)
+    async with AsyncSessionLocal() as db:
+        antes = con_modelo(JSONResponse)(await cargar_orm(db, args.libros)).body
+    async with AsyncSessionLocal() as db:
+        ahora = sin_modelo(RespuestaJSONEstandar)(await cargar_proyeccion(db, args.libros)).body
+    assert json.loads(antes) == json.loads(ahora), 'La proyección no da los mismos datos que LibroResponse'
+
+    factor = 1000 / args.libros * 1000
+    filas = []
+    referencia = None
+    for nombre, cargar, serializar in caminos:
+        carga, serializacion = await medir(cargar, serializar, args.libros, args.repeticiones)
+        total = carga + serializacion
+        referencia = referencia or total
+        filas.append((nombre, f'{carga * factor:.1f}', f'{serializacion * factor:.1f}', f'{total * factor:.1f}', f'x{referencia / total:.2f}'))
+
+    await async_engine.dispose()
+
+    imprimir_tabla(
+        f'Listado de {args.libros} libros: ms por cada 1000 libros (mejor de {args.repeticiones})',
+        ['camino', 'carga', 'serialización', 'total', 'mejora'],
+        filas,
+    )
+    if orjson is None:
+        print('orjson no está instalado: solo se mide el json de la biblioteca estándar')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Coste de serializar los listados de libros')
+    parser.add_argument('--libros', type=int, default=1000)
+    parser.add_argument('--repeticiones', type=int, default=10)
+    args = parser.parse_args()
+
+    insertar_catalogo(args.libros)
+
+    asyncio.run(main(args))
@@ -0,0 +1,136 @@
+# Utilidades comunes de los benchmarks
+#
+# Se ejecutan desde la raíz del repositorio:
+#
+#     python benchmarks/bench_<nombre>.py
+#
+# Usan la base de datos de BENCH_DATABASE_URL (nunca la de DATABASE_URL, porque se vacía)
+# o, si no se indica, una base de datos SQLite temporal con el esquema de las migraciones.
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIO = tempfile.mkdtemp(prefix='biblioteca_bench_')
+
+os.environ['DATABASE_URL'] = os.getenv('BENCH_DATABASE_URL') or f'sqlite:///{os.path.join(DIRECTORIO, "bench.db")}'
+os.environ.pop('ASYNC_DATABASE_URL', None)
+sys.path.insert(0, os.path.join(RAIZ, 'app'))
+
+# Los logs de la API se escriben en el directorio temporal
+os.chdir(DIRECTORIO)
+
+from sqlalchemy import insert
+
+from database import engine, Base
+from isbn import control_isbn13
+from migraciones import aplicar_migraciones
+from models import libro, user, prestamo, prestamo_libros, genero, libros_generos, autor, libros_autores
+
+# Palabras para los títulos y descripciones de los libros de prueba
+PALABRAS = ['soledad', 'amor', 'guerra', 'mar', 'ciudad', 'noche', 'tiempo', 'sombra', 'viento', 'memoria', 'silencio', 'fuego']
+
+# Función para generar el ISBN-13 válido número i
+def isbn_prueba(i: int) -> str:
+    base = f'978{i:09d}'
+    return base + control_isbn13(base)
+
+# Función para generar los datos de un libro de prueba (como los recibe la API)
+def libro_prueba(i: int, generos: int = 20, autores: int = 200) -> dict:
+    return {
+        'isbn': isbn_prueba(i),
+        'titulo': f'{PALABRAS[i % len(PALABRAS)]} {PALABRAS[(i // 7) % len(PALABRAS)]} {i}',
+        'autores': [1 + i % autores],
+        'descripcion': f'Libro de prueba {i} sobre {PALABRAS[(i // 3) % len(PALABRAS)]}',
+        'editorial': f'Editorial {i % 10}',
+        'generos': sorted({1 + i % generos, 1 + (i + 1) % generos}),
+        'pais': ['es', 'mx', 'ar', 'co'][i % 4],
+        'idioma': ['es', 'en'][i % 2],
+        'num_paginas': 100 + i % 500,
+        'ano_edicion': 1950 + i % 75,
+        'precio': round(5 + (i % 400) / 10, 2),
+    }
+
+# Función para crear el esquema con las migraciones y vaciar las tablas
+def preparar_bd():
+    aplicar_migraciones(engine)
+
+    with engine.begin() as conexion:
+        for tabla in reversed(Base.metadata.sorted_tables):
+            conexion.execute(tabla.delete())
+
+def insertar_catalogo(libros: int, generos: int = 20, autores: int = 200):
+    """
+    Función para vaciar la base de datos e insertar un catálogo de prueba
+
+    Se inserta con sentencias por conjunto directamente en las tablas, con los
+    IDs 1..N de libros, géneros y autores.
+
+    """
+    preparar_bd()
+
+    datos = [libro_prueba(i, generos, autores) for i in range(1, libros + 1)]
+
+    with engine.begin() as conexion:
+        conexion.execute(insert(genero.Genero), [
+            {'id': i, 'nombre': f'genero {i}', 'descripcion': f'Género {i}'} for i in range(1, generos + 1)
+        ])
+        conexion.execute(insert(autor.Autor), [
+            {'id': i, 'nombre': f'Nombre{i}', 'apellido': f'Apellido{i}', 'nacionalidad': 'es', 'fecha_nacimiento': date(1950, 1, 1), 'biografia': '-'}
+            for i in range(1, autores + 1)
+        ])
+        # Sin libros (benchmarks que los dan de alta) solo se insertan los géneros y autores
+        if datos:
+            conexion.execute(insert(libro.Libro), [
+                {'id': i, **{campo: valor for campo, valor in datos_libro.items() if campo not in ('autores', 'generos')}}
+                for i, datos_libro in enumerate(datos, start=1)
+            ])
+            conexion.execute(insert(libros_generos.libros_generos), [
+                {'libro_id': i, 'genero_id': genero_id} for i, datos_libro in enumerate(datos, start=1) for genero_id in datos_libro['generos']
+            ])
+            conexion.execute(insert(libros_autores.libros_autores), [
+                {'libro_id': i, 'autor_id': autor_id} for i, datos_libro in enumerate(datos, start=1) for autor_id in datos_libro['autores']
+            ])
+
+    # Secuencias de PostgreSQL después de insertar con IDs explícitos
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as conexion:
+            for tabla in ('libros', 'generos', 'autores'):
+                conexion.exec_driver_sql(f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), coalesce((SELECT max(id) FROM {tabla}), 0) + 1, false)")
+
+# Función para borrar los libros (y sus relaciones) sin tocar los géneros ni los autores
+def vaciar_libros():
+    with engine.begin() as conexion:
+        conexion.execute(libros_generos.libros_generos.delete())
+        conexion.execute(libros_autores.libros_autores.delete())
+        conexion.execute(prestamo_libros.prestamos_libros.delete())
+        conexion.execute(libro.Libro.__table__.delete())
+
+# Función para crear un cliente HTTP de la API sin servidor (las peticiones van directamente
+# a la aplicación ASGI). Se importa aquí para que los benchmarks que no la usan no la carguen
+def cliente_api():
+    import httpx
+    from run import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench', timeout=None)
+
+# Función para medir una función varias veces. Devuelve el mejor tiempo en segundos
+def cronometrar(funcion, repeticiones: int = 5) -> float:
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+# Función para imprimir los resultados como una tabla de texto
+def imprimir_tabla(titulo: str, columnas: list, filas: list):
+    anchos = [max(len(str(valor)) for valor in [columna, *[fila[i] for fila in filas]]) for i, columna in enumerate(columnas)]
+
+    print(f'\n{titulo}  (base de datos: {engine.dialect.name})')
+    print('  '.join(str(columna).rjust(ancho) for columna, ancho in zip(columnas, anchos)))
+    for fila in filas:
+        print('  '.join(str(valor).rjust(ancho) for valor, ancho in zip(fila, anchos)))
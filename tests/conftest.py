@@ -0,0 +1,157 @@
+# Configuración común de los tests
+#
+# Se ejecutan desde la raíz del repositorio con: python -m pytest
+#
+# Usan la base de datos de TEST_DATABASE_URL (nunca la de DATABASE_URL, porque se vacía
+# antes de cada test) o, si no se indica, una base de datos SQLite temporal. El esquema
+# se crea con las migraciones, igual que en producción.
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIO = tempfile.mkdtemp(prefix='biblioteca_tests_')
+
+os.environ['DATABASE_URL'] = os.getenv('TEST_DATABASE_URL') or f'sqlite:///{os.path.join(DIRECTORIO, "tests.db")}'
+os.environ.pop('ASYNC_DATABASE_URL', None)
+sys.path.insert(0, os.path.join(RAIZ, 'app'))
+
+# Los logs de la API se escriben en el directorio temporal
+os.chdir(DIRECTORIO)
+
+import httpx
+import pytest
+from sqlalchemy import event, insert
+
+from database import engine, async_engine, Base
+from migraciones import aplicar_migraciones
+from isbn import control_isbn13
+from cache import cache_libros
+from registro_generos import registro_generos
+from models.libro import Libro
+from models.genero import Genero
+from models.autor import Autor
+from models.libros_generos import libros_generos
+from models.libros_autores import libros_autores
+from run import app
+
+# Los tests asíncronos se ejecutan con el plugin de anyio sobre asyncio
+@pytest.fixture(scope='session')
+def anyio_backend():
+    return 'asyncio'
+
+@pytest.fixture(scope='session', autouse=True)
+def esquema():
+    aplicar_migraciones(engine)
+    yield
+    engine.dispose()
+
+# Cada test empieza con las tablas, la caché y el registro de géneros vacíos
+@pytest.fixture(autouse=True)
+def bd_vacia(esquema):
+    with engine.begin() as conexion:
+        for tabla in reversed(Base.metadata.sorted_tables):
+            conexion.execute(tabla.delete())
+
+    cache_libros.limpiar()
+    registro_generos.__init__(registro_generos.intervalo)
+
+# Motor asíncrono de las rutas. Sus conexiones se cierran al terminar porque cada test
+# tiene su propio bucle de eventos
+@pytest.fixture
+async def motor_asincrono():
+    yield async_engine
+    await async_engine.dispose()
+
+# Cliente HTTP de la API
+@pytest.fixture
+async def cliente(motor_asincrono):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as cliente:
+        yield cliente
+
+# ----------------------------- DATOS DE PRUEBA -----------------------------
+# Función para generar el ISBN-13 válido número i
+def isbn_prueba(i: int) -> str:
+    base = f'978{i:09d}'
+    return base + control_isbn13(base)
+
+# Función para generar los datos de un libro como los recibe la API
+def libro_prueba(i: int, generos: list = (), autores: list = (), **campos) -> dict:
+    return {
+        'isbn': isbn_prueba(i),
+        'titulo': f'Libro {i}',
+        'autores': list(autores),
+        'descripcion': f'Descripción del libro {i}',
+        'editorial': 'Editorial',
+        'generos': list(generos),
+        'pais': 'es',
+        'idioma': 'es',
+        'num_paginas': 100,
+        'ano_edicion': 2000,
+        'precio': 10.0,
+        **campos,
+    }
+
+def crear_catalogo(libros: int, generos: int = 3, autores: int = 3, relaciones: int = 1, **campos) -> list[int]:
+    """
+    Función para insertar libros, géneros y autores directamente en las tablas
+
+    Cada libro tiene los primeros `relaciones` géneros y autores.
+
+    Returns:
+    list: IDs de los libros
+
+    """
+    with engine.begin() as conexion:
+        if generos:
+            conexion.execute(insert(Genero), [{'id': i, 'nombre': f'genero {i}', 'descripcion': f'Género {i}'} for i in range(1, generos + 1)])
+        if autores:
+            conexion.execute(insert(Autor), [
+                {'id': i, 'nombre': f'Nombre{i}', 'apellido': f'Apellido{i}', 'nacionalidad': 'es', 'fecha_nacimiento': date(1950, 1, 1), 'biografia': '-'}
+                for i in range(1, autores + 1)
+            ])
+
+        ids = list(range(1, libros + 1))
+        if ids:
+            conexion.execute(insert(Libro), [
+                {'id': i, **{campo: valor for campo, valor in libro_prueba(i, **campos).items() if campo not in ('autores', 'generos')}}
+                for i in ids
+            ])
+        filas_generos = [{'libro_id': i, 'genero_id': g} for i in ids for g in range(1, min(relaciones, generos) + 1)]
+        filas_autores = [{'libro_id': i, 'autor_id': a} for i in ids for a in range(1, min(relaciones, autores) + 1)]
+        if filas_generos:
+            conexion.execute(insert(libros_generos), filas_generos)
+        if filas_autores:
+            conexion.execute(insert(libros_autores), filas_autores)
+
+    # Secuencias de PostgreSQL después de insertar con IDs explícitos
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as conexion:
+            for tabla in ('libros', 'generos', 'autores'):
+                conexion.exec_driver_sql(f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), coalesce((SELECT max(id) FROM {tabla}), 0) + 1, false)")
+
+    return ids
+
+# ----------------------------- SENTENCIAS EMITIDAS -----------------------------
+@contextmanager
+def sentencias_emitidas():
+    """
+    Función para registrar las sentencias que emite el motor asíncrono de las rutas
+
+    No se cuentan los BEGIN que emite SQLAlchemy al empezar cada transacción en SQLite.
+
+    """
+    sentencias = []
+
+    def antes(conexion, cursor, sentencia, parametros, contexto, executemany):
+        if sentencia != 'BEGIN':
+            sentencias.append(sentencia)
+
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', antes)
+    try:
+        yield sentencias
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', antes)
@@ -0,0 +1,116 @@
+# Tests de la actualización masiva de libros (PATCH /libros/bulk e importacion.actualizar_grupo):
+# UPDATE ... FROM (VALUES ...) en PostgreSQL y executemany en SQLite
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from conftest import crear_catalogo, isbn_prueba, sentencias_emitidas
+from database import engine, AsyncSessionLocal
+from importacion import actualizar_grupo
+from models.libro import Libro
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures('motor_asincrono')]
+
+postgresql = pytest.mark.skipif(engine.dialect.name != 'postgresql', reason='Camino de PostgreSQL')
+sqlite = pytest.mark.skipif(engine.dialect.name != 'sqlite', reason='Camino de SQLite')
+
+# Función para leer unos campos de todos los libros por su ID
+def leer_libros(*campos) -> dict:
+    with engine.connect() as conexion:
+        filas = conexion.execute(select(Libro.id, *[getattr(Libro, campo) for campo in campos]).order_by(Libro.id)).all()
+    return {fila[0]: tuple(fila[1:]) for fila in filas}
+
+# Función para actualizar un grupo de libros en su propia sesión. Devuelve el resultado y las sentencias
+async def actualizar(campos: tuple, filas: list) -> tuple[dict, list]:
+    async with AsyncSessionLocal() as db:
+        with sentencias_emitidas() as sentencias:
+            resultado = await actualizar_grupo(db, campos, filas)
+        await db.commit()
+    return resultado, sentencias
+
+FILAS = [
+    (1, {'precio': 12.5, 'titulo': 'Uno'}),
+    (3, {'precio': 7.25, 'titulo': 'Tres'}),
+    # No existe: no se actualiza ni se devuelve
+    (99, {'precio': 1.0, 'titulo': 'Noventa y nueve'}),
+]
+
+async def test_actualizar_grupo_cambia_solo_los_libros_indicados():
+    crear_catalogo(3)
+
+    resultado, _ = await actualizar(('precio', 'titulo'), FILAS)
+
+    assert resultado == {1: isbn_prueba(1), 3: isbn_prueba(3)}
+    assert leer_libros('titulo', 'precio') == {
+        1: ('Uno', 12.5),
+        2: ('Libro 2', 10.0),
+        3: ('Tres', 7.25),
+    }
+
+async def test_actualizar_grupo_pone_updated_at_en_la_base_de_datos():
+    crear_catalogo(2)
+    antes = datetime.now(timezone.utc) - timedelta(days=1)
+    with engine.begin() as conexion:
+        conexion.execute(update(Libro).values(updated_at=antes))
+
+    await actualizar(('num_paginas',), [(1, {'num_paginas': 300})])
+
+    fechas = {id: fecha.replace(tzinfo=fecha.tzinfo or timezone.utc) for id, (fecha,) in leer_libros('updated_at').items()}
+    assert fechas[1] > antes + timedelta(hours=23)
+    assert fechas[2] == antes
+
+@postgresql
+async def test_postgresql_actualiza_el_grupo_con_un_update_from_values():
+    crear_catalogo(3)
+
+    _, sentencias = await actualizar(('precio', 'titulo'), FILAS)
+
+    assert len(sentencias) == 1
+    assert 'FROM (VALUES' in sentencias[0] and 'RETURNING' in sentencias[0]
+
+@sqlite
+async def test_sqlite_actualiza_el_grupo_con_executemany_y_una_lectura():
+    crear_catalogo(3)
+
+    _, sentencias = await actualizar(('precio', 'titulo'), FILAS)
+
+    assert len(sentencias) == 2
+    assert sentencias[0].startswith('UPDATE libros SET')
+    assert sentencias[1].startswith('SELECT')
+
+# ----------------------------- RUTA -----------------------------
+async def test_patch_bulk_agrupa_por_campos_y_resuelve_los_isbn(cliente):
+    crear_catalogo(4)
+
+    # El libro 2 se lee antes para comprobar que se invalida su entrada de la caché
+    assert (await cliente.get('/libros/2')).json()['precio'] == 10.0
+
+    respuesta = await cliente.patch('/libros/bulk', json=[
+        {'id': 1, 'precio': 20.0},
+        {'isbn': isbn_prueba(2), 'precio': 21.0},
+        {'id': 3, 'titulo': 'Nuevo título', 'ano_edicion': 2020},
+        {'id': 4, 'precio': 1.0},
+        # Se aplica la última aparición del libro 4
+        {'id': 4, 'precio': 4.0},
+        {'id': 50, 'precio': 1.0},
+        {'id': 1},
+    ])
+
+    assert respuesta.status_code == 200
+    resultado = respuesta.json()
+    assert resultado['total'] == 7
+    assert resultado['actualizados'] == 4
+    assert [r['actualizado'] for r in resultado['resultados']] == [True, True, True, False, True, False, False]
+    assert resultado['resultados'][1]['id'] == 2
+    assert resultado['resultados'][5]['error'] == 'Libro no encontrado'
+    assert resultado['resultados'][6]['error'] == 'No hay campos que actualizar'
+
+    assert leer_libros('titulo', 'precio', 'ano_edicion') == {
+        1: ('Libro 1', 20.0, 2000),
+        2: ('Libro 2', 21.0, 2000),
+        3: ('Nuevo título', 10.0, 2020),
+        4: ('Libro 4', 4.0, 2000),
+    }
+    assert (await cliente.get('/libros/2')).json()['precio'] == 21.0
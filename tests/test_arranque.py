@@ -0,0 +1,47 @@
+# Tests del arranque y la parada de la API (lifespan) y de la clase de respuesta JSON
+
+import warnings
+
+import pytest
+from fastapi.exceptions import FastAPIDeprecationWarning
+
+import planificador
+import run
+from conftest import crear_catalogo
+from registro_generos import registro_generos
+
+pytestmark = pytest.mark.anyio
+
+# La cola de logs se comparte con el resto de los tests: no se para al terminar
+@pytest.fixture(autouse=True)
+def logger_sin_parar(monkeypatch):
+    monkeypatch.setattr(run, 'detener_logger', lambda: None)
+
+async def test_arranque_carga_los_generos_y_la_parada_detiene_las_tareas(motor_asincrono):
+    crear_catalogo(0, generos=2, autores=0)
+
+    async with run.lifespan(run.app):
+        assert len(registro_generos.filas) == 2
+        assert len(planificador.tareas) == 1
+
+    assert planificador.tareas == []
+
+async def test_arranque_falla_con_el_esquema_sin_actualizar(monkeypatch, motor_asincrono):
+    monkeypatch.setattr(run, 'comprobar_revision', lambda engine: (3, 5))
+
+    with pytest.raises(RuntimeError, match='revisión 3, la API necesita la 5'):
+        async with run.lifespan(run.app):
+            pass
+
+    assert planificador.tareas == []
+
+async def test_respuestas_json_sin_avisos_de_obsolescencia(cliente):
+    crear_catalogo(2)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', FastAPIDeprecationWarning)
+        respuesta = await cliente.get('/libros/')
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers['content-type'] == 'application/json'
+    assert [libro['id'] for libro in respuesta.json()['items']] == [1, 2]
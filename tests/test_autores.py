@@ -0,0 +1,174 @@
+# Tests de las rutas de autores: CRUD, libros de un autor y autocompletado por prefijo
+
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import insert, select, update
+
+from conftest import crear_catalogo
+from database import engine
+from models.autor import Autor
+from models.libro import Libro
+from models.libros_autores import libros_autores
+
+pytestmark = pytest.mark.anyio
+
+# Función para generar los datos de un autor como los recibe la API
+def autor_prueba(**campos) -> dict:
+    return {
+        'nombre': 'Gabriel',
+        'apellido': 'García Márquez',
+        'fecha_nacimiento': '1927-03-06',
+        'fecha_fallecimiento': '2014-04-17',
+        'nacionalidad': 'co',
+        'biografia': 'Escritor',
+        **campos,
+    }
+
+# Función para insertar autores con los nombres y apellidos dados. Devuelve sus IDs
+def crear_autores(nombres: list[tuple[str, str]]) -> list[int]:
+    with engine.begin() as conexion:
+        conexion.execute(insert(Autor), [
+            {'id': i, 'nombre': nombre, 'apellido': apellido, 'nacionalidad': 'es', 'fecha_nacimiento': date(1950, 1, 1), 'biografia': '-'}
+            for i, (nombre, apellido) in enumerate(nombres, start=1)
+        ])
+    return list(range(1, len(nombres) + 1))
+
+# ----------------------------- CRUD -----------------------------
+async def test_crear_obtener_y_listar_autores(cliente):
+    respuesta = await cliente.post('/autores/', json=autor_prueba())
+    assert respuesta.status_code == 201
+    creado = respuesta.json()
+    assert creado['nombre'] == 'Gabriel' and creado['apellido'] == 'García Márquez'
+
+    respuesta = await cliente.get(f'/autores/{creado["id"]}')
+    assert respuesta.status_code == 200
+    assert respuesta.json() == creado
+
+    for i in range(4):
+        assert (await cliente.post('/autores/', json=autor_prueba(nombre=f'Autor {i}'))).status_code == 201
+
+    # Dos páginas de 3 y 2 autores
+    pagina = (await cliente.get('/autores/', params={'limit': 3})).json()
+    siguiente = (await cliente.get('/autores/', params={'limit': 3, 'cursor': pagina['next_cursor']})).json()
+    assert len(pagina['items']) == 3 and len(siguiente['items']) == 2
+    assert siguiente['next_cursor'] is None
+    ids = [autor['id'] for autor in pagina['items'] + siguiente['items']]
+    assert ids == sorted(ids) and len(set(ids)) == 5
+
+async def test_autor_inexistente_da_404(cliente):
+    assert (await cliente.get('/autores/99')).status_code == 404
+    assert (await cliente.put('/autores/99', json={'nombre': 'Otro'})).status_code == 404
+    assert (await cliente.delete('/autores/99')).status_code == 404
+
+async def test_fecha_de_fallecimiento_anterior_al_nacimiento_da_400(cliente):
+    respuesta = await cliente.post('/autores/', json=autor_prueba(fecha_fallecimiento='1900-01-01'))
+    assert respuesta.status_code == 400
+
+    autor_id = (await cliente.post('/autores/', json=autor_prueba())).json()['id']
+    respuesta = await cliente.put(f'/autores/{autor_id}', json={'fecha_nacimiento': '2020-01-01'})
+    assert respuesta.status_code == 400
+
+    # El autor no cambia
+    assert (await cliente.get(f'/autores/{autor_id}')).json()['fecha_nacimiento'] == '1927-03-06'
+
+async def test_actualizar_solo_cambia_los_campos_enviados(cliente):
+    autor_id = (await cliente.post('/autores/', json=autor_prueba())).json()['id']
+
+    respuesta = await cliente.put(f'/autores/{autor_id}', json={'apellido': 'Márquez', 'imagen': 'gabo.jpg'})
+
+    assert respuesta.status_code == 200
+    autor = respuesta.json()
+    assert autor['apellido'] == 'Márquez' and autor['imagen'] == 'gabo.jpg'
+    assert autor['nombre'] == 'Gabriel' and autor['biografia'] == 'Escritor'
+
+async def test_borrar_un_autor_lo_quita_de_sus_libros(cliente):
+    crear_catalogo(2, autores=2, relaciones=2)
+    with engine.begin() as conexion:
+        conexion.execute(update(Libro).values(updated_at=datetime(2000, 1, 1, tzinfo=timezone.utc)))
+
+    # El libro 1 queda en la caché con los dos autores
+    assert (await cliente.get('/libros/1')).json()['autores'] == [1, 2]
+
+    respuesta = await cliente.delete('/autores/1')
+    assert respuesta.status_code == 200
+    assert respuesta.json()['id'] == 1
+
+    assert (await cliente.get('/autores/1')).status_code == 404
+    assert (await cliente.get('/libros/1')).json()['autores'] == [2]
+    with engine.connect() as conexion:
+        assert conexion.scalar(select(libros_autores.c.autor_id).where(libros_autores.c.autor_id == 1)) is None
+        # La fecha de actualización de los libros del autor cambia
+        assert all(fecha.year > 2000 for fecha in conexion.scalars(select(Libro.updated_at)))
+
+# ----------------------------- LIBROS DE UN AUTOR -----------------------------
+async def test_libros_de_un_autor_paginados(cliente):
+    # El autor 1 tiene los libros impares y el autor 2 los pares
+    crear_catalogo(7, autores=2, relaciones=0)
+    with engine.begin() as conexion:
+        conexion.execute(insert(libros_autores), [{'libro_id': i, 'autor_id': 1 + (i + 1) % 2} for i in range(1, 8)])
+
+    pagina = (await cliente.get('/autores/1/libros', params={'limit': 3})).json()
+    assert [libro['id'] for libro in pagina['items']] == [1, 3, 5]
+    assert pagina['items'][0]['autores'] == [1]
+    assert pagina['facets'] is None
+
+    siguiente = (await cliente.get('/autores/1/libros', params={'limit': 3, 'cursor': pagina['next_cursor']})).json()
+    assert [libro['id'] for libro in siguiente['items']] == [7]
+    assert siguiente['next_cursor'] is None
+
+    pares = (await cliente.get('/autores/2/libros')).json()
+    assert [libro['id'] for libro in pares['items']] == [2, 4, 6]
+
+async def test_libros_de_un_autor_con_campos(cliente):
+    crear_catalogo(2, autores=1)
+
+    respuesta = await cliente.get('/autores/1/libros', params={'fields': 'titulo,id'})
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()['items'] == [{'titulo': 'Libro 1', 'id': 1}, {'titulo': 'Libro 2', 'id': 2}]
+
+    respuesta = await cliente.get('/autores/1/libros', params={'fields': 'titulo,no_existe'})
+    assert respuesta.status_code == 400
+
+async def test_libros_de_un_autor_sin_libros_o_inexistente(cliente):
+    crear_catalogo(0, autores=1)
+
+    respuesta = await cliente.get('/autores/1/libros')
+    assert respuesta.status_code == 200
+    assert respuesta.json()['items'] == []
+
+    assert (await cliente.get('/autores/2/libros')).status_code == 404
+
+# ----------------------------- AUTOCOMPLETADO -----------------------------
+async def sugerencias(cliente, q: str, **params) -> list[int]:
+    respuesta = await cliente.get('/autores/sugerencias', params={'q': q, **params})
+    assert respuesta.status_code == 200
+    return [autor['id'] for autor in respuesta.json()]
+
+async def test_sugerencias_por_nombre_completo_o_apellido(cliente):
+    crear_autores([
+        ('Gabriel', 'García Márquez'),
+        ('Federico', 'García Lorca'),
+        ('Gabriela', 'Mistral'),
+        ('Jorge Luis', 'Borges'),
+    ])
+
+    # Ordenadas por apellido y nombre
+    assert await sugerencias(cliente, 'garcía') == [2, 1]
+    assert await sugerencias(cliente, 'gabriel') == [1, 3]
+    assert await sugerencias(cliente, 'gabriel garc') == [1]
+    # Sin distinguir mayúsculas y con los espacios normalizados
+    assert await sugerencias(cliente, '  JORGE   luis ') == [4]
+    # Solo por el principio
+    assert await sugerencias(cliente, 'lorca') == []
+    assert await sugerencias(cliente, 'garcía', limit=1) == [2]
+
+    respuesta = await cliente.get('/autores/sugerencias', params={'q': 'gabriel'})
+    assert respuesta.json()[0] == {'id': 1, 'nombre': 'Gabriel', 'apellido': 'García Márquez'}
+
+async def test_sugerencias_sin_texto(cliente):
+    crear_autores([('Gabriel', 'García Márquez')])
+
+    assert await sugerencias(cliente, '   ') == []
+    assert (await cliente.get('/autores/sugerencias', params={'q': ''})).status_code == 422
@@ -0,0 +1,92 @@
+# Tests de la búsqueda de texto completo en SQLite (tabla FTS5 libros_fts y sus triggers)
+
+import pytest
+from sqlalchemy import delete, update
+
+from conftest import crear_catalogo
+from database import engine
+from models.libro import Libro
+from models.autor import Autor
+from models.libros_autores import libros_autores
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(engine.dialect.name != 'sqlite', reason='La búsqueda con FTS5 es de SQLite'),
+]
+
+# Función para poner el título y la descripción de un libro directamente en la tabla
+def escribir_libro(libro_id: int, titulo: str, descripcion: str):
+    with engine.begin() as conexion:
+        conexion.execute(update(Libro).where(Libro.id == libro_id).values(titulo=titulo, descripcion=descripcion))
+
+async def buscar(cliente, q: str) -> list[int]:
+    respuesta = await cliente.get('/libros/search', params={'q': q})
+    assert respuesta.status_code == 200
+    return [libro['id'] for libro in respuesta.json()['items']]
+
+async def test_busca_por_titulo_descripcion_y_autor(cliente):
+    # Cada libro tiene un autor distinto: el libro i tiene al autor i
+    crear_catalogo(3, autores=3, relaciones=0)
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql('INSERT INTO libros_autores (libro_id, autor_id) VALUES (1, 1), (2, 2), (3, 3)')
+    escribir_libro(1, 'Cien años de soledad', 'Historia de la familia Buendía')
+    escribir_libro(2, 'El nombre de la rosa', 'Misterio en una abadía medieval')
+
+    assert await buscar(cliente, 'soledad') == [1]
+    assert await buscar(cliente, 'abadia') == [2]
+    # Sin distinguir mayúsculas ni tildes
+    assert await buscar(cliente, 'AÑOS') == await buscar(cliente, 'anos') == [1]
+    assert await buscar(cliente, 'Apellido3') == [3]
+    # Todos los términos tienen que aparecer, en cualquier campo
+    assert await buscar(cliente, 'rosa Nombre2') == [2]
+    assert await buscar(cliente, 'rosa Nombre1') == []
+
+async def test_triggers_al_cambiar_el_nombre_de_un_autor(cliente):
+    crear_catalogo(2, autores=1, relaciones=1)
+
+    assert await buscar(cliente, 'Apellido1') == [1, 2]
+
+    with engine.begin() as conexion:
+        conexion.execute(update(Autor).where(Autor.id == 1).values(apellido='Borges'))
+
+    assert await buscar(cliente, 'Apellido1') == []
+    assert await buscar(cliente, 'borges') == [1, 2]
+
+async def test_triggers_al_borrar_un_autor(cliente):
+    crear_catalogo(2, autores=1, relaciones=1)
+
+    with engine.begin() as conexion:
+        conexion.execute(delete(libros_autores).where(libros_autores.c.autor_id == 1))
+        conexion.execute(delete(Autor).where(Autor.id == 1))
+
+    assert await buscar(cliente, 'Apellido1') == []
+    # El resto de la fila de búsqueda de los libros se mantiene
+    assert await buscar(cliente, 'Libro') == [1, 2]
+
+async def test_triggers_al_cambiar_y_borrar_libros(cliente):
+    crear_catalogo(2, autores=0)
+
+    escribir_libro(1, 'Rayuela', 'Novela')
+    assert await buscar(cliente, 'rayuela') == [1]
+    assert await buscar(cliente, 'Descripción') == [2]
+
+    assert (await cliente.delete('/libros/1')).status_code == 200
+    assert await buscar(cliente, 'rayuela') == []
+
+async def test_resultados_ordenados_por_relevancia(cliente):
+    # Los libros 4..10 no contienen el término (si lo contuvieran casi todos, no puntuaría)
+    crear_catalogo(10, autores=0)
+    escribir_libro(1, 'Viaje', 'Una descripción larga de un libro que menciona el mar una sola vez entre muchas otras palabras')
+    escribir_libro(2, 'Mar', 'Mar del Sur')
+    escribir_libro(3, 'El mar', 'El mar y el mar')
+
+    # Más apariciones del término en textos más cortos puntúan más (bm25)
+    assert await buscar(cliente, 'mar') == [3, 2, 1]
+
+    respuesta = await cliente.get('/libros/search', params={'q': 'mar', 'limit': 2})
+    assert [libro['id'] for libro in respuesta.json()['items']] == [3, 2]
+    assert respuesta.json()['next_offset'] == 2
+
+    respuesta = await cliente.get('/libros/search', params={'q': 'mar', 'limit': 2, 'offset': 2})
+    assert [libro['id'] for libro in respuesta.json()['items']] == [1]
+    assert respuesta.json()['next_offset'] is None
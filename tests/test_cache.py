@@ -0,0 +1,125 @@
+# Tests de la caché LRU con caducidad y de la caché de libros de las rutas
+
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+from cache import CacheLRU, cache_libros, clave_libro_id, clave_libro_isbn, invalidar_libro
+from conftest import crear_catalogo, isbn_prueba, sentencias_emitidas
+
+# Reloj manual para que las entradas caduquen sin esperar
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = SimpleNamespace(ahora=1000.0)
+    monkeypatch.setattr(cache, 'time', SimpleNamespace(monotonic=lambda: reloj.ahora))
+    return reloj
+
+def test_aciertos_y_fallos(reloj):
+    lru = CacheLRU('prueba', tamano=10, ttl=60, activa=True)
+
+    assert lru.get('a') is None
+    lru.set('a', 1)
+    assert lru.get('a') == 1
+    assert lru.get('a') == 1
+
+    assert lru.stats() == {
+        'activa': True, 'entradas': 1, 'tamano_maximo': 10, 'ttl': 60,
+        'aciertos': 2, 'fallos': 1, 'desalojos': 0,
+    }
+
+def test_las_entradas_caducan_con_el_ttl(reloj):
+    lru = CacheLRU('prueba', tamano=10, ttl=60, activa=True)
+    lru.set('a', 1)
+
+    reloj.ahora += 60
+    assert lru.get('a') == 1
+
+    reloj.ahora += 0.1
+    assert lru.get('a') is None
+    # La entrada caducada se borra y cuenta como fallo
+    assert lru.stats()['entradas'] == 0
+    assert lru.fallos == 1
+
+    # Al volver a guardarla, el TTL empieza de nuevo
+    lru.set('a', 2)
+    reloj.ahora += 30
+    assert lru.get('a') == 2
+
+def test_desaloja_la_entrada_usada_hace_mas_tiempo(reloj):
+    lru = CacheLRU('prueba', tamano=3, ttl=60, activa=True)
+    for clave in 'abc':
+        lru.set(clave, clave.upper())
+
+    # Leer 'a' la convierte en la más reciente: se desaloja 'b'
+    assert lru.get('a') == 'A'
+    lru.set('d', 'D')
+    assert list(lru.datos) == ['c', 'a', 'd']
+
+    # Guardar una clave existente también la mueve al final, sin desalojar nada
+    lru.set('c', 'C2')
+    lru.set('e', 'E')
+    assert list(lru.datos) == ['d', 'c', 'e']
+    assert lru.desalojos == 2
+
+def test_invalidar(reloj):
+    lru = CacheLRU('prueba', tamano=10, ttl=60, activa=True)
+    for i in range(5):
+        lru.set(i, {'id': i, 'par': i % 2 == 0})
+
+    lru.invalidar(1, 99)
+    assert sorted(lru.datos) == [0, 2, 3, 4]
+
+    lru.invalidar_si(lambda valor: valor['par'])
+    assert sorted(lru.datos) == [3]
+
+    lru.limpiar()
+    assert lru.stats()['entradas'] == 0
+    # Invalidar no cuenta como desalojo
+    assert lru.desalojos == 0
+
+def test_desactivada_no_guarda_nada(reloj):
+    lru = CacheLRU('prueba', tamano=10, ttl=60, activa=False)
+    lru.set('a', 1)
+
+    assert lru.get('a') is None
+    assert lru.stats()['entradas'] == 0 and lru.fallos == 0
+
+def test_claves_de_libros(reloj, monkeypatch):
+    monkeypatch.setattr(cache_libros, 'activa', True)
+    isbn13 = '9780306406157'
+
+    # El ISBN-10 y el ISBN-13 comparten entrada
+    assert clave_libro_isbn('0-306-40615-2') == clave_libro_isbn(isbn13) == ('isbn', isbn13)
+
+    cache_libros.set(clave_libro_id(1), 'libro')
+    cache_libros.set(clave_libro_isbn(isbn13), 'libro')
+    cache_libros.set(clave_libro_id(2), 'otro')
+
+    invalidar_libro(1, '0306406152', None)
+    assert list(cache_libros.datos) == [clave_libro_id(2)]
+
+@pytest.mark.anyio
+async def test_las_rutas_usan_e_invalidan_la_cache(cliente, monkeypatch):
+    monkeypatch.setattr(cache_libros, 'activa', True)
+    crear_catalogo(1)
+    isbn = isbn_prueba(1)
+
+    # La primera lectura por ID consulta la base de datos; la segunda sale de la caché
+    assert (await cliente.get('/libros/1')).status_code == 200
+    aciertos = cache_libros.aciertos
+    with sentencias_emitidas() as sentencias:
+        assert (await cliente.get('/libros/1')).json()['titulo'] == 'Libro 1'
+    assert sentencias == []
+    assert cache_libros.aciertos == aciertos + 1
+
+    # Por ISBN se guarda otra entrada
+    assert (await cliente.get(f'/libros/isbn/{isbn}')).status_code == 200
+    assert clave_libro_isbn(isbn) in cache_libros.datos
+
+    # Al modificar el libro se invalidan sus dos entradas
+    assert (await cliente.put('/libros/1', json={'isbn': isbn, 'titulo': 'Nuevo'})).status_code == 200
+    assert clave_libro_id(1) not in cache_libros.datos
+    assert clave_libro_isbn(isbn) not in cache_libros.datos
+    assert (await cliente.get('/libros/1')).json()['titulo'] == 'Nuevo'
+    assert (await cliente.get(f'/libros/isbn/{isbn}')).json()['titulo'] == 'Nuevo'
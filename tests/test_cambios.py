@@ -0,0 +1,102 @@
+# Tests de la sincronización incremental de libros (/libros/changes): paginación por
+# (updated_at, id) con cursor, next_since y margen de los cambios más recientes
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from conftest import crear_catalogo
+from database import engine
+from models.libro import Libro
+from routes import r_libro
+
+pytestmark = pytest.mark.anyio
+
+HACE_UNA_HORA = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=1)
+
+# Función para poner la fecha de actualización de unos libros
+def actualizados_en(fecha: datetime, *ids: int):
+    with engine.begin() as conexion:
+        conexion.execute(update(Libro).where(Libro.id.in_(ids)).values(updated_at=fecha))
+
+# Función para recorrer todas las páginas de cambios desde una fecha
+async def leer_cambios(cliente, since: str, limit: int) -> tuple[list, list]:
+    paginas = []
+    params = {'since': since, 'limit': limit}
+    while True:
+        respuesta = await cliente.get('/libros/changes', params=params)
+        assert respuesta.status_code == 200
+        paginas.append(respuesta.json())
+        if not respuesta.json()['next_cursor']:
+            return [libro['id'] for pagina in paginas for libro in pagina['items']], paginas
+        params['cursor'] = respuesta.json()['next_cursor']
+
+async def test_cursor_recorre_todos_los_libros_con_la_misma_fecha(cliente, monkeypatch):
+    # Libros creados a la vez por la base de datos, sin esperar al margen
+    monkeypatch.setattr(r_libro, 'MARGEN_CAMBIOS', timedelta(minutes=-1))
+    crear_catalogo(5)
+
+    ids, paginas = await leer_cambios(cliente, HACE_UNA_HORA.isoformat(), limit=2)
+
+    assert ids == [1, 2, 3, 4, 5]
+    assert [len(pagina['items']) for pagina in paginas] == [2, 2, 1]
+
+async def test_cursor_ordena_por_fecha_y_despues_por_id(cliente):
+    crear_catalogo(4)
+    actualizados_en(HACE_UNA_HORA + timedelta(minutes=2), 1, 3)
+    actualizados_en(HACE_UNA_HORA + timedelta(minutes=1), 2, 4)
+
+    ids, paginas = await leer_cambios(cliente, HACE_UNA_HORA.isoformat(), limit=1)
+
+    assert ids == [2, 4, 1, 3]
+    assert datetime.fromisoformat(paginas[-1]['next_since']) == HACE_UNA_HORA + timedelta(minutes=2)
+
+async def test_since_excluye_los_cambios_anteriores(cliente):
+    crear_catalogo(3)
+    actualizados_en(HACE_UNA_HORA, 1)
+    actualizados_en(HACE_UNA_HORA + timedelta(minutes=10), 2, 3)
+
+    ids, _ = await leer_cambios(cliente, (HACE_UNA_HORA + timedelta(minutes=5)).isoformat(), limit=10)
+
+    assert ids == [2, 3]
+
+async def test_next_since_continua_la_sincronizacion(cliente):
+    crear_catalogo(3)
+    actualizados_en(HACE_UNA_HORA, 1, 2, 3)
+
+    _, paginas = await leer_cambios(cliente, (HACE_UNA_HORA - timedelta(minutes=1)).isoformat(), limit=10)
+    next_since = paginas[-1]['next_since']
+    assert datetime.fromisoformat(next_since) == HACE_UNA_HORA
+
+    # Cambia un libro después de la sincronización: la siguiente lo incluye
+    actualizados_en(HACE_UNA_HORA + timedelta(minutes=1), 2)
+    respuesta = await cliente.get('/libros/changes', params={'since': next_since})
+
+    # next_since es inclusivo: se repiten los libros con esa misma fecha (1 y 3)
+    assert [libro['id'] for libro in respuesta.json()['items']] == [1, 3, 2]
+    assert datetime.fromisoformat(respuesta.json()['next_since']) == HACE_UNA_HORA + timedelta(minutes=1)
+
+async def test_sin_cambios_next_since_es_el_since_pedido(cliente):
+    crear_catalogo(1)
+    actualizados_en(HACE_UNA_HORA, 1)
+
+    since = HACE_UNA_HORA + timedelta(minutes=1)
+    respuesta = await cliente.get('/libros/changes', params={'since': since.isoformat()})
+
+    assert respuesta.json()['items'] == []
+    assert respuesta.json()['next_cursor'] is None
+    assert datetime.fromisoformat(respuesta.json()['next_since']) == since
+
+async def test_cambios_dentro_del_margen_se_dejan_para_la_siguiente_sincronizacion(cliente):
+    crear_catalogo(2)
+    actualizados_en(HACE_UNA_HORA, 1)
+    actualizados_en(datetime.now(timezone.utc), 2)
+
+    ids, _ = await leer_cambios(cliente, (HACE_UNA_HORA - timedelta(minutes=1)).isoformat(), limit=10)
+
+    assert ids == [1]
+
+async def test_cursor_no_valido_da_400(cliente):
+    respuesta = await cliente.get('/libros/changes', params={'since': HACE_UNA_HORA.isoformat(), 'cursor': 'no-es-un-cursor'})
+    assert respuesta.status_code == 400
@@ -0,0 +1,92 @@
+# Tests de la carga de autores y géneros de los libros: las rutas emiten el mismo número
+# de sentencias para 1 libro que para N (sin consultas N+1 al serializar las relaciones)
+
+import pytest
+from sqlalchemy import insert
+
+from conftest import crear_catalogo, isbn_prueba, libro_prueba, sentencias_emitidas
+from database import engine
+from models.libros_generos import libros_generos
+from models.libros_autores import libros_autores
+
+pytestmark = pytest.mark.anyio
+
+N = 25
+
+# Función para dar a un libro los géneros y autores 1..n
+def relacionar(libro_id: int, n: int):
+    with engine.begin() as conexion:
+        conexion.execute(libros_generos.delete().where(libros_generos.c.libro_id == libro_id))
+        conexion.execute(libros_autores.delete().where(libros_autores.c.libro_id == libro_id))
+        conexion.execute(insert(libros_generos), [{'libro_id': libro_id, 'genero_id': i} for i in range(1, n + 1)])
+        conexion.execute(insert(libros_autores), [{'libro_id': libro_id, 'autor_id': i} for i in range(1, n + 1)])
+
+async def test_listado_emite_las_mismas_sentencias_para_1_y_n_libros(cliente):
+    crear_catalogo(N, generos=N, autores=N, relaciones=3)
+
+    with sentencias_emitidas() as uno:
+        respuesta = await cliente.get('/libros/', params={'limit': 1})
+    assert len(respuesta.json()['items']) == 1
+
+    with sentencias_emitidas() as varios:
+        respuesta = await cliente.get('/libros/', params={'limit': N})
+    assert len(respuesta.json()['items']) == N
+    assert all(libro['autores'] == [1, 2, 3] and libro['generos'] == [1, 2, 3] for libro in respuesta.json()['items'])
+
+    # Página, autores y géneros de toda la página
+    assert len(uno) == len(varios) == 3
+
+async def test_libro_por_id_emite_las_mismas_sentencias_con_1_y_n_relaciones(cliente):
+    crear_catalogo(2, generos=N, autores=N)
+    relacionar(2, N)
+
+    with sentencias_emitidas() as uno:
+        respuesta = await cliente.get('/libros/1')
+    assert respuesta.json()['generos'] == [1]
+
+    with sentencias_emitidas() as varios:
+        respuesta = await cliente.get('/libros/2')
+    assert respuesta.json()['generos'] == list(range(1, N + 1))
+
+    # Libro y una consulta por relación (selectin)
+    assert len(uno) == len(varios) == 3
+
+    # La segunda lectura sale de la caché
+    with sentencias_emitidas() as cache:
+        await cliente.get('/libros/2')
+    assert cache == []
+
+async def test_libro_por_isbn_emite_las_mismas_sentencias_con_1_y_n_relaciones(cliente):
+    crear_catalogo(2, generos=N, autores=N)
+    relacionar(2, N)
+
+    with sentencias_emitidas() as uno:
+        respuesta = await cliente.get(f'/libros/isbn/{isbn_prueba(1)}')
+    assert respuesta.json()['autores'] == [1]
+
+    with sentencias_emitidas() as varios:
+        respuesta = await cliente.get(f'/libros/isbn/{isbn_prueba(2)}')
+    assert respuesta.json()['autores'] == list(range(1, N + 1))
+
+    assert len(uno) == len(varios) == 3
+
+async def test_update_libro_emite_las_mismas_sentencias_con_1_y_n_relaciones(cliente):
+    crear_catalogo(2, generos=2 * N, autores=2 * N)
+    relacionar(2, N)
+
+    # El registro de géneros se carga antes para no contar su carga inicial
+    await cliente.get('/generos/')
+
+    async def actualizar(libro_id: int, relacionados: list):
+        datos = libro_prueba(libro_id, generos=relacionados, autores=relacionados, titulo=f'Nuevo título {libro_id}')
+        with sentencias_emitidas() as sentencias:
+            respuesta = await cliente.put(f'/libros/{libro_id}', json=datos)
+        assert respuesta.status_code == 200
+        assert respuesta.json()['generos'] == respuesta.json()['autores'] == relacionados
+        return sentencias
+
+    # Se cambian todas las relaciones: 1 por otra y N por otras N
+    uno = await actualizar(1, [2])
+    varios = await actualizar(2, list(range(N + 1, 2 * N + 1)))
+
+    assert len(uno) == len(varios)
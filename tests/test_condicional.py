@@ -0,0 +1,52 @@
+# Tests de las peticiones condicionales (ETag / Last-Modified) de los listados y los libros
+
+import pytest
+
+from conftest import crear_catalogo
+
+pytestmark = pytest.mark.anyio
+
+# Fecha posterior a cualquier modificación de los datos de prueba
+FUTURO = 'Fri, 01 Jan 2100 00:00:00 GMT'
+
+async def test_listado_sin_cambios_responde_304_con_el_etag(cliente):
+    crear_catalogo(3)
+
+    respuesta = await cliente.get('/libros/')
+    etag = respuesta.headers['etag']
+
+    respuesta = await cliente.get('/libros/', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 304
+    assert respuesta.headers['etag'] == etag
+
+@pytest.mark.parametrize('ruta', ['/libros/', '/generos/'])
+async def test_listados_no_usan_last_modified(cliente, ruta):
+    crear_catalogo(3)
+
+    respuesta = await cliente.get(ruta)
+    assert 'last-modified' not in respuesta.headers
+
+    respuesta = await cliente.get(ruta, headers={'If-Modified-Since': FUTURO})
+    assert respuesta.status_code == 200
+
+async def test_borrar_un_libro_cambia_la_version_del_listado(cliente):
+    crear_catalogo(3)
+
+    respuesta = await cliente.get('/libros/')
+    etag = respuesta.headers['etag']
+
+    assert (await cliente.delete('/libros/2')).status_code == 200
+
+    respuesta = await cliente.get('/libros/', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 200
+    assert [libro['id'] for libro in respuesta.json()['items']] == [1, 3]
+    assert respuesta.headers['etag'] != etag
+
+async def test_libro_mantiene_last_modified(cliente):
+    crear_catalogo(1)
+
+    respuesta = await cliente.get('/libros/1')
+    assert 'last-modified' in respuesta.headers
+
+    respuesta = await cliente.get('/libros/1', headers={'If-Modified-Since': FUTURO})
+    assert respuesta.status_code == 304
@@ -0,0 +1,64 @@
+# Tests de la exportación del catálogo en streaming (GET /libros/export)
+
+import csv
+import io
+import json
+import logging
+
+import pytest
+from sqlalchemy import update
+
+import exportacion
+from conftest import crear_catalogo
+from database import engine
+from models.libro import Libro
+
+pytestmark = pytest.mark.anyio
+
+# Lotes de dos libros para que la exportación lea varios lotes de la base de datos
+@pytest.fixture(autouse=True)
+def lotes_pequenos(monkeypatch):
+    monkeypatch.setattr(exportacion, 'TAMANO_LOTE', 2)
+
+async def test_exportar_ndjson_por_lotes(cliente):
+    crear_catalogo(5, relaciones=2)
+
+    respuesta = await cliente.get('/libros/export')
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers['content-type'] == 'application/x-ndjson'
+    libros = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    assert [libro['id'] for libro in libros] == [1, 2, 3, 4, 5]
+    assert libros[0]['autores'] == [1, 2] and libros[0]['generos'] == [1, 2]
+
+async def test_exportar_csv_por_lotes(cliente):
+    crear_catalogo(5, relaciones=2)
+
+    respuesta = await cliente.get('/libros/export', params={'formato': 'csv'})
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers['content-type'].startswith('text/csv')
+    filas = list(csv.DictReader(io.StringIO(respuesta.text)))
+    assert list(filas[0]) == exportacion.COLUMNAS_CSV
+    assert [fila['id'] for fila in filas] == ['1', '2', '3', '4', '5']
+    assert filas[0]['autores'] == '1|2'
+
+@pytest.mark.parametrize('formato', ['ndjson', 'csv'])
+async def test_un_libro_no_valido_no_corta_la_exportacion(cliente, caplog, formato):
+    crear_catalogo(5)
+    # El libro 3, en el segundo lote, no cumple LibroResponse
+    with engine.begin() as conexion:
+        conexion.execute(update(Libro).where(Libro.id == 3).values(descripcion=None))
+
+    with caplog.at_level(logging.ERROR, logger='internal_activity'):
+        respuesta = await cliente.get('/libros/export', params={'formato': formato})
+
+    assert respuesta.status_code == 200
+    if formato == 'ndjson':
+        ids = [json.loads(linea)['id'] for linea in respuesta.text.splitlines()]
+    else:
+        ids = [int(fila['id']) for fila in csv.DictReader(io.StringIO(respuesta.text))]
+    assert ids == [1, 2, 4, 5]
+
+    errores = [registro.getMessage() for registro in caplog.records if registro.name == 'internal_activity']
+    assert errores == ['Libro 3 omitido en la exportación: 1 campos no válidos (descripcion)']
@@ -0,0 +1,89 @@
+# Tests de las rutas de estado (/health/live y /health/ready)
+
+import asyncio
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from routes import r_health
+
+pytestmark = pytest.mark.anyio
+
+# Cada test empieza sin ninguna comprobación guardada y cuenta las comprobaciones que se hacen
+@pytest.fixture
+def comprobaciones(monkeypatch):
+    monkeypatch.setattr(r_health, 'estado_ready', {'ok': False, 'detalle': 'Sin comprobar', 'comprobado': 0.0})
+    monkeypatch.setattr(r_health, 'TTL_READY', 60.0)
+
+    llamadas = []
+    fallo = {'error': None}
+
+    async def comprobar_db():
+        llamadas.append(1)
+        if fallo['error'] is not None:
+            raise fallo['error']
+
+    monkeypatch.setattr(r_health, 'comprobar_db', comprobar_db)
+    return llamadas, fallo
+
+async def test_live(cliente):
+    respuesta = await cliente.get('/health/live')
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()['status'] == 'ok'
+
+async def test_ready_con_la_base_de_datos_real(cliente, monkeypatch):
+    monkeypatch.setattr(r_health, 'estado_ready', {'ok': False, 'detalle': 'Sin comprobar', 'comprobado': 0.0})
+
+    respuesta = await cliente.get('/health/ready')
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()['detalle'] == 'Base de datos disponible'
+    assert 'pool' in respuesta.json()
+
+async def test_ready_reutiliza_el_resultado_durante_el_ttl(cliente, comprobaciones):
+    llamadas, _ = comprobaciones
+
+    for _ in range(3):
+        respuesta = await cliente.get('/health/ready')
+        assert respuesta.status_code == 200
+        assert respuesta.json()['status'] == 'ok'
+    assert len(llamadas) == 1
+
+    # Las peticiones simultáneas también comparten la comprobación
+    r_health.estado_ready['comprobado'] = 0.0
+    respuestas = await asyncio.gather(*[cliente.get('/health/ready') for _ in range(5)])
+    assert all(respuesta.status_code == 200 for respuesta in respuestas)
+    assert len(llamadas) == 2
+
+async def test_ready_da_503_si_falla_la_base_de_datos(cliente, comprobaciones):
+    llamadas, fallo = comprobaciones
+    fallo['error'] = OperationalError('SELECT 1', {}, Exception('conexión rechazada'))
+
+    respuesta = await cliente.get('/health/ready')
+    assert respuesta.status_code == 503
+    assert respuesta.json()['status'] == 'error'
+    assert respuesta.json()['detalle'] == 'Base de datos no disponible'
+
+    # El error también se guarda durante el TTL
+    fallo['error'] = None
+    assert (await cliente.get('/health/ready')).status_code == 503
+    assert len(llamadas) == 1
+
+    # Al caducar se vuelve a comprobar
+    r_health.estado_ready['comprobado'] = 0.0
+    assert (await cliente.get('/health/ready')).status_code == 200
+    assert len(llamadas) == 2
+
+async def test_ready_da_503_si_la_base_de_datos_no_responde(cliente, comprobaciones, monkeypatch):
+    monkeypatch.setattr(r_health, 'TTL_READY', 0.05)
+
+    async def comprobar_db():
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(r_health, 'comprobar_db', comprobar_db)
+
+    respuesta = await cliente.get('/health/ready')
+
+    assert respuesta.status_code == 503
+    assert respuesta.json()['detalle'] == 'Base de datos no disponible'
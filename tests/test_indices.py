@@ -0,0 +1,115 @@
+# Tests de los planes de consulta (EXPLAIN) de los filtros del listado de libros paginado
+# por cursor (WHERE <filtros> AND id > :cursor ORDER BY id LIMIT :n) y del autocompletado
+# de autores por prefijo
+
+from datetime import date
+
+import pytest
+from sqlalchemy import insert, select
+
+from conftest import libro_prueba
+from database import engine
+from filtros import condiciones
+from models.autor import Autor
+from models.libro import Libro
+from routes.r_autor import consulta_sugerencias
+
+LIBROS = 2000
+
+@pytest.fixture
+def catalogo_variado():
+    filas = []
+    for i in range(1, LIBROS + 1):
+        libro = libro_prueba(
+            i,
+            idioma=f'i{i % 100}',
+            pais=f'p{i % 100}',
+            editorial=f'Editorial {i % 200}',
+            ano_edicion=1900 + i % 125,
+            precio=round(5 + (i % 1000) / 10, 2),
+        )
+        del libro['autores'], libro['generos']
+        filas.append({'id': i, **libro})
+
+    with engine.begin() as conexion:
+        conexion.execute(insert(Libro), filas)
+        conexion.exec_driver_sql('ANALYZE')
+
+def plan(consulta) -> str:
+    """
+    Función para obtener el plan de una consulta
+
+    En PostgreSQL se desactivan el recorrido secuencial y el de bitmap, que con tablas
+    tan pequeñas salen más baratos, para ver qué índice se usaría y en qué orden.
+
+    Returns:
+    str: Plan de la consulta en texto
+
+    """
+    sql = str(consulta.compile(engine, compile_kwargs={'literal_binds': True}))
+
+    with engine.begin() as conexion:
+        if engine.dialect.name == 'postgresql':
+            conexion.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            conexion.exec_driver_sql('SET LOCAL enable_bitmapscan = off')
+            filas = conexion.exec_driver_sql(f'EXPLAIN {sql}').all()
+        else:
+            filas = conexion.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').all()
+
+    return '\n'.join(str(fila[-1]) for fila in filas)
+
+# Consulta de una página de libros filtrados
+def plan_filtros(filtros: dict) -> str:
+    return plan(select(Libro.id, Libro.titulo).where(*condiciones(filtros), Libro.id > 100).order_by(Libro.id).limit(51))
+
+# Con un filtro por igualdad, el índice (columna, id) resuelve el filtro, el cursor y el orden
+@pytest.mark.parametrize('filtros, indice', [
+    ({'idioma': 'i7'}, 'ix_libros_idioma_id'),
+    ({'pais': 'p7'}, 'ix_libros_pais_id'),
+    ({'editorial': 'Editorial 3'}, 'ix_libros_editorial_id'),
+])
+def test_filtro_por_igualdad_usa_el_indice_sin_ordenar(catalogo_variado, filtros, indice):
+    texto = plan_filtros(filtros)
+
+    assert indice in texto
+    if engine.dialect.name == 'postgresql':
+        assert 'Sort' not in texto
+    else:
+        assert 'id>?' in texto
+        assert 'TEMP B-TREE' not in texto
+
+# Con un rango, el índice de la columna resuelve el filtro pero las filas hay que ordenarlas
+# por ID igualmente: añadir el ID al índice no evitaría el orden
+@pytest.mark.parametrize('filtros, indice', [
+    ({'ano_min': 2000, 'ano_max': 2001}, 'ix_libros_ano_edicion'),
+    ({'precio_min': 10, 'precio_max': 10.5}, 'ix_libros_precio'),
+])
+def test_filtro_por_rango_usa_el_indice_de_la_columna(catalogo_variado, filtros, indice):
+    texto = plan_filtros(filtros)
+
+    assert indice in texto
+    if engine.dialect.name == 'postgresql':
+        assert 'Sort' in texto
+    else:
+        assert 'TEMP B-TREE FOR ORDER BY' in texto
+
+# ----------------------------- AUTOCOMPLETADO DE AUTORES -----------------------------
+@pytest.fixture
+def autores_variados():
+    with engine.begin() as conexion:
+        conexion.execute(insert(Autor), [
+            {'id': i, 'nombre': f'Nombre{i % 300}', 'apellido': f'Apellido{i}', 'nacionalidad': 'es', 'fecha_nacimiento': date(1950, 1, 1), 'biografia': '-'}
+            for i in range(1, LIBROS + 1)
+        ])
+        conexion.exec_driver_sql('ANALYZE')
+
+# Cada rama de la unión recorre su índice de prefijo como un rango: la intercalación "C" de
+# la consulta tiene que coincidir con la del índice para que se pueda usar con >= y <
+@pytest.mark.skipif(engine.dialect.name != 'postgresql', reason='Los índices de prefijo son de PostgreSQL')
+def test_sugerencias_recorren_los_indices_de_prefijo(autores_variados):
+    texto = plan(consulta_sugerencias('Nombre12 ape', 10, engine.dialect.name))
+
+    for indice in ('ix_autores_nombre_completo_prefijo', 'ix_autores_apellido_prefijo'):
+        assert f'Index Scan using {indice}' in texto
+    assert texto.count('>=') >= 2 and texto.count("< '") >= 2
+    assert 'Seq Scan on autores' not in texto
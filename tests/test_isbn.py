@@ -0,0 +1,124 @@
+# Tests de la validación y normalización de ISBN, de las rutas que reciben ISBN no válidos
+# y de la migración que pasa los ISBN guardados a su forma canónica
+
+import random
+
+import pytest
+from sqlalchemy import insert, select
+
+from conftest import crear_catalogo, isbn_prueba, libro_prueba
+from database import engine
+from isbn import normalizar_isbn, normalizar_lote, control_isbn10
+from migraciones import m0006_isbn_canonico
+from models.libro import Libro
+
+pytestmark = pytest.mark.anyio
+
+# '978030640615' con el dígito de control como superíndice y con dígitos árabes
+NO_ASCII = ['978030640615²', '978٠٣٠٦٤٠٦١٥٧', '03064061٥2', '²306406152']
+
+@pytest.mark.parametrize('isbn, canonico', [
+    ('9780306406157', '9780306406157'),
+    ('978-0-306-40615-7', '9780306406157'),
+    ('0306406152', '9780306406157'),
+    ('0-306-40615-2', '9780306406157'),
+    ('080442957x', '9780804429573'),
+    ('9780306406158', None),
+    ('0306406153', None),
+    ('9770306406157', None),
+    ('', None),
+    *[(isbn, None) for isbn in NO_ASCII],
+])
+def test_normalizar_isbn(isbn, canonico):
+    assert normalizar_isbn(isbn) == canonico
+    assert normalizar_lote([isbn]) == [canonico]
+
+def test_normalizar_lote_coincide_con_normalizar_isbn():
+    aleatorio = random.Random(14)
+    isbns = [isbn_prueba(i) for i in range(500)]
+    isbns += [f'{i:09d}' + control_isbn10(f'{i:09d}') for i in range(500)]
+    # Cadenas con caracteres sueltos: casi todas no válidas
+    isbns += [''.join(aleatorio.choice('0123456789X- ²') for _ in range(aleatorio.choice([10, 13, 14]))) for _ in range(2000)]
+    isbns += [None, '']
+
+    assert normalizar_lote(isbns) == [normalizar_isbn(isbn) for isbn in isbns]
+
+# ----------------------------- RUTAS -----------------------------
+@pytest.mark.parametrize('isbn', NO_ASCII)
+async def test_isbn_con_digitos_no_ascii_da_400(cliente, isbn):
+    crear_catalogo(1)
+
+    respuesta = await cliente.get(f'/libros/isbn/{isbn}')
+    assert respuesta.status_code == 400
+
+    respuesta = await cliente.post('/libros/', json=libro_prueba(2, generos=[1], autores=[1], isbn=isbn))
+    assert respuesta.status_code == 400
+
+    respuesta = await cliente.put('/libros/1', json=libro_prueba(1, generos=[1], autores=[1], isbn=isbn))
+    assert respuesta.status_code == 400
+
+async def test_importacion_con_isbn_no_ascii_solo_falla_esa_fila(cliente):
+    crear_catalogo(0)
+
+    filas = [libro_prueba(i, generos=[1], autores=[1]) for i in range(1, 4)]
+    filas[1]['isbn'] = NO_ASCII[0]
+    respuesta = await cliente.post('/libros/bulk', json=filas)
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()['insertados'] == 2
+    assert respuesta.json()['errores'] == [{'fila': 1, 'isbn': NO_ASCII[0], 'error': 'El ISBN no es válido'}]
+
+async def test_actualizacion_masiva_con_isbn_no_ascii_solo_falla_ese_elemento(cliente):
+    crear_catalogo(2)
+
+    respuesta = await cliente.patch('/libros/bulk', json=[
+        {'isbn': NO_ASCII[0], 'titulo': 'Nuevo'},
+        {'isbn': isbn_prueba(2), 'titulo': 'Nuevo'},
+    ])
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()['actualizados'] == 1
+    assert respuesta.json()['resultados'][0]['error'] == 'El ISBN no es válido'
+
+# ----------------------------- MIGRACIÓN -----------------------------
+def test_migracion_normaliza_los_isbn_guardados():
+    guardados = {
+        1: '0-306-40615-2',      # ISBN-10 con guiones
+        2: '080442957x',         # ISBN-10 con x minúscula
+        3: '0 14 044913 2',      # ISBN-10 con espacios
+        4: '9780451524935',      # Ya canónico
+        5: 'no es un isbn',      # No válido: se deja igual
+        6: '0-451-52493-4',      # Su forma canónica ya la tiene el libro 4: se deja igual
+        7: None,
+    }
+    # La columna es de 13 caracteres en PostgreSQL: los ISBN-13 con guiones no caben
+    with engine.begin() as conexion:
+        conexion.execute(insert(Libro), [{'id': id, 'isbn': isbn, 'titulo': f'Libro {id}'} for id, isbn in guardados.items()])
+
+    with engine.begin() as conexion:
+        m0006_isbn_canonico.aplicar(conexion)
+
+    with engine.connect() as conexion:
+        isbns = dict(conexion.execute(select(Libro.id, Libro.isbn)).all())
+
+    assert isbns == {
+        1: '9780306406157',
+        2: '9780804429573',
+        3: '9780140449136',
+        4: '9780451524935',
+        5: 'no es un isbn',
+        6: '0-451-52493-4',
+        7: None,
+    }
+
+async def test_libro_con_isbn_migrado_se_encuentra_por_cualquier_forma(cliente):
+    with engine.begin() as conexion:
+        datos = libro_prueba(1, isbn='0-306-40615-2')
+        del datos['autores'], datos['generos']
+        conexion.execute(insert(Libro), [{'id': 1, **datos}])
+        m0006_isbn_canonico.aplicar(conexion)
+
+    for isbn in ('0-306-40615-2', '0306406152', '978-0-306-40615-7'):
+        respuesta = await cliente.get(f'/libros/isbn/{isbn}')
+        assert respuesta.status_code == 200
+        assert respuesta.json()['isbn'] == '9780306406157'
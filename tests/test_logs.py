@@ -0,0 +1,73 @@
+# Tests de los logs asíncronos: la cola acotada que descarta sin bloquear y el formato JSON
+
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueListener
+
+import pytest
+
+import log_config
+from log_config import ColaHandler, JSONFormatter, get_log_stats
+
+# Logger propio de cada test, con el handler de una cola pequeña
+@pytest.fixture
+def logger_cola(request):
+    cola = queue.Queue(maxsize=3)
+    handler = ColaHandler(cola)
+    logger = logging.getLogger(f'tests.{request.node.name}')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    yield logger, handler, cola
+    logger.removeHandler(handler)
+
+def test_con_la_cola_llena_descarta_sin_bloquear(logger_cola):
+    logger, handler, cola = logger_cola
+
+    # Nadie vacía la cola: si el handler esperara, el hilo no terminaría
+    hilo = threading.Thread(target=lambda: [logger.info('registro %d', i) for i in range(10)])
+    hilo.start()
+    hilo.join(timeout=5)
+
+    assert not hilo.is_alive()
+    assert cola.qsize() == 3
+    assert handler.descartados == 7
+    # Se conservan los primeros registros, ya formateados
+    assert [cola.get_nowait().getMessage() for _ in range(3)] == ['registro 0', 'registro 1', 'registro 2']
+
+    # Con sitio en la cola se vuelve a encolar
+    logger.info('otro')
+    assert cola.get_nowait().getMessage() == 'otro'
+    assert handler.descartados == 7
+
+def test_las_estadisticas_cuentan_los_descartados(monkeypatch, logger_cola):
+    _, handler, cola = logger_cola
+    monkeypatch.setattr(log_config, 'cola_logs', cola)
+    monkeypatch.setattr(log_config, 'cola_handler', handler)
+    handler.descartados = 4
+
+    assert get_log_stats() == {'pendientes': 0, 'capacidad': log_config.TAMANO_COLA, 'descartados': 4}
+
+def test_el_listener_escribe_lineas_json(logger_cola):
+    logger, _, cola = logger_cola
+    lineas = []
+
+    class Memoria(logging.Handler):
+        def emit(self, record):
+            lineas.append(self.format(record))
+
+    destino = Memoria()
+    destino.setFormatter(JSONFormatter())
+    listener = QueueListener(cola, destino)
+    listener.start()
+    try:
+        logger.warning('petición %s', '/libros/', extra={'ip': '127.0.0.1', 'duracion': 0.25})
+    finally:
+        listener.stop()
+
+    linea = json.loads(lineas[0])
+    assert linea['level'] == 'WARNING'
+    assert linea['msg'] == 'petición /libros/'
+    assert linea['ip'] == '127.0.0.1' and linea['duracion'] == 0.25
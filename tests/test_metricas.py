@@ -0,0 +1,124 @@
+# Tests del endpoint /metrics: etiquetas por plantilla de ruta, consultas a la base de datos
+# por petición, peticiones en curso y formato de texto de Prometheus
+
+import re
+
+import pytest
+
+import metricas
+import run
+from conftest import crear_catalogo
+from metricas import MetricasAPI
+
+pytestmark = pytest.mark.anyio
+
+# Líneas de muestra del formato de texto: nombre{etiquetas} valor
+MUESTRA = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+ETIQUETA = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+TIPOS = {'counter', 'gauge', 'histogram', 'summary', 'untyped'}
+
+# Cada test empieza con las métricas vacías
+@pytest.fixture(autouse=True)
+def metricas_vacias(monkeypatch):
+    nuevas = MetricasAPI()
+    monkeypatch.setattr(run, 'metricas_api', nuevas)
+    monkeypatch.setattr(metricas, 'metricas_api', nuevas)
+
+def analizar(texto: str) -> dict:
+    """
+    Función para validar y leer el texto de las métricas
+
+    Comprueba que cada línea sea un comentario HELP o TYPE, o una muestra de una
+    métrica declarada antes con TYPE (los histogramas con sus sufijos), con las
+    etiquetas bien formadas y un valor numérico.
+
+    Returns:
+    dict: Valor de cada muestra por (nombre, etiquetas ordenadas)
+
+    """
+    assert texto.endswith('\n')
+    tipos = {}
+    muestras = {}
+    for linea in texto.splitlines():
+        if linea.startswith('# HELP '):
+            assert len(linea.split(' ', 3)) == 4, linea
+        elif linea.startswith('# TYPE '):
+            _, _, nombre, tipo = linea.split(' ')
+            assert nombre not in tipos, f'TYPE repetido: {nombre}'
+            assert tipo in TIPOS, linea
+            tipos[nombre] = tipo
+        else:
+            coincidencia = MUESTRA.match(linea)
+            assert coincidencia, linea
+            nombre, etiquetas, valor = coincidencia.groups()
+            familia = re.sub(r'_(bucket|sum|count)$', '', nombre)
+            if familia not in tipos:
+                familia = nombre
+            assert familia in tipos, f'Muestra sin TYPE: {linea}'
+            if familia != nombre:
+                assert tipos[familia] == 'histogram', linea
+
+            pares = ETIQUETA.findall(etiquetas or '')
+            if etiquetas:
+                assert ','.join(f'{clave}="{texto}"' for clave, texto in pares) == etiquetas, linea
+            float(valor)
+
+            clave = (nombre, tuple(sorted(pares)))
+            assert clave not in muestras, f'Muestra repetida: {linea}'
+            muestras[clave] = float(valor)
+    return muestras
+
+# Función para obtener el valor de una muestra por su nombre y etiquetas
+def muestra(muestras: dict, nombre: str, **etiquetas) -> float:
+    return muestras[(nombre, tuple(sorted(etiquetas.items())))]
+
+async def test_metricas_por_plantilla_de_ruta(cliente):
+    crear_catalogo(3)
+
+    for libro_id in (1, 2, 3):
+        assert (await cliente.get(f'/libros/{libro_id}')).status_code == 200
+    assert (await cliente.get('/libros/99')).status_code == 404
+    assert (await cliente.get('/autores/')).status_code == 200
+
+    respuesta = await cliente.get('/metrics')
+    assert respuesta.status_code == 200
+    assert respuesta.headers['content-type'].startswith('text/plain; version=0.0.4')
+    muestras = analizar(respuesta.text)
+
+    # Una serie por plantilla, no por URL
+    libro = {'metodo': 'GET', 'ruta': '/libros/{id}'}
+    autores = {'metodo': 'GET', 'ruta': '/autores/'}
+    assert not any('/libros/1' in dict(etiquetas).get('ruta', '') for _, etiquetas in muestras)
+    assert muestra(muestras, 'api_peticion_duracion_seconds_count', **libro) == 4
+    assert muestra(muestras, 'api_peticion_duracion_seconds_bucket', **libro, le='+Inf') == 4
+    assert muestra(muestras, 'api_peticiones_total', **libro, estado='200') == 3
+    assert muestra(muestras, 'api_peticiones_total', **libro, estado='404') == 1
+    assert muestra(muestras, 'api_peticiones_total', **autores, estado='200') == 1
+
+    # Los buckets del histograma son acumulados
+    buckets = [valor for (nombre, etiquetas), valor in muestras.items()
+               if nombre == 'api_peticion_duracion_seconds_bucket' and ('ruta', '/libros/{id}') in etiquetas]
+    assert buckets == sorted(buckets)
+
+    # Consultas y tiempo en la base de datos de cada ruta
+    for etiquetas in (libro, autores):
+        assert muestra(muestras, 'api_peticion_consultas_db_total', **etiquetas) >= 1
+        assert muestra(muestras, 'api_peticion_db_seconds_total', **etiquetas) > 0
+    assert muestra(muestras, 'db_consultas_total') >= muestra(muestras, 'api_peticion_consultas_db_total', **libro)
+
+    # Las peticiones terminadas ya no están en curso; la de /metrics sí
+    assert muestra(muestras, 'api_peticiones_en_curso', **libro) == 0
+    assert muestra(muestras, 'api_peticiones_en_curso', **autores) == 0
+    assert muestra(muestras, 'api_peticiones_en_curso', metodo='GET', ruta='/metrics') == 1
+
+async def test_metricas_de_urls_sin_ruta(cliente):
+    assert (await cliente.get('/no/existe')).status_code == 404
+    assert (await cliente.get('/otra/que/no/existe')).status_code == 404
+    # Coincide la URL pero no el método
+    assert (await cliente.patch('/autores/')).status_code == 405
+
+    muestras = analizar((await cliente.get('/metrics')).text)
+
+    assert muestra(muestras, 'api_peticiones_total', metodo='GET', ruta='sin_ruta', estado='404') == 2
+    assert muestra(muestras, 'api_peticiones_total', metodo='PATCH', ruta='/autores/', estado='405') == 1
+    assert muestra(muestras, 'api_peticiones_en_curso', metodo='GET', ruta='sin_ruta') == 0
@@ -0,0 +1,101 @@
+# Tests de la aplicación de las migraciones y de la comprobación de la revisión al arrancar
+
+import ast
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+
+from conftest import DIRECTORIO
+from database import engine
+import migraciones
+from migraciones import aplicar_migraciones, cargar_migraciones, comprobar_revision, revision_esperada
+
+# Motor de una base de datos SQLite nueva en el directorio de los tests
+@pytest.fixture
+def motor_nuevo(request):
+    motor = create_engine(f'sqlite:///{os.path.join(DIRECTORIO, request.node.name + ".db")}')
+    yield motor
+    motor.dispose()
+
+def test_base_de_datos_sin_migraciones_esta_en_la_revision_0(motor_nuevo):
+    assert comprobar_revision(motor_nuevo) == (0, revision_esperada())
+
+def test_migraciones_se_aplican_una_sola_vez(motor_nuevo):
+    assert aplicar_migraciones(motor_nuevo) == list(range(1, revision_esperada() + 1))
+    assert aplicar_migraciones(motor_nuevo) == []
+    assert comprobar_revision(motor_nuevo) == (revision_esperada(), revision_esperada())
+
+def test_revision_se_lee_con_una_sola_consulta(motor_nuevo):
+    sentencias = []
+
+    def antes(conexion, cursor, sentencia, parametros, contexto, executemany):
+        sentencias.append(sentencia)
+
+    event.listen(motor_nuevo, 'before_cursor_execute', antes)
+    try:
+        # Sin la tabla schema_version y con ella
+        comprobar_revision(motor_nuevo)
+        aplicar_migraciones(motor_nuevo)
+        del sentencias[:]
+        comprobar_revision(motor_nuevo)
+    finally:
+        event.remove(motor_nuevo, 'before_cursor_execute', antes)
+
+    assert len(sentencias) == 1
+
+def test_error_de_conexion_no_se_confunde_con_la_revision_0():
+    motor = create_engine(f'sqlite:///{os.path.join(DIRECTORIO, "no-existe", "bd.db")}')
+
+    with pytest.raises(OperationalError):
+        comprobar_revision(motor)
+
+@pytest.mark.skipif(engine.dialect.name != 'postgresql', reason='El bloqueo consultivo es de PostgreSQL')
+def test_bloqueo_se_toma_antes_de_crear_schema_version():
+    sentencias = []
+
+    def antes(conexion, cursor, sentencia, parametros, contexto, executemany):
+        sentencias.append(sentencia)
+
+    event.listen(engine, 'before_cursor_execute', antes)
+    try:
+        aplicar_migraciones(engine)
+    finally:
+        event.remove(engine, 'before_cursor_execute', antes)
+
+    # Cada transacción empieza con el bloqueo, también la que crea schema_version
+    assert 'pg_advisory_xact_lock' in sentencias[0]
+
+@pytest.mark.skipif(engine.dialect.name != 'postgresql', reason='Error de tabla inexistente de PostgreSQL')
+def test_postgresql_sin_schema_version_esta_en_la_revision_0():
+    # Esquema vacío como primer elemento del search_path: schema_version no se encuentra
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql('CREATE SCHEMA IF NOT EXISTS sin_migraciones')
+    motor = create_engine(engine.url, connect_args={'options': '-csearch_path=sin_migraciones'})
+    try:
+        assert comprobar_revision(motor) == (0, revision_esperada())
+    finally:
+        motor.dispose()
+        with engine.begin() as conexion:
+            conexion.exec_driver_sql('DROP SCHEMA sin_migraciones')
+
+# Las migraciones no pueden depender del código de la aplicación, que cambia después de
+# escribirlas: solo pueden importar la biblioteca estándar, SQLAlchemy y las utilidades
+# del paquete de migraciones
+def test_migraciones_no_importan_la_aplicacion():
+    for migracion in cargar_migraciones():
+        with open(migracion.__file__, encoding='utf-8') as fichero:
+            arbol = ast.parse(fichero.read())
+
+        for nodo in ast.walk(arbol):
+            if isinstance(nodo, ast.Import):
+                modulos = [alias.name for alias in nodo.names]
+            elif isinstance(nodo, ast.ImportFrom):
+                modulos = [nodo.module]
+            else:
+                continue
+            for modulo in modulos:
+                raiz = modulo.split('.')[0]
+                assert raiz in ('sqlalchemy', migraciones.__name__) or raiz in sys.stdlib_module_names, f'{migracion.__name__} importa {modulo}'
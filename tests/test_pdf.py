@@ -0,0 +1,68 @@
+# Tests de la descarga del PDF con la lista de libros (GET /libros/pdf/download)
+
+import logging
+import re
+import tempfile
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import functions
+from conftest import crear_catalogo
+from routes import r_libro
+
+pytestmark = pytest.mark.anyio
+
+# Los ficheros temporales se crean en un directorio propio del test para poder comprobar que se borran
+@pytest.fixture
+def temporales(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    return tmp_path
+
+async def test_descargar_pdf_por_lotes(cliente, temporales, monkeypatch, caplog):
+    # Lotes de dos libros para que el PDF lea varios lotes de la base de datos
+    monkeypatch.setattr(functions, 'TAMANO_LOTE', 2)
+    crear_catalogo(5, relaciones=2)
+
+    with caplog.at_level(logging.INFO, logger='user_activity'):
+        respuesta = await cliente.get('/libros/pdf/download')
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers['content-type'] == 'application/pdf'
+    assert respuesta.headers['content-disposition'] == 'attachment; filename="lista_libros.pdf"'
+    assert respuesta.content.startswith(b'%PDF-') and respuesta.content.rstrip().endswith(b'%%EOF')
+    assert 'PDF generado con 5 libros' in [registro.getMessage() for registro in caplog.records]
+
+    # El fichero temporal se borra al terminar de enviarlo
+    assert list(temporales.iterdir()) == []
+
+async def test_pdf_de_varias_paginas(cliente, temporales):
+    crear_catalogo(120)
+
+    respuesta = await cliente.get('/libros/pdf/download')
+
+    assert respuesta.status_code == 200
+    # Número de páginas del árbol de páginas del PDF
+    assert int(re.search(rb'/Count (\d+)', respuesta.content).group(1)) > 1
+    assert list(temporales.iterdir()) == []
+
+async def test_sin_libros_da_404(cliente, temporales):
+    respuesta = await cliente.get('/libros/pdf/download')
+
+    assert respuesta.status_code == 404
+    assert list(temporales.iterdir()) == []
+
+async def test_un_error_al_generar_borra_el_fichero(cliente, temporales, monkeypatch):
+    crear_catalogo(1)
+
+    def generar_pdf(ruta):
+        with open(ruta, 'wb') as fichero:
+            fichero.write(b'%PDF-a medias')
+        raise OperationalError('SELECT', {}, Exception('conexión perdida'))
+
+    monkeypatch.setattr(r_libro, 'generar_pdf', generar_pdf)
+
+    respuesta = await cliente.get('/libros/pdf/download')
+
+    assert respuesta.status_code == 500
+    assert list(temporales.iterdir()) == []
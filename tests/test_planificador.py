@@ -0,0 +1,84 @@
+# Tests de la tarea periódica que marca como retrasados los préstamos activos vencidos
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import insert, select, func
+
+from conftest import sentencias_emitidas
+from database import engine
+from models.prestamo import Prestamo
+from planificador import CLAVE_BLOQUEO_RETRASADOS, marcar_retrasados, ejecutar_retrasados, metricas_retrasados
+
+pytestmark = pytest.mark.anyio
+
+HOY = date.today()
+
+# Préstamos de prueba: (id, fecha de devolución, estado)
+PRESTAMOS = [
+    # Activos y vencidos: se marcan
+    *[(i, HOY - timedelta(days=i), 'activo') for i in range(1, 6)],
+    # Activos que vencen hoy o más adelante: no se marcan
+    (6, HOY, 'activo'),
+    (7, HOY + timedelta(days=7), 'activo'),
+    # Vencidos pero ya devueltos o ya retrasados: no cambian
+    (8, HOY - timedelta(days=30), 'devuelto'),
+    (9, HOY - timedelta(days=30), 'retrasado'),
+]
+
+@pytest.fixture
+def prestamos():
+    with engine.begin() as conexion:
+        conexion.execute(insert(Prestamo), [
+            {'id': id, 'fecha_prestamo': HOY - timedelta(days=60), 'fecha_devolucion': devolucion, 'estado': estado}
+            for id, devolucion, estado in PRESTAMOS
+        ])
+
+def estados() -> dict:
+    with engine.connect() as conexion:
+        return dict(conexion.execute(select(Prestamo.id, Prestamo.estado)).all())
+
+async def test_marca_solo_los_activos_vencidos_por_lotes(prestamos, motor_asincrono):
+    with sentencias_emitidas() as sentencias:
+        actualizados = await marcar_retrasados(tamano_lote=2)
+
+    assert actualizados == 5
+    assert estados() == {
+        1: 'retrasado', 2: 'retrasado', 3: 'retrasado', 4: 'retrasado', 5: 'retrasado',
+        6: 'activo', 7: 'activo', 8: 'devuelto', 9: 'retrasado',
+    }
+    # Tres lotes: 2 + 2 + 1 (el último, incompleto, termina la tarea)
+    assert sum('UPDATE prestamos' in sentencia for sentencia in sentencias) == 3
+
+    # Una segunda ejecución no encuentra nada que marcar
+    assert await marcar_retrasados(tamano_lote=2) == 0
+
+async def test_ejecucion_registra_las_metricas(prestamos, motor_asincrono):
+    ejecuciones = metricas_retrasados['ejecuciones']
+    total = metricas_retrasados['total_filas_actualizadas']
+
+    await ejecutar_retrasados()
+
+    assert metricas_retrasados['ejecuciones'] == ejecuciones + 1
+    assert metricas_retrasados['ultimas_filas_actualizadas'] == 5
+    assert metricas_retrasados['total_filas_actualizadas'] == total + 5
+    assert metricas_retrasados['ultima_duracion_ms'] is not None
+
+@pytest.mark.skipif(engine.dialect.name != 'postgresql', reason='El bloqueo consultivo es de PostgreSQL')
+async def test_con_el_bloqueo_tomado_por_otro_worker_no_hace_nada(prestamos, motor_asincrono):
+    omitidas = metricas_retrasados['omitidas_por_bloqueo']
+    ejecuciones = metricas_retrasados['ejecuciones']
+
+    # Otro worker tiene el bloqueo mientras dura su transacción
+    with engine.begin() as otro_worker:
+        otro_worker.execute(select(func.pg_advisory_xact_lock(CLAVE_BLOQUEO_RETRASADOS)))
+
+        assert await marcar_retrasados(tamano_lote=2) is None
+        await ejecutar_retrasados()
+
+    assert metricas_retrasados['omitidas_por_bloqueo'] == omitidas + 1
+    assert metricas_retrasados['ejecuciones'] == ejecuciones
+    assert estados() == {id: estado for id, _, estado in PRESTAMOS}
+
+    # Al soltarlo, la siguiente ejecución sí marca los préstamos
+    assert await marcar_retrasados(tamano_lote=2) == 5
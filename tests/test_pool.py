@@ -0,0 +1,54 @@
+# Tests de las métricas del pool de conexiones de las rutas: se cuentan todos los fallos al
+# obtener una conexión y la espera en la cola se mide aparte de la creación de conexiones
+
+import asyncio
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from conftest import DIRECTORIO
+from database import PoolConMetricas, metricas_pool
+
+pytestmark = pytest.mark.anyio
+
+URL = f'sqlite+aiosqlite:///{os.path.join(DIRECTORIO, "pool.db")}'
+
+@pytest.fixture(autouse=True)
+def metricas_vacias():
+    metricas_pool.__init__()
+
+async def test_tiempo_de_espera_agotado_cuenta_como_fallo():
+    motor = create_async_engine(URL, poolclass=PoolConMetricas, pool_size=1, max_overflow=0, pool_timeout=0.1)
+    try:
+        async with motor.connect():
+            with pytest.raises(Exception):
+                async with motor.connect():
+                    pass
+    finally:
+        await motor.dispose()
+
+    assert metricas_pool.checkouts == 1
+    assert metricas_pool.fallos_checkout == 1
+    assert metricas_pool.conexiones_creadas == 1
+    # La espera hasta agotar el tiempo se registra como espera en la cola
+    assert metricas_pool.espera_maxima >= 0.1
+
+async def test_error_al_conectar_cuenta_como_fallo_y_no_como_espera():
+    async def conectar():
+        await asyncio.sleep(0.2)
+        raise ConnectionRefusedError('servidor caído')
+
+    motor = create_async_engine('sqlite+aiosqlite://', async_creator=conectar, poolclass=PoolConMetricas, pool_size=1, max_overflow=0)
+    try:
+        with pytest.raises(ConnectionRefusedError):
+            async with motor.connect():
+                pass
+    finally:
+        await motor.dispose()
+
+    assert metricas_pool.checkouts == 0
+    assert metricas_pool.fallos_checkout == 1
+    # El tiempo de conexión se mide como creación, no como espera en la cola
+    assert metricas_pool.creacion_total >= 0.2
+    assert metricas_pool.espera_maxima < 0.1
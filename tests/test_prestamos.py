@@ -0,0 +1,52 @@
+# Tests de la reserva de ejemplares de los préstamos: con muchas peticiones simultáneas
+# nunca se prestan más ejemplares de los que tiene el libro
+
+import asyncio
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import insert, select, update
+
+from conftest import crear_catalogo, libro_prueba
+from database import engine
+from models.libro import Libro
+from models.user import User
+
+pytestmark = pytest.mark.anyio
+
+# Función para insertar un usuario directamente en la tabla. Devuelve su ID
+def crear_usuario() -> int:
+    with engine.begin() as conexion:
+        conexion.execute(insert(User).values(
+            id=1, email='lector@example.com', nombre='Lector', apellido='Apellido', fecha_nacimiento=date(1990, 1, 1),
+            dni='00000000T', pais='es', ciudad='Madrid', direccion='Calle 1', telefono='600000000', password='-',
+            created_at=datetime.now(),
+        ))
+    return 1
+
+@pytest.mark.parametrize('ejemplares, peticiones', [(1, 10), (3, 20)])
+async def test_prestamos_simultaneos_no_prestan_mas_ejemplares_de_los_que_hay(cliente, ejemplares, peticiones):
+    crear_catalogo(1)
+    usuario_id = crear_usuario()
+    with engine.begin() as conexion:
+        conexion.execute(update(Libro).values(ejemplares=ejemplares, disponibles=ejemplares))
+
+    prestamo = {'usuario_id': usuario_id, 'libros_id': [1], 'fecha_prestamo': '2024-01-01', 'fecha_devolucion': '2024-01-15'}
+    respuestas = await asyncio.gather(*(cliente.post('/prestamos/', json=prestamo) for _ in range(peticiones)))
+
+    codigos = sorted(respuesta.status_code for respuesta in respuestas)
+    assert codigos == [201] * ejemplares + [409] * (peticiones - ejemplares)
+
+    with engine.connect() as conexion:
+        assert conexion.scalar(select(Libro.disponibles)) == 0
+
+async def test_ejemplares_negativos_dan_422(cliente):
+    crear_catalogo(0)
+
+    respuesta = await cliente.post('/libros/', json=libro_prueba(1, generos=[1], autores=[1], ejemplares=-1))
+    assert respuesta.status_code == 422
+
+    # En la importación solo falla esa fila
+    respuesta = await cliente.post('/libros/bulk', json=[libro_prueba(1, generos=[1], autores=[1], ejemplares=-1), libro_prueba(2, generos=[1], autores=[1])])
+    assert respuesta.json()['insertados'] == 1
+    assert [error['fila'] for error in respuesta.json()['errores']] == [0]
@@ -0,0 +1,102 @@
+# Tests de la proyección de columnas de los listados de libros (parámetro fields)
+
+import dataclasses
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+from conftest import crear_catalogo, sentencias_emitidas
+from database import engine, AsyncSessionLocal
+from models.libro import Libro
+from proyeccion import CAMPOS_LIBRO, campos_libro, clase_libro, columnas_libro, filas_a_libros
+from respuestas import RespuestaJSONEstandar, RespuestaORJSON, orjson
+
+pytestmark = pytest.mark.anyio
+
+# ----------------------------- CAMPOS -----------------------------
+def test_campos_por_defecto_y_pedidos():
+    assert campos_libro(None) == list(CAMPOS_LIBRO)
+    assert campos_libro('') == list(CAMPOS_LIBRO)
+    # Se mantiene el orden pedido, sin espacios ni repetidos
+    assert campos_libro(' titulo , id,titulo,, precio') == ['titulo', 'id', 'precio']
+
+@pytest.mark.parametrize('fields', ['titulo,no_existe', 'created_at', ',,'])
+def test_campos_desconocidos_dan_400(fields):
+    with pytest.raises(HTTPException) as error:
+        campos_libro(fields)
+
+    assert error.value.status_code == 400
+    assert 'Campos posibles: id, isbn, titulo' in error.value.detail
+
+# ----------------------------- OBJETOS -----------------------------
+async def test_filas_a_libros_crea_objetos_con_slots(motor_asincrono):
+    crear_catalogo(2, relaciones=2, precio=12.5)
+    campos = ['titulo', 'autores', 'precio', 'id']
+
+    async with AsyncSessionLocal() as db:
+        filas = (await db.execute(select(*columnas_libro(campos)).order_by(Libro.id))).all()
+        libros = await filas_a_libros(db, filas, campos)
+
+    libro = libros[0]
+    assert type(libro) is clase_libro(tuple(campos))
+    assert not hasattr(libro, '__dict__')
+    assert [campo.name for campo in dataclasses.fields(libro)] == campos
+    assert (libro.titulo, libro.autores, libro.precio, libro.id) == ('Libro 1', [1, 2], 12.5, 1)
+    assert type(libro.precio) is float
+
+    # La misma combinación de campos usa la misma clase
+    assert clase_libro(tuple(campos)) is clase_libro(tuple(campos))
+    assert clase_libro(('id', 'titulo')) is not clase_libro(('titulo', 'id'))
+
+@pytest.mark.parametrize('clase_respuesta', [
+    RespuestaJSONEstandar,
+    pytest.param(RespuestaORJSON, marks=pytest.mark.skipif(orjson is None, reason='orjson no está instalado')),
+])
+def test_las_respuestas_codifican_los_objetos_como_json(clase_respuesta):
+    libro = clase_libro(('titulo', 'id', 'autores'))('Cien años', 1, [2, 3])
+
+    cuerpo = clase_respuesta({'items': [libro]}).body
+
+    assert cuerpo.decode() == '{"items":[{"titulo":"Cien años","id":1,"autores":[2,3]}]}'
+
+def test_la_respuesta_estandar_rechaza_otros_objetos():
+    with pytest.raises(TypeError, match='object'):
+        RespuestaJSONEstandar({'items': [object()]})
+
+# ----------------------------- RUTAS -----------------------------
+async def test_listado_con_campos_solo_lee_sus_columnas(cliente):
+    crear_catalogo(3)
+
+    with sentencias_emitidas() as sentencias:
+        respuesta = await cliente.get('/libros/', params={'fields': 'isbn,titulo,precio'})
+
+    assert respuesta.status_code == 200
+    libros = respuesta.json()['items']
+    assert [list(libro) for libro in libros] == [['isbn', 'titulo', 'precio']] * 3
+    assert libros[0]['titulo'] == 'Libro 1' and libros[0]['precio'] == 10.0
+
+    # Una sola consulta, sin la descripción ni las tablas de relación
+    assert len(sentencias) == 1
+    assert 'descripcion' not in sentencias[0] and 'libros_autores' not in sentencias[0]
+
+async def test_listado_con_campos_desconocidos_da_400(cliente):
+    crear_catalogo(1)
+
+    respuesta = await cliente.get('/libros/', params={'fields': 'titulo,no_existe'})
+
+    assert respuesta.status_code == 400
+    assert respuesta.json()['detail'].startswith('Campos no válidos: no_existe.')
+
+async def test_cambios_con_campos_incluyen_la_fecha_de_actualizacion(cliente):
+    crear_catalogo(2)
+    # Los cambios más recientes que el margen no se devuelven todavía
+    with engine.begin() as conexion:
+        conexion.execute(update(Libro).values(updated_at=datetime(2020, 1, 1, tzinfo=timezone.utc)))
+
+    respuesta = await cliente.get('/libros/changes', params={'since': '2000-01-01T00:00:00Z', 'fields': 'id'})
+
+    assert respuesta.status_code == 200
+    assert [list(libro) for libro in respuesta.json()['items']] == [['id', 'updated_at']] * 2
+    assert respuesta.json()['items'][0] == {'id': 1, 'updated_at': '2020-01-01T00:00:00+00:00'}